@@ -6,13 +6,20 @@
 # Works with 32-bit Python (pywin32 + pyodbc x86 + ODBC SQL Server driver x86).
 # ======================================================================
 
-import os, re, sys, traceback, hashlib, tempfile, shutil, unicodedata, string, time, struct
+import os, re, sys, argparse, traceback, hashlib, tempfile, shutil, unicodedata, string, time, struct, json, threading, random
 from pathlib import Path
-from contextlib import contextmanager
-from typing import Any, List, Tuple, Optional, Dict, Callable
+from contextlib import contextmanager, ExitStack
+from typing import Any, List, Tuple, Optional, Dict, Callable, Iterable, Iterator
 from datetime import datetime, timezone
 
-import win32com.client
+try:
+    import win32com.client
+except ImportError:
+    win32com = None  # --load-spool runs without Notes (e.g. on Linux)
+import notes_dxl, notes_cas, notes_records, notes_spool, notes_sinks, notes_export, notes_reader, notes_fts
+from notes_snapshot import ViewSnapshot
+from notes_retry import RetryBudgetExhausted, RETRY_BUDGET
+from notes_paths import sanitize_folder_name
 try:
     import pyodbc
 except Exception as e:
@@ -48,6 +55,11 @@ SQL_SCOPES    = ["https://database.windows.net//.default"]  # NOTE: double slash
 # CAS root (content-addressed storage for extracted attachments)
 CAS_ROOT = Path(os.environ.get("NOTES_CAS_ROOT") or os.environ.get("LOCALAPPDATA") or Path.home()) / "notes_cas"
 
+# Local caches (view matcher hits, ...)
+CACHE_ROOT = Path(os.environ.get("NOTES_CACHE_ROOT") or os.environ.get("LOCALAPPDATA") or Path.home()) / "notes_cache"
+SPOOL_ROOT = Path(os.environ.get("NOTES_SPOOL_ROOT") or os.environ.get("LOCALAPPDATA") or Path.home()) / "notes_spool"
+FILES_ROOT = Path(os.environ.get("NOTES_FILES_ROOT") or "output")
+
 # Canonical Notes views + synonyms
 CANONICAL_TARGETS = [
     "Person By Surname",
@@ -107,6 +119,16 @@ EO_TYPE_IMAGE       = 1452
 EO_TYPE_OLE         = 1453
 EO_TYPE_ATTACHMENT  = 1454
 
+# NotesItem.Type (drives value coercion; see coerce_item_values)
+IT_RICHTEXT  = 1
+IT_NUMBERS   = 768
+IT_DATETIMES = 1024
+IT_NAMES     = 1074
+IT_READERS   = 1075
+IT_AUTHORS   = 1076
+IT_TEXT      = 1280
+TEXT_ITEM_TYPES = (IT_TEXT, IT_NAMES, IT_READERS, IT_AUTHORS)
+
 FORM_MAX    = 256
 SUBJECT_MAX = 1024
 AUTHOR_MAX  = 512
@@ -116,12 +138,6 @@ AUTHOR_MAX  = 512
 def log(*args):
     if DEBUG: print(*args)
 
-def sanitize_folder_name(name: str, max_len=100) -> str:
-    if not name or not name.strip(): return "Unnamed"
-    name = re.sub(r'[<>:"/\\|?*]', '_', name)
-    name = re.sub(r'[\s_]+', '_', name)
-    return name[:max_len].strip('_')
-
 def safe_str(val: Any, max_len: int, field: str) -> Optional[str]:
     if val is None: return None
     s = str(val)
@@ -170,10 +186,6 @@ def cas_store(src: Path) -> Tuple[bytes, str, int]:
     return digest, str(rel).replace("\\", "/"), src.stat().st_size
 
 _PUNCT_TABLE = str.maketrans({c: " " for c in string.punctuation})
-_WS = re.compile(r"\s+")
-_ALT_SPLIT = re.compile(r"\(([^()]*\|[^()]*)\)")
-_CHARCLASS = re.compile(r"\[([^\]]+)\]")
-_QUANT     = re.compile(r"\{[^}]*\}")
 
 def _normalize(s: str) -> str:
     if not s: return ""
@@ -186,69 +198,143 @@ def _leaf(name: str) -> str:
     parts = re.split(r"[\\/]+", (name or "").strip())
     return parts[-1].strip() if parts else ""
 
-def _choose_alt(s: str) -> str:
-    def _rep(m: re.Match) -> str:
-        return m.group(1).split("|", 1)[0]
-    return _ALT_SPLIT.sub(_rep, s)
-
-def _simplify_charclass(s: str) -> str:
-    def _rep(m: re.Match) -> str:
-        inside = m.group(1)
-        for ch in inside:
-            if ch.isalpha(): return ch
-        return inside[0] if inside else ""
-    return _CHARCLASS.sub(_rep, s)
-
-def regex_to_needles(pat: str) -> List[str]:
-    s = pat
-    for repl in (r"\b", r"\s*", r"\s+", r"\s", r"\t", r"\n", r"\r"):
-        s = s.replace(repl, " ")
-    s = s.replace("^", " ").replace("$", " ")
-    s = s.replace(r"\.", ".").replace(r"\/", "/").replace(r"\\", "\\")
-    s = s.replace(r"\(", "(").replace(r"\)", ")")
-    s = s.replace(r"\?", "?").replace(r"\+", "+").replace(r"\*", "*")
-    s = s.replace(".*", " ").replace(".+", " ")
-    s = _QUANT.sub(" ", s)
-    s = s.replace("(?:", "(")
-    s = _simplify_charclass(s)
-    s = _choose_alt(s)
-    s = re.sub(r"[()^$?+*|]", " ", s)
-    s = re.sub(r"\\", " ", s)
-    s = _WS.sub(" ", s).strip().lower()
-
-    needles = []
-    if s and any(c.isalnum() for c in s):
-        needles.append(s)
-    s2 = re.sub(r"[^0-9a-zà-ÿ/\\\- ]+", "", s)
-    s2 = _WS.sub(" ", s2).strip()
-    if s2 and s2 != s:
-        needles.append(s2)
-
-    seen = set(); out = []
-    for n in needles:
-        if n not in seen:
-            seen.add(n); out.append(n)
-    return out
+# ------------------------- VIEW NAME MATCHER ---------------------------
+# All synonym regexes are compiled ONCE into a single regex made of optional
+# lookaheads (one named group per pattern), so each view name is tested in a
+# single pass per form. Per-name hits are memoized on disk keyed by the
+# synonym content, so a database with thousands of views is matched once.
+
+_INLINE_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+_GROUP_REFS = re.compile(r"\(\?P[<=]|\\[1-9]|\\g<")    # named groups / backreferences
+VIEW_MATCHER_CACHE_MAX = int(os.environ.get("NOTES_VIEW_MATCHER_CACHE_MAX", "20000"))  # view names kept per synonym set
 
-def build_contains_map(view_synonyms: Dict[str, List[str]]) -> Dict[str, List[str]]:
+def _canon_literal(canon: str) -> str:
+    return re.escape(canon.strip()).replace(r"\ ", r"\s+")
+
+def _override_source(raw: str) -> str:
+    # regex_override may hold a real regex (see _fmt_sql_update_regex) or a plain
+    # view name; match either, falling back to the literal when it does not compile.
+    lit = re.escape(" ".join(raw.split()))
+    src = _INLINE_FLAGS.sub("", raw.strip())
+    try:
+        re.compile(src)
+    except re.error:
+        return lit
+    return f"(?:{src})|(?:{lit})"
+
+def synonyms_for_plan(canon_targets: List[str], overrides_by_canon: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
     out: Dict[str, List[str]] = {}
-    for canon, patterns in view_synonyms.items():
-        needles: List[str] = [canon.lower()]
-        for pat in patterns:
-            needles.extend(regex_to_needles(pat))
-        cleaned: List[str] = []
-        seen = set()
-        for n in needles:
-            n = _WS.sub(" ", n).strip()
-            if not n or n in seen: continue
-            if len(n) < 3: continue
-            cleaned.append(n); seen.add(n)
-        out[canon] = cleaned
-        if DEBUG:
-            log(f"[DEBUG] Needles for '{canon}': {cleaned}")
+    for canon in canon_targets:
+        override_raw = overrides_by_canon.get(canon)
+        if override_raw:
+            out[canon] = [_override_source(override_raw)]
+        else:
+            out[canon] = [_canon_literal(canon)] + list(VIEW_SYNONYMS.get(canon, []))
     return out
 
-CONTAINS_MAP = build_contains_map(VIEW_SYNONYMS)
+def _synonyms_key(synonyms: Dict[str, List[str]]) -> str:
+    h = hashlib.sha256()
+    for canon in sorted(synonyms):
+        h.update(canon.encode("utf-8")); h.update(b"\x00")
+        for pat in synonyms[canon]:
+            h.update(pat.encode("utf-8")); h.update(b"\x1f")
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+def _load_json_cache(path: Path) -> Optional[Any]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def _save_json_cache(path: Path, obj: Any):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False)
+        tmp.replace(path)
+    except Exception as e:
+        log(f"[WARN] Could not write cache {path}: {e}")
+
+class ViewNameMatcher:
+    def __init__(self, synonyms: Dict[str, List[str]]):
+        self.key = _synonyms_key(synonyms)
+        self._group_canon: Dict[str, str] = {}
+        parts: List[str] = []
+        for ci, (canon, patterns) in enumerate(synonyms.items()):
+            for pi, pat in enumerate(patterns):
+                group = f"c{ci}p{pi}"
+                # Checked as the fragment that goes into the combined regex: a leading
+                # (?i) is dropped (matching ignores case anyway); group names and
+                # backreferences would clash with, or point into, the other fragments.
+                src = _INLINE_FLAGS.sub("", pat)
+                frag = f"(?:(?=.*?(?P<{group}>{src})))?"
+                try:
+                    if _GROUP_REFS.search(src):
+                        raise re.error("named groups and backreferences are not supported")
+                    re.compile(src)      # errors point into the synonym, not the fragment
+                    re.compile(frag, re.IGNORECASE)
+                except re.error as e:
+                    log(f"[WARN] Ignoring invalid synonym for '{canon}': {pat!r} ({e})")
+                    continue
+                parts.append(frag)
+                self._group_canon[group] = canon
+        self.regex = re.compile("".join(parts), re.IGNORECASE)
+        self._cache_file = CACHE_ROOT / "view_matcher" / f"{self.key}.json"
+        cached = _load_json_cache(self._cache_file)
+        self._hits: Dict[str, Dict[str, List[int]]] = cached if isinstance(cached, dict) else {}
+        self._dirty = False
+        self._trim()
+        if DEBUG:
+            log(f"[DEBUG] View matcher {self.key[:12]}: {len(self._group_canon)} patterns, "
+                f"{len(self._hits)} cached names")
+
+    def _groups(self, text: str) -> set:
+        m = self.regex.match(text)
+        if not m: return set()
+        return {g for g, v in m.groupdict().items() if v is not None}
+
+    def hits(self, view_name: str) -> Dict[str, List[int]]:
+        """canon -> [distinct patterns matched, matched on leaf (0/1)] for one view name."""
+        got = self._hits.get(view_name)
+        if got is not None:
+            return got
+        full_raw = view_name or ""
+        leaf_raw = _leaf(full_raw)
+        leaf_groups = self._groups(leaf_raw) | self._groups(_normalize(leaf_raw))
+        all_groups  = self._groups(full_raw) | self._groups(_normalize(full_raw)) | leaf_groups
+        got = {}
+        for g in all_groups:
+            canon = self._group_canon[g]
+            entry = got.setdefault(canon, [0, 0])
+            entry[0] += 1
+            if g in leaf_groups: entry[1] = 1
+        self._hits[view_name] = got
+        self._dirty = True
+        self._trim()
+        return got
+
+    def _trim(self):
+        # Oldest names first (dict order), so a long-lived cache keeps the recent ones
+        while len(self._hits) > max(VIEW_MATCHER_CACHE_MAX, 1):
+            del self._hits[next(iter(self._hits))]
+            self._dirty = True
+
+    def save(self):
+        if self._dirty:
+            _save_json_cache(self._cache_file, self._hits)
+            self._dirty = False
+
+_MATCHERS: Dict[str, ViewNameMatcher] = {}
+
+def get_view_matcher(synonyms: Dict[str, List[str]]) -> ViewNameMatcher:
+    key = _synonyms_key(synonyms)
+    m = _MATCHERS.get(key)
+    if m is None:
+        m = _MATCHERS[key] = ViewNameMatcher(synonyms)
+    return m
 
 def _escape_regex_literal_for_mysql(s: str) -> str:
     esc_sql = s.replace("\\", "\\\\").replace("'", "''")
@@ -264,10 +350,111 @@ def _fmt_sql_update_regex(plan_id: int, canon_name: str, notes_view_name: str) -
         f"WHERE plan_id={plan_id} AND canon_name='{canon_sql}';"
     )
 
+def _fmt_sql_item_filter(item_name: str, notes_filter: int) -> str:
+    nm = item_name.replace("'", "''")
+    return (
+        f"MERGE dbo.items AS tgt USING (SELECT N'{nm}' AS name) AS src ON tgt.name_lc = LOWER(src.name) "
+        f"WHEN MATCHED THEN UPDATE SET notes_filter = {notes_filter} "
+        f"WHEN NOT MATCHED THEN INSERT (name, notes_filter) VALUES (src.name, {notes_filter});"
+    )
+
 # ------------------------- RESILIENCE HELPERS --------------------------
 
 RETRY_COM_TRIES   = 6
 RETRY_COM_BACKOFF = 1.5
+RETRY_DB_TRIES    = 3
+RETRY_DB_BACKOFF  = 1.0
+RETRY_MAX_DELAY   = 60.0
+
+# Circuit breakers: one per Domino server ("notes:<server>") and per SQL endpoint
+# ("sql:<host>/<db>"). After BREAKER_FAIL_THRESHOLD consecutive transient failures
+# the breaker opens and the next call on that endpoint sleeps out the cooldown,
+# pausing the whole (sequential) pipeline; then a single half-open probe either
+# closes it or re-opens it with a doubled cooldown.
+BREAKER_FAIL_THRESHOLD = 4
+BREAKER_COOLDOWN_SEC   = 30.0
+BREAKER_MAX_COOLDOWN   = 600.0
+
+# RETRY_BUDGET (NOTES_RETRY_BUDGET retries per plan) and RetryBudgetExhausted come from
+# notes_retry, so a sibling script's EavSink spends the same budget and raises the same class.
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_FAIL_THRESHOLD,
+                 cooldown_sec: float = BREAKER_COOLDOWN_SEC, max_cooldown_sec: float = BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown_sec
+        self.max_cooldown = max_cooldown_sec
+        self.cooldown = cooldown_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.paused_sec = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+    def before_call(self):
+        if self.state != "open":
+            return
+        wait = self.opened_at + self.cooldown - time.monotonic()
+        if wait > 0:
+            print(f"[WARN] Circuit '{self.name}' open; pausing pipeline for {wait:.0f}s")
+            time.sleep(wait)
+            self.paused_sec += wait
+        self.state = "half_open"
+        log(f"[INFO] Circuit '{self.name}' half-open; probing")
+
+    def on_success(self):
+        if self.state != "closed":
+            print(f"[INFO] Circuit '{self.name}' closed")
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+
+    def on_failure(self, exc: Optional[Exception] = None):
+        self.failures += 1
+        if self.state == "half_open":
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open(exc)
+        elif self.state == "closed" and self.failures >= self.threshold:
+            self._open(exc)
+
+    def _open(self, exc: Optional[Exception]):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        print(f"[WARN] Circuit '{self.name}' OPEN after {self.failures} failure(s); "
+              f"cooldown {self.cooldown:.0f}s ({exc})")
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_ACTIVE_NOTES_SERVER = ""
+
+def breaker_for(key: str) -> CircuitBreaker:
+    b = _BREAKERS.get(key)
+    if b is None:
+        b = _BREAKERS[key] = CircuitBreaker(key)
+    return b
+
+def set_active_notes_server(server: str):
+    global _ACTIVE_NOTES_SERVER
+    _ACTIVE_NOTES_SERVER = server or ""
+
+def notes_breaker() -> CircuitBreaker:
+    return breaker_for(f"notes:{_ACTIVE_NOTES_SERVER or 'local'}")
+
+def breaker_stats() -> Dict[str, int]:
+    return dict(
+        breaker_trips=sum(b.trips for b in _BREAKERS.values()),
+        breaker_pause_sec=int(sum(b.paused_sec for b in _BREAKERS.values())),
+    )
+
+def _jittered_delay(backoff_sec: float, attempt: int) -> float:
+    d = min(RETRY_MAX_DELAY, backoff_sec * (2 ** (attempt - 1)))
+    return random.uniform(d / 2, d)
+
 _TRANSIENT_COM_SUBSTRINGS = [
     "Network", "The server is not responding", "Timed out",
     "Argument has been deleted", "Object variable not set",
@@ -288,22 +475,27 @@ def _is_transient_com_error(exc: Exception) -> bool:
     return any(s.lower() in mlow for s in _TRANSIENT_COM_SUBSTRINGS)
 
 def retry_call(fn: Callable, *args, tries: int, backoff_sec: float,
-               is_retryable: Callable[[Exception], bool], **kwargs):
+               is_retryable: Callable[[Exception], bool],
+               breaker: Optional[CircuitBreaker] = None, **kwargs):
     attempt = 0
     last_exc = None
-    delay = backoff_sec
     while attempt < tries:
+        if breaker: breaker.before_call()
         try:
-            return fn(*args, **kwargs)
+            result = fn(*args, **kwargs)
+            if breaker: breaker.on_success()
+            return result
         except Exception as e:
             last_exc = e
             if not is_retryable(e):
                 raise
+            if breaker: breaker.on_failure(e)
             attempt += 1
             if attempt >= tries:
                 break
-            time.sleep(delay)
-            delay *= 2
+            RETRY_BUDGET.spend(getattr(fn, "__name__", "call"))
+            if not (breaker and breaker.is_open):   # an open breaker already waits out its cooldown
+                time.sleep(_jittered_delay(backoff_sec, attempt))
     assert last_exc is not None
     raise last_exc
 
@@ -313,14 +505,55 @@ def resilient_com(fn: Callable, *args, **kwargs):
         tries=RETRY_COM_TRIES,
         backoff_sec=RETRY_COM_BACKOFF,
         is_retryable=_is_transient_com_error,
+        breaker=notes_breaker(),
+    )
+
+# SQLSTATEs for lost/failed connections, timeouts, deadlocks and Azure SQL throttling
+_TRANSIENT_SQLSTATES = {"08S01", "08001", "08003", "08004", "HYT00", "HYT01", "40001", "40613", "40501", "49918"}
+
+def _is_transient_sql_error(exc: Exception) -> bool:
+    if not isinstance(exc, pyodbc.Error):
+        return False
+    state = str(exc.args[0]) if exc.args else ""
+    return isinstance(exc, pyodbc.OperationalError) or state in _TRANSIENT_SQLSTATES
+
+def sql_breaker() -> CircuitBreaker:
+    return breaker_for(f"sql:{FABRIC_SERVER}/{FABRIC_DATABASE}")
+
+def resilient_sql(con, fn: Callable, *args, **kwargs):
+    """Run fn with retries behind the SQL endpoint breaker; reconnects (fresh token) before each retry."""
+    state = {"retry": False}
+    def _attempt():
+        if state["retry"]:
+            con.reconnect()
+        state["retry"] = True
+        return fn(*args, **kwargs)
+    _attempt.__name__ = getattr(fn, "__name__", "sql")
+    return retry_call(
+        _attempt,
+        tries=RETRY_DB_TRIES,
+        backoff_sec=RETRY_DB_BACKOFF,
+        is_retryable=_is_transient_sql_error,
+        breaker=sql_breaker(),
     )
 
+def resilient_sql_counted(con, stats: Dict[str, int], fn: Callable, *args):
+    """resilient_sql for a unit that bumps run counters: fn gets a fresh counts dict
+    as its first argument on every attempt, merged into stats only once it succeeds."""
+    def _unit():
+        counts: Dict[str, int] = dict(upserted=0, atts=0)
+        return fn(counts, *args), counts
+    result, counts = resilient_sql(con, _unit)
+    for k, v in counts.items(): stats[k] = stats.get(k, 0) + v
+    return result
+
 class NotesReopenContext:
     def __init__(self, open_db_fn: Callable[[], Any], get_view_fn: Callable[[Any, str], Any], view_name: Optional[str] = None):
         self.open_db_fn = open_db_fn
         self.get_view_fn = get_view_fn
         self.notes_db = None
         self.view_name = view_name
+        self.transient_errors = 0
     def reopen_db(self):
         self.notes_db = self.open_db_fn(); return self.notes_db
     def reopen_view(self, view_name: Optional[str] = None):
@@ -331,19 +564,172 @@ class NotesReopenContext:
 
 def resilient_com_with_reopen(fn, reopen_ctx: NotesReopenContext, *args, **kwargs):
     attempt = 0
-    delay = RETRY_COM_BACKOFF
     last_exc = None
+    breaker = notes_breaker()
     while attempt < RETRY_COM_TRIES:
+        breaker.before_call()
         try:
-            return fn(*args, **kwargs)
+            result = fn(*args, **kwargs)
+            breaker.on_success()
+            return result
         except Exception as e:
             last_exc = e
             if not _is_transient_com_error(e): raise
-            attempt += 1; time.sleep(delay); delay *= 2
+            breaker.on_failure(e)
+            attempt += 1; reopen_ctx.transient_errors += 1
+            if attempt >= RETRY_COM_TRIES: break
+            RETRY_BUDGET.spend("COM call with reopen")
+            if not breaker.is_open: time.sleep(_jittered_delay(RETRY_COM_BACKOFF, attempt))
             try: reopen_ctx.reopen_db()
             except Exception: pass
     raise last_exc
 
+# ------------------------- NOTES SESSION POOL --------------------------
+# Keeps one initialized Lotus.NotesSession per thread (COM objects are
+# apartment-bound) plus its open database handles. Reconnects probe the cached
+# handle first and reuse the live session to reopen; a session is torn down and
+# re-Initialize()d only when its own probe fails.
+
+class NotesSessionPool:
+    def __init__(self, password: str):
+        self.password = password
+        self._sessions: Dict[int, Any] = {}
+        self._dbs: Dict[Tuple[int, str, str], Any] = {}
+        self.sessions_created = 0
+        self.db_opens = 0
+
+    @staticmethod
+    def session_alive(session) -> bool:
+        try:
+            session.UserName
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def db_alive(db) -> bool:
+        try:
+            return bool(db.IsOpen)
+        except Exception:
+            return False
+
+    def _new_session(self):
+        session = win32com.client.Dispatch("Lotus.NotesSession")
+        session.Initialize(self.password)
+        self.sessions_created += 1
+        log(f"[INFO] Notes session initialized (#{self.sessions_created})")
+        return session
+
+    def _drop_session(self, tid: int):
+        self._sessions.pop(tid, None)
+        for key in [k for k in self._dbs if k[0] == tid]:
+            self._dbs.pop(key, None)
+
+    def session(self):
+        tid = threading.get_ident()
+        session = self._sessions.get(tid)
+        if session is not None and self.session_alive(session):
+            return session
+        if session is not None:
+            print("[WARN] Notes session failed its probe; re-initializing")
+            self._drop_session(tid)
+        session = self._sessions[tid] = self._new_session()
+        return session
+
+    def adopt_db(self, server: str, filepath: str, db):
+        self._dbs[(threading.get_ident(), server, filepath)] = db
+
+    def get_db(self, server: str, filepath: str, fresh: bool = False):
+        key = (threading.get_ident(), server, filepath)
+        db = self._dbs.get(key)
+        if db is not None and not fresh and self.db_alive(db):
+            return db
+        session = self.session()
+        db = session.GetDatabase(server, filepath)
+        if not db.IsOpen:
+            try: db.Open(server, filepath)
+            except Exception: pass
+        self.db_opens += 1
+        self._dbs[key] = db
+        return db
+
+    def stats(self) -> Dict[str, int]:
+        return dict(sessions_created=self.sessions_created, db_opens=self.db_opens)
+
+NOTES_POOL = NotesSessionPool(LOTUS_PASSWORD)
+
+# ------------------------- ADAPTIVE BATCHING ---------------------------
+# Sizes process_view_into_db batches so each batch (docs + commit + checkpoint)
+# takes about BATCH_TARGET_SEC. Halves after transient COM errors or slow
+# commits; otherwise moves toward the observed doc rate (at most 2x per step).
+
+BATCH_TARGET_SEC = float(os.environ.get("NOTES_BATCH_TARGET_SEC", "5"))
+BATCH_INITIAL    = 50
+BATCH_MIN        = 5
+BATCH_MAX        = 1000
+SLOW_COMMIT_SEC  = 2.0
+
+class AdaptiveBatchSizer:
+    def __init__(self, target_sec: float = BATCH_TARGET_SEC, initial: int = BATCH_INITIAL,
+                 min_size: int = BATCH_MIN, max_size: int = BATCH_MAX):
+        self.target_sec = target_sec
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(max_size, initial))
+        self.rate: Optional[float] = None   # docs/sec, smoothed
+        self.history: List[int] = []
+
+    def next_size(self) -> int:
+        self.history.append(self.size)
+        return self.size
+
+    def note_batch(self, n_docs: int, elapsed_sec: float, commit_sec: float, transient_errors: int):
+        if n_docs <= 0 or elapsed_sec <= 0:
+            return
+        rate = n_docs / elapsed_sec
+        self.rate = rate if self.rate is None else 0.7 * self.rate + 0.3 * rate
+        if transient_errors:
+            new, why = self.size // 2, f"{transient_errors} transient COM error(s)"
+        elif commit_sec > SLOW_COMMIT_SEC:
+            new, why = self.size // 2, f"slow commit {commit_sec:.1f}s"
+        else:
+            new, why = min(int(self.rate * self.target_sec), self.size * 2), f"{self.rate:.1f} docs/s"
+        new = max(self.min_size, min(self.max_size, new))
+        if new != self.size:
+            log(f"[INFO]   Batch size {self.size} -> {new} ({why})")
+        self.size = new
+
+    def stats(self) -> Dict[str, int]:
+        if not self.history:
+            return {}
+        return dict(
+            batches=len(self.history),
+            batch_min=min(self.history),
+            batch_max=max(self.history),
+            batch_avg=int(round(sum(self.history) / len(self.history))),
+            batch_last=self.history[-1],
+        )
+
+def _run_notes(stats: Dict[str, int]) -> Optional[str]:
+    parts: List[str] = []
+    if stats.get("batches"):
+        parts.append(f"batches={stats['batches']} batch_size min/avg/max/last="
+                     f"{stats['batch_min']}/{stats['batch_avg']}/{stats['batch_max']}/{stats['batch_last']}")
+    if stats.get("retries") or stats.get("breaker_trips"):
+        parts.append(f"retries={stats.get('retries', 0)} breaker_trips={stats.get('breaker_trips', 0)} "
+                     f"paused={stats.get('breaker_pause_sec', 0)}s")
+    if stats.get("unlinked"):
+        parts.append(f"stale memberships={stats['unlinked']} tombstoned={stats.get('tombstoned', 0)}")
+    if stats.get("wide"):
+        parts.append(f"wide={stats['wide']}")
+    if stats.get("resolved"):
+        parts.append(f"failures resolved={stats['resolved']}")
+    if stats.get("sinks"):
+        parts.append(f"sinks: {stats['sinks']}")
+    if stats.get("aborted"):
+        parts.append("aborted: retry budget exhausted")
+    return "; ".join(parts) or None
+
 # ----------------------------- DB LAYER (Fabric via SP) -------------------------------
 
 _SQL_COPT_SS_ACCESS_TOKEN = 1256
@@ -352,14 +738,48 @@ def _aad_sql_access_token_bytes(token: str) -> bytes:
     b = token.encode("utf-16-le")
     return struct.pack("<i", len(b)) + b
 
+# Tokens are refreshed this long before expiry; pooled connections opened with an
+# older token are recycled at their next commit/checkout (see PooledConnection).
+TOKEN_REFRESH_MARGIN_SEC = 300
+POOL_MAX_IDLE            = 4
+POOL_PROBE_IDLE_SEC      = 60
+
+class AadTokenProvider:
+    """One MSAL client + token cache per process; hands out SQL tokens, refreshing proactively."""
+    def __init__(self, scopes: List[str]):
+        self.scopes = scopes
+        self._app = None
+        self._token: Optional[str] = None
+        self.expires_at = 0.0
+        self.acquired = 0
+
+    def _client(self):
+        if self._app is None:
+            if not (TENANT_ID and CLIENT_ID and CLIENT_SECRET):
+                raise RuntimeError("AZ_TENANT_ID / AZ_CLIENT_ID / AZ_CLIENT_SECRET must be set.")
+            self._app = msal.ConfidentialClientApplication(
+                CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET,
+                token_cache=msal.SerializableTokenCache(),
+            )
+        return self._app
+
+    def token(self) -> str:
+        now = time.time()
+        if self._token and self.expires_at - now > TOKEN_REFRESH_MARGIN_SEC:
+            return self._token
+        res = self._client().acquire_token_for_client(scopes=self.scopes)
+        if "access_token" not in res:
+            raise RuntimeError(f"Failed to acquire SQL token: {res}")
+        self._token = res["access_token"]
+        self.expires_at = now + int(res.get("expires_in") or 3600)
+        self.acquired += 1
+        log(f"[SQL] AAD token acquired; valid for {int(self.expires_at - now)}s")
+        return self._token
+
+TOKEN_PROVIDER = AadTokenProvider(SQL_SCOPES)
+
 def _acquire_client_token() -> str:
-    if not (TENANT_ID and CLIENT_ID and CLIENT_SECRET):
-        raise RuntimeError("AZ_TENANT_ID / AZ_CLIENT_ID / AZ_CLIENT_SECRET must be set.")
-    app = msal.ConfidentialClientApplication(CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET)
-    res = app.acquire_token_for_client(scopes=SQL_SCOPES)
-    if "access_token" not in res:
-        raise RuntimeError(f"Failed to acquire SQL token: {res}")
-    return res["access_token"]
+    return TOKEN_PROVIDER.token()
 
 def _choose_sql_driver() -> str:
     drivers = [d.strip() for d in pyodbc.drivers()]
@@ -399,16 +819,106 @@ def _open_fabric_connection():
         timeout=30
     )
 
+class PooledConnection:
+    """pyodbc connection lent by FabricConnectionPool; reconnect() swaps in a fresh one (new token)."""
+    def __init__(self, pool: "FabricConnectionPool"):
+        self._pool = pool
+        self._raw = None
+        self._connect()
+
+    def _connect(self):
+        self._raw = _open_fabric_connection()
+        self.token_expires_at = TOKEN_PROVIDER.expires_at or (time.time() + 3600)
+        self.last_used = time.time()
+
+    def _discard(self):
+        try: self._raw.close()
+        except Exception: pass
+
+    def reconnect(self):
+        self._discard()
+        self._connect()
+        self._pool.reconnects += 1
+        log("[SQL] Reconnected pooled Fabric connection")
+
+    def token_stale(self) -> bool:
+        return self.token_expires_at - time.time() < TOKEN_REFRESH_MARGIN_SEC
+
+    def healthy(self) -> bool:
+        if self.token_stale():
+            return False
+        if time.time() - self.last_used < POOL_PROBE_IDLE_SEC:
+            return True
+        try:
+            cur = self._raw.cursor(); cur.execute("SELECT 1"); cur.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def cursor(self):
+        self.last_used = time.time()
+        return self._raw.cursor()
+
+    def commit(self):
+        self._raw.commit()
+        # Transaction boundary: safe point to roll over to a fresh token before expiry.
+        if self.token_stale():
+            self.reconnect()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._pool.release(self)
+
+class FabricConnectionPool:
+    def __init__(self, max_idle: int = POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reconnects = 0
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            con = self._idle.pop() if self._idle else None
+        if con is None:
+            con = PooledConnection(self)
+            self.opened += 1
+        elif not con.healthy():
+            con.reconnect()
+        return con
+
+    def release(self, con: PooledConnection):
+        try: con.rollback()
+        except Exception: pass
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(con)
+                return
+        con._discard()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for con in idle:
+            con._discard()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(opened=self.opened, reconnects=self.reconnects, tokens=TOKEN_PROVIDER.acquired)
+
+FABRIC_POOL = FabricConnectionPool()
+
 @contextmanager
 def sql_db():
-    con = _open_fabric_connection()
+    con = FABRIC_POOL.acquire()
     try:
         yield con
         con.commit()
     except:
         con.rollback(); raise
     finally:
-        con.close()
+        FABRIC_POOL.release(con)
 
 # ------------------------------ SCHEMA (T-SQL) --------------------------------
 
@@ -510,17 +1020,35 @@ CREATE TABLE dbo.attachments(
   INDEX IX_att_kind (kind)
 );
 """,
+# View / category dimensions (see ViewDimensions); parent_id 0 = top level
+"""
+IF OBJECT_ID('dbo.views','U') IS NULL
+CREATE TABLE dbo.views(
+  id        INT IDENTITY(1,1) PRIMARY KEY,
+  view_name NVARCHAR(255) NOT NULL,
+  CONSTRAINT uk_view_name UNIQUE (view_name)
+);
+""",
+"""
+IF OBJECT_ID('dbo.categories','U') IS NULL
+CREATE TABLE dbo.categories(
+  id        INT IDENTITY(1,1) PRIMARY KEY,
+  parent_id INT NOT NULL DEFAULT 0,
+  name      NVARCHAR(255) NOT NULL,
+  path      NVARCHAR(1024) NOT NULL,
+  depth     SMALLINT NOT NULL DEFAULT 0,
+  CONSTRAINT uk_category UNIQUE (parent_id, name)
+);
+""",
 """
 IF OBJECT_ID('dbo.document_views','U') IS NULL
 CREATE TABLE dbo.document_views(
   id            BIGINT IDENTITY(1,1) PRIMARY KEY,
   unid          CHAR(32) NOT NULL,
-  view_name     NVARCHAR(255) NOT NULL,
-  category_path NVARCHAR(1024) NULL,
-  leaf_category NVARCHAR(255)  NULL,
-  INDEX IX_docview_view (view_name),
-  INDEX IX_docview_unid (unid),
-  CONSTRAINT uk_doc_view_nodup UNIQUE (unid, view_name, category_path)
+  view_id       INT NOT NULL,
+  category_id   INT NOT NULL DEFAULT 0,
+  INDEX IX_docview_view_cat (view_id, category_id),
+  CONSTRAINT uk_doc_view UNIQUE (unid, view_id, category_id)
 );
 """,
 """
@@ -574,6 +1102,70 @@ CREATE TABLE dbo.etl_checkpoints(
   updated_at   DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
   CONSTRAINT uk_checkpoint UNIQUE (plan_id, source_id, view_name)
 );
+""",
+"""
+IF OBJECT_ID('dbo.etl_failures','U') IS NULL
+CREATE TABLE dbo.etl_failures(
+  id              BIGINT IDENTITY(1,1) PRIMARY KEY,
+  source_id       BIGINT NOT NULL,
+  view_name       NVARCHAR(255) NOT NULL,
+  unid            CHAR(32) NOT NULL,
+  category_path   NVARCHAR(1024) NULL,
+  error_class     NVARCHAR(128) NOT NULL,
+  message         NVARCHAR(1024) NULL,
+  attempts        INT NOT NULL DEFAULT 1,
+  first_failed_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+  last_failed_at  DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+  next_attempt_at DATETIME2 NOT NULL,
+  resolved_at     DATETIME2 NULL,
+  CONSTRAINT uk_failure UNIQUE (source_id, view_name, unid)
+);
+""",
+"""
+IF OBJECT_ID('dbo.wide_forms','U') IS NULL
+CREATE TABLE dbo.wide_forms(
+  form        NVARCHAR(255) NOT NULL PRIMARY KEY,
+  table_name  NVARCHAR(64)  NULL,
+  item_names  NVARCHAR(4000) NULL,
+  enabled     BIT NOT NULL DEFAULT 1
+);
+""",
+"""
+IF OBJECT_ID('dbo.spool_loads','U') IS NULL
+CREATE TABLE dbo.spool_loads(
+  spool_file  NVARCHAR(255) NOT NULL PRIMARY KEY,
+  sha256      CHAR(64) NOT NULL,
+  records     INT NOT NULL DEFAULT 0,
+  loaded_at   DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+""",
+"""
+IF COL_LENGTH('dbo.ingestion_plans','item_projection') IS NULL
+ALTER TABLE dbo.ingestion_plans ADD item_projection BIT NULL;
+""",
+"""
+IF COL_LENGTH('dbo.ingestion_plans','selection_formula') IS NULL
+ALTER TABLE dbo.ingestion_plans ADD selection_formula NVARCHAR(4000) NULL;
+""",
+"""
+IF COL_LENGTH('dbo.ingestion_plan_views','selection_formula') IS NULL
+ALTER TABLE dbo.ingestion_plan_views ADD selection_formula NVARCHAR(4000) NULL;
+""",
+"""
+IF COL_LENGTH('dbo.ingestion_plan_views','read_mode') IS NULL
+ALTER TABLE dbo.ingestion_plan_views ADD read_mode NVARCHAR(16) NULL;
+""",
+"""
+IF COL_LENGTH('dbo.ingestion_plan_views','column_map') IS NULL
+ALTER TABLE dbo.ingestion_plan_views ADD column_map NVARCHAR(4000) NULL;
+""",
+"""
+IF COL_LENGTH('dbo.documents','deleted_at') IS NULL
+ALTER TABLE dbo.documents ADD deleted_at DATETIME2 NULL;
+""",
+"""
+IF COL_LENGTH('dbo.item_values','v_text_sha256') IS NULL
+ALTER TABLE dbo.item_values ADD v_text_sha256 VARBINARY(32) NULL, v_text_len BIGINT NULL;
 """
 ]
 
@@ -584,6 +1176,40 @@ def ensure_schema():
         for sql in SCHEMA_SQL:
             cur.execute(sql)
         con.commit()
+        migrate_document_views(con)
+
+def migrate_document_views(con):
+    """One-off move of a string-keyed document_views (view_name/category_path) onto view/category ids."""
+    cur = con.cursor()
+    if cur.execute("SELECT COL_LENGTH('dbo.document_views','view_name')").fetchone()[0] is None: return
+    print("[INFO] Migrating document_views to view/category ids ...")
+    if cur.execute("SELECT COL_LENGTH('dbo.document_views','view_id')").fetchone()[0] is None:
+        cur.execute("ALTER TABLE dbo.document_views ADD view_id INT NULL, category_id INT NOT NULL DEFAULT 0")
+        con.commit()
+    pairs = cur.execute("SELECT DISTINCT view_name, category_path FROM dbo.document_views WHERE view_id IS NULL").fetchall()
+    for view_name, category_path in pairs or []:
+        vid = VIEW_DIMS.view_id(view_name)
+        cid = VIEW_DIMS.category_id(category_path)
+        cur.execute("""UPDATE dbo.document_views SET view_id = ?, category_id = ?
+                       WHERE view_id IS NULL AND view_name = ?
+                         AND (category_path = ? OR (category_path IS NULL AND ? IS NULL))""",
+                    (vid, cid, view_name, category_path, category_path))
+        con.commit()
+    # raw paths that canonicalize to the same category collapse onto one row
+    cur.execute("""WITH d AS (SELECT ROW_NUMBER() OVER (PARTITION BY unid, view_id, category_id ORDER BY id) AS rn
+                              FROM dbo.document_views)
+                   DELETE FROM d WHERE rn > 1""")
+    for sql in (
+        "ALTER TABLE dbo.document_views DROP CONSTRAINT uk_doc_view_nodup",
+        "DROP INDEX IF EXISTS IX_docview_view ON dbo.document_views",
+        "DROP INDEX IF EXISTS IX_docview_unid ON dbo.document_views",
+        "ALTER TABLE dbo.document_views DROP COLUMN view_name, category_path, leaf_category",
+        "ALTER TABLE dbo.document_views ALTER COLUMN view_id INT NOT NULL",
+        "ALTER TABLE dbo.document_views ADD CONSTRAINT uk_doc_view UNIQUE (unid, view_id, category_id)",
+        "CREATE INDEX IX_docview_view_cat ON dbo.document_views (view_id, category_id)",
+    ):
+        cur.execute(sql)
+    con.commit()
 
 # ------------------------------ DML helpers ------------------------------
 
@@ -612,9 +1238,11 @@ def finish_etl_run(cur, run_id: int, stats: Dict[str,int]):
              docs_scanned  = ?,
              docs_upserted = ?,
              atts_saved    = ?,
-             errors        = ?
+             errors        = ?,
+             notes         = COALESCE(?, notes)
        WHERE id = ?;
-    """, (stats.get("scanned",0), stats.get("upserted",0), stats.get("atts",0), stats.get("errors",0), run_id))
+    """, (stats.get("scanned",0), stats.get("upserted",0), stats.get("atts",0), stats.get("errors",0),
+          _run_notes(stats), run_id))
 
 def get_item_id(cur, name: str) -> int:
     cur.execute("""
@@ -636,25 +1264,77 @@ def should_store_item(cur, name: str) -> bool:
     except Exception:
         return False
 
-def upsert_document(cur, source_id: int, doc_row: Dict[str,Any]):
+
+def load_item_projection(cur) -> "ItemProjection":
+    cur.execute("SELECT name FROM dbo.items WHERE notes_filter = 1 ORDER BY id")
+    return ItemProjection([r[0] for r in cur.fetchall() or []])
+
+# Large texts (documents.text_body, item_values.v_text) above this many UTF-8 bytes
+# are stored in the CAS as gzip blobs keyed by sha256 (notes_cas.store_text); SQL
+# keeps the hash and length only. 0 keeps everything inline.
+# Search over offloaded texts goes through the local notes_fts index (refresh_fulltext),
+# which reads them back from the CAS; a LIKE on text_body / v_text in the warehouse
+# only sees inline texts (and the 1024-char v_string prefix of offloaded values).
+TEXT_OFFLOAD_BYTES = int(os.environ.get("NOTES_TEXT_OFFLOAD_BYTES", str(32 * 1024)))
+
+def _offload_text(t: Optional[str]) -> Optional[Tuple[bytes, int]]:
+    """(sha256, byte length) once t is in the CAS; None when it stays inline."""
+    if not t or TEXT_OFFLOAD_BYTES <= 0 or len(t) * 4 <= TEXT_OFFLOAD_BYTES: return None
+    if len(t.encode("utf-8")) <= TEXT_OFFLOAD_BYTES: return None
+    return notes_cas.store_text(CAS_ROOT, t)
+
+def lazy_text(inline: Optional[str], sha256: Optional[bytes], length: Optional[int] = None):
+    """Inline text as is; offloaded text as a notes_cas.LazyText that reads the CAS on first use."""
+    if inline is not None or not sha256: return inline
+    return notes_cas.LazyText(CAS_ROOT, bytes(sha256), length)
+
+def document_text(cur, unid: str):
+    """documents.text_body for unid (str, LazyText or None)."""
+    cur.execute("SELECT text_body, text_hash, doc_size_bytes FROM dbo.documents WHERE unid = ?", (unid,))
+    row = cur.fetchone()
+    return lazy_text(row[0], row[1], row[2]) if row else None
+
+def item_value_text(cur, item_value_id: int):
+    """item_values.v_text for one value (str, LazyText or None)."""
+    cur.execute("SELECT v_text, v_text_sha256, v_text_len FROM dbo.item_values WHERE id = ?", (item_value_id,))
+    row = cur.fetchone()
+    return lazy_text(row[0], row[1], row[2]) if row else None
+
+# Summary rows only know a few view columns: on an existing document they fill in
+# note_id / subject / author and never replace form, dates, attachments or the body
+# that a full read wrote (form is only set while still NULL).
+_DOC_UPDATE_FULL = """
+         source_id=?, note_id=?, form=?, subject=?, author=?,
+         created_at=?, modified_at=?, has_attachments=?,
+         text_hash=?, text_body=?, doc_size_bytes=?, deleted_at=NULL"""
+_DOC_UPDATE_PARTIAL = """
+         note_id=COALESCE(?, tgt.note_id), form=COALESCE(tgt.form, ?),
+         subject=COALESCE(?, tgt.subject), author=COALESCE(?, tgt.author), deleted_at=NULL"""
+
+def upsert_document(cur, source_id: int, doc_row: Dict[str,Any], partial: bool = False):
+    """Insert or update a documents row; partial=True for summary (view column) rows."""
+    if _offload_text(doc_row.get("text_body")) is not None:
+        doc_row = {**doc_row, "text_body": None}     # text_hash / doc_size_bytes locate it in the CAS
+    WIDE_TOUCHED.add(doc_row["unid"]); FTS_TOUCHED.add(doc_row["unid"])
+    DOC_CACHE.discard(doc_row["unid"])
+    if partial:
+        update = (doc_row.get("note_id"), doc_row.get("form"), doc_row.get("subject"), doc_row.get("author"))
+    else:
+        update = (source_id, doc_row.get("note_id"), doc_row.get("form"), doc_row.get("subject"), doc_row.get("author"),
+                  doc_row.get("created_at"), doc_row.get("modified_at"), doc_row.get("has_attachments"),
+                  doc_row.get("text_hash"), doc_row.get("text_body"), doc_row.get("doc_size_bytes"))
     cur.execute("""
     MERGE dbo.documents AS tgt
     USING (SELECT ? AS unid) AS src
       ON tgt.unid = src.unid
-    WHEN MATCHED THEN UPDATE SET
-         source_id=?, note_id=?, form=?, subject=?, author=?,
-         created_at=?, modified_at=?, has_attachments=?,
-         text_hash=?, text_body=?, doc_size_bytes=?
+    WHEN MATCHED THEN UPDATE SET""" + (_DOC_UPDATE_PARTIAL if partial else _DOC_UPDATE_FULL) + """
     WHEN NOT MATCHED THEN INSERT
       (unid, source_id, note_id, form, subject, author, created_at, modified_at,
        has_attachments, text_hash, text_body, doc_size_bytes)
       VALUES
       (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
     """, (
-        doc_row["unid"],
-        source_id, doc_row.get("note_id"), doc_row.get("form"), doc_row.get("subject"), doc_row.get("author"),
-        doc_row.get("created_at"), doc_row.get("modified_at"), doc_row.get("has_attachments"),
-        doc_row.get("text_hash"), doc_row.get("text_body"), doc_row.get("doc_size_bytes"),
+        doc_row["unid"], *update,
         doc_row["unid"], source_id, doc_row.get("note_id"), doc_row.get("form"), doc_row.get("subject"),
         doc_row.get("author"), doc_row.get("created_at"), doc_row.get("modified_at"),
         doc_row.get("has_attachments"), doc_row.get("text_hash"), doc_row.get("text_body"),
@@ -700,10 +1380,24 @@ def get_or_create_item_value(cur, item_id: int, kind: str,
                              s: Optional[str]=None, t: Optional[str]=None,
                              n: Optional[float]=None, dt: Optional[datetime]=None,
                              b: Optional[int]=None, att_id: Optional[int]=None) -> int:
+    val_hash = _compute_val_hash(item_id, kind, s, t, n, dt, b, att_id)
+    ref = _offload_text(t)
+    if ref is not None:
+        # val_hash covers the full text, so it also finds an older inline copy
+        cur.execute("SELECT TOP 1 id FROM dbo.item_values WHERE item_id = ? AND val_kind = ? AND val_hash = ?",
+                    (item_id, kind, val_hash))
+        row = cur.fetchone()
+        if row: return int(row[0])
+        cur.execute("""
+          INSERT INTO dbo.item_values
+            (item_id, val_kind, val_hash, v_string, v_text_sha256, v_text_len, v_number, v_datetime, v_bool, v_bytes, attachment_id)
+          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?);
+          SELECT SCOPE_IDENTITY();
+        """, (item_id, kind, val_hash, s, ref[0], ref[1], n, dt, b, att_id))
+        return int(cur.fetchone()[0])
     existing = _select_existing_item_value(cur, item_id, kind, s, t, n, dt, b, att_id)
     if existing:
         return existing
-    val_hash = _compute_val_hash(item_id, kind, s, t, n, dt, b, att_id)
     cur.execute("""
       INSERT INTO dbo.item_values
         (item_id, val_kind, val_hash, v_string, v_text, v_number, v_datetime, v_bool, v_bytes, attachment_id)
@@ -731,6 +1425,11 @@ def insert_item_value(cur, unid: str, item_id: int, order_idx: int, kind: str,
     iv_id = get_or_create_item_value(cur, item_id, kind, s, t, n, dt, b, att_id)
     link_doc_item_value(cur, unid, item_id, order_idx, iv_id, is_summary=is_summary)
 
+
+def unlink_doc_items(cur, unid: str, item_ids: List[int]):
+    """Drop a document's stored values for these items, before they are written again."""
+    if not item_ids: return
+    cur.execute(f"DELETE FROM dbo.doc_item_values WHERE unid=? AND item_id IN ({_marks(len(item_ids))})", (unid, *item_ids))
 def insert_attachment(cur, row: Dict[str,Any]) -> Optional[int]:
     cur.execute("""
     MERGE dbo.attachments AS tgt
@@ -755,21 +1454,76 @@ def _canon_category_path(category_path: Optional[str]) -> Optional[str]:
     if not parts: return None
     return "\\".join(parts)
 
+class ViewDimensions:
+    """name -> id caches for the views and categories tables.
+
+    Missing rows are merged and committed on a pooled connection of their own,
+    never on the caller's: a spool file load or a sink flush stays one
+    transaction, and a cached id never refers to a row that the caller's
+    rollback takes away.
+    """
+    def __init__(self):
+        self.views: Dict[str, int] = {}
+        self.categories: Dict[str, int] = {}
+
+    def view_id(self, view_name: str) -> int:
+        vid = self.views.get(view_name)
+        if vid is None:
+            with sql_db() as con:
+                cur = con.cursor()
+                cur.execute("""
+                MERGE dbo.views AS tgt
+                USING (SELECT ? AS view_name) AS src ON tgt.view_name = src.view_name
+                WHEN NOT MATCHED THEN INSERT (view_name) VALUES (src.view_name);
+                """, (view_name,))
+                cur.execute("SELECT id FROM dbo.views WHERE view_name = ?", (view_name,))
+                vid = int(cur.fetchone()[0])
+            self.views[view_name] = vid
+        return vid
+
+    def category_id(self, category_path: Optional[str]) -> int:
+        """Id of the canonical path (0 when uncategorized); missing ancestors are created on the way."""
+        cat = _canon_category_path(category_path)
+        if not cat: return 0
+        cid = self.categories.get(cat)
+        if cid is not None: return cid
+        with sql_db() as con:
+            cur = con.cursor()
+            parent, path = 0, ""
+            for depth, name in enumerate(cat.split("\\")):
+                path = f"{path}\\{name}" if path else name
+                cid = self.categories.get(path)
+                if cid is None:
+                    cur.execute("""
+                    MERGE dbo.categories AS tgt
+                    USING (SELECT ? AS parent_id, ? AS name) AS src
+                      ON tgt.parent_id = src.parent_id AND tgt.name = src.name
+                    WHEN NOT MATCHED THEN INSERT (parent_id, name, path, depth)
+                         VALUES (src.parent_id, src.name, ?, ?);
+                    """, (parent, name[:255], path, depth))
+                    cur.execute("SELECT id FROM dbo.categories WHERE parent_id = ? AND name = ?", (parent, name[:255]))
+                    cid = int(cur.fetchone()[0])
+                    con.commit()
+                    self.categories[path] = cid
+                parent = cid
+        return cid
+
+VIEW_DIMS = ViewDimensions()
+
 def insert_document_view(cur, unid: str, view_name: str, category_path: Optional[str]):
-    cat  = _canon_category_path(category_path)
-    leaf = cat.split("\\")[-1] if cat else None
+    vid = VIEW_DIMS.view_id(view_name)
+    cid = VIEW_DIMS.category_id(category_path)
     cur.execute("""
     MERGE dbo.document_views AS tgt
-    USING (SELECT ? AS unid, ? AS view_name, ? AS category_path) AS src
-      ON tgt.unid = src.unid AND tgt.view_name = src.view_name AND (tgt.category_path = src.category_path OR (tgt.category_path IS NULL AND src.category_path IS NULL))
-    WHEN MATCHED THEN UPDATE SET leaf_category = ?
-    WHEN NOT MATCHED THEN INSERT (unid, view_name, category_path, leaf_category)
-         VALUES (src.unid, src.view_name, src.category_path, ?);
-    """, (unid, view_name, cat, leaf, leaf))
+    USING (SELECT ? AS unid, ? AS view_id, ? AS category_id) AS src
+      ON tgt.unid = src.unid AND tgt.view_id = src.view_id AND tgt.category_id = src.category_id
+    WHEN NOT MATCHED THEN INSERT (unid, view_id, category_id)
+         VALUES (src.unid, src.view_id, src.category_id);
+    """, (unid, vid, cid))
 
 # -------------------- CHECKPOINT HELPERS ------------------------
 
-def _sig_for_snapshot(rows: List[Tuple[str, Optional[str]]]) -> str:
+def _sig_for_snapshot(rows: Iterable[Tuple[str, Optional[str]]]) -> str:
     h = hashlib.sha256()
     for u, _ in rows:
         h.update((u or '').encode('utf-8')); h.update(b'\x00')
@@ -796,12 +1550,75 @@ def upsert_checkpoint(cur, plan_id: int, source_id: int, view_name: str,
          VALUES (src.plan_id, src.source_id, src.view_name, ?, ?, ?, SYSUTCDATETIME());
     """, (plan_id, source_id, view_name, snapshot_sig, next_index, last_unid, snapshot_sig, next_index, last_unid))
 
+
+def loaded_spool_sha256(cur, spool_file: str) -> Optional[str]:
+    """sha256 recorded when this spool file was loaded; None if it never was."""
+    cur.execute("SELECT sha256 FROM dbo.spool_loads WHERE spool_file = ?", (spool_file,))
+    r = cur.fetchone()
+    return None if r is None else (r[0] or "")
+
+def record_spool_load(cur, spool_file: str, sha256_hex: str, records: int):
+    cur.execute("INSERT INTO dbo.spool_loads(spool_file, sha256, records) VALUES (?,?,?)",
+                (spool_file, sha256_hex, records))
+
+
+# Dead letters: documents that failed in process_view_into_db, retried by --retry-failures
+FAILURE_MAX_ATTEMPTS   = int(os.environ.get("NOTES_FAILURE_MAX_ATTEMPTS", "8"))
+FAILURE_BACKOFF_MIN    = 15        # first retry after 15 min, doubling per attempt
+FAILURE_BACKOFF_MAX_MIN = 24 * 60
+
+def _failure_backoff_minutes(attempts: int) -> int:
+    return int(min(FAILURE_BACKOFF_MIN * 2 ** max(attempts - 1, 0), FAILURE_BACKOFF_MAX_MIN))
+
+def record_failure(cur, source_id: int, view_name: str, unid: str, category_path: Optional[str],
+                   error_class: str, message: str) -> int:
+    cur.execute("""SELECT attempts, CASE WHEN resolved_at IS NULL THEN 0 ELSE 1 END FROM dbo.etl_failures
+                   WHERE source_id = ? AND view_name = ? AND unid = ?""", (source_id, view_name, unid))
+    row = cur.fetchone()
+    attempts = int(row[0]) + 1 if row and not row[1] else 1
+    backoff = _failure_backoff_minutes(attempts)
+    cur.execute("""
+    MERGE dbo.etl_failures AS tgt
+    USING (SELECT ? AS source_id, ? AS view_name, ? AS unid) AS src
+      ON tgt.source_id = src.source_id AND tgt.view_name = src.view_name AND tgt.unid = src.unid
+    WHEN MATCHED THEN UPDATE SET category_path = ?, error_class = ?, message = ?, attempts = ?,
+         last_failed_at = SYSUTCDATETIME(), next_attempt_at = DATEADD(MINUTE, ?, SYSUTCDATETIME()),
+         resolved_at = NULL
+    WHEN NOT MATCHED THEN INSERT (source_id, view_name, unid, category_path, error_class, message, attempts, next_attempt_at)
+         VALUES (src.source_id, src.view_name, src.unid, ?, ?, ?, ?, DATEADD(MINUTE, ?, SYSUTCDATETIME()));
+    """, (source_id, view_name, unid,
+          category_path, error_class[:128], message[:1024], attempts, backoff,
+          category_path, error_class[:128], message[:1024], attempts, backoff))
+    return attempts
+
+def load_open_failures(cur, source_id: int, view_name: str) -> set:
+    cur.execute("""SELECT unid FROM dbo.etl_failures
+                   WHERE source_id = ? AND view_name = ? AND resolved_at IS NULL""", (source_id, view_name))
+    return {r[0] for r in cur.fetchall() or []}
+
+def resolve_failures(cur, source_id: int, view_name: str, unids: List[str]):
+    cur.executemany("""UPDATE dbo.etl_failures SET resolved_at = SYSUTCDATETIME()
+                       WHERE source_id = ? AND view_name = ? AND unid = ? AND resolved_at IS NULL""",
+                    [(source_id, view_name, u) for u in unids])
+
+def due_failures(cur, source_id: int) -> List[Tuple[str, str, Optional[str]]]:
+    cur.execute("""
+      SELECT view_name, unid, category_path FROM dbo.etl_failures
+      WHERE source_id = ? AND resolved_at IS NULL AND attempts < ? AND next_attempt_at <= SYSUTCDATETIME()
+      ORDER BY view_name, id
+    """, (source_id, FAILURE_MAX_ATTEMPTS))
+    return [(r[0], r[1], r[2]) for r in cur.fetchall() or []]
+
+def count_exhausted_failures(cur, source_id: int) -> int:
+    cur.execute("""SELECT COUNT(*) FROM dbo.etl_failures
+                   WHERE source_id = ? AND resolved_at IS NULL AND attempts >= ?""", (source_id, FAILURE_MAX_ATTEMPTS))
+    return int(cur.fetchone()[0] or 0)
+
 # ------------------------- PLAN-DRIVEN LAYER ---------------------------
 
 def open_database(server_name: str, filepath: str):
     filepath = filepath.replace('/', '\\')
-    session = win32com.client.Dispatch("Lotus.NotesSession")
-    session.Initialize(LOTUS_PASSWORD)
+    session = NOTES_POOL.session()
 
     def _get_db():
         db = session.GetDatabase(server_name, filepath)
@@ -848,62 +1665,142 @@ def open_database(server_name: str, filepath: str):
     log(f"[INFO] Opened LOCAL DB: {local_server}:{filepath}")
     return session, local_server, filepath, db3
 
+# ---------------------------- VIEW CATALOG -----------------------------
+# View names/aliases/UNIDs per (server, ReplicaID), persisted under CACHE_ROOT so
+# neither view selection nor reconnects have to enumerate notes_db.Views over COM.
+# Invalidated when the database reports view/folder design notes modified since
+# the marker stored with the catalog (NotesDatabase.GetModifiedDocuments).
+
+DBMOD_DOC_VIEW = 8
+
+def _view_design_changes(notes_db, since_text: str) -> Tuple[int, str]:
+    """(number of view/folder notes modified since since_text, server 'until' time as text)."""
+    since = notes_db.Parent.CreateDateTime(since_text)
+    coll = notes_db.GetModifiedDocuments(since, DBMOD_DOC_VIEW)
+    return int(coll.Count), str(coll.UntilTime.LocalTime)
+
+class ViewCatalog:
+    def __init__(self, server: str, replica_id: str, views: List[Dict[str, Any]]):
+        self.server = server
+        self.replica_id = replica_id
+        self.views = views
+        self._aliases = {v["name"]: v.get("aliases") or [] for v in views}
+
+    @property
+    def names(self) -> List[str]:
+        return [v["name"] for v in self.views]
+
+    def aliases_for(self, view_name: str) -> List[str]:
+        return list(self._aliases.get(view_name, []))
+
+def _view_catalog_path(server: str, replica_id: str) -> Path:
+    return CACHE_ROOT / "view_catalog" / f"{sanitize_folder_name(server or 'local')}_{replica_id}.json"
+
+def _list_view_catalog(notes_db) -> List[Dict[str, Any]]:
+    views: List[Dict[str, Any]] = []
+    for v in resilient_com(lambda: list(notes_db.Views)):
+        aliases = getattr(v, "Aliases", None) or []
+        if not isinstance(aliases, (list, tuple)): aliases = [aliases]
+        views.append(dict(
+            name=str(getattr(v, "Name", "") or ""),
+            aliases=[str(a) for a in aliases if a],
+            unid=str(getattr(v, "UniversalID", "") or "") or None,
+        ))
+    return views
+
+def load_view_catalog(notes_db, server: str) -> Optional[ViewCatalog]:
+    replica_id = str(getattr(notes_db, "ReplicaID", "") or "")
+    if not replica_id:
+        return None
+    path = _view_catalog_path(server, replica_id)
+    cached = _load_json_cache(path)
+    if cached and cached.get("design_until") and cached.get("views"):
+        try:
+            changed, until = resilient_com(_view_design_changes, notes_db, cached["design_until"])
+        except Exception as e:
+            log(f"[WARN] Could not check design changes ({e}); rebuilding view catalog")
+            changed, until = -1, None
+        if changed == 0:
+            cached["design_until"] = until
+            _save_json_cache(path, cached)
+            log(f"[INFO] View catalog cache hit: {len(cached['views'])} views ({path.name})")
+            return ViewCatalog(server, replica_id, cached["views"])
+        print("[INFO] View design changed since last run; rebuilding view catalog")
+
+    # Take the marker BEFORE listing, so a change made while listing invalidates next time.
+    try:
+        _, until = resilient_com(_view_design_changes, notes_db, "Today")
+    except Exception as e:
+        log(f"[WARN] No design marker available ({e}); view catalog will not be cached")
+        until = None
+    views = _list_view_catalog(notes_db)
+    if until:
+        _save_json_cache(path, dict(
+            server=server, replica_id=replica_id, design_until=until,
+            built_at=datetime.now(timezone.utc).isoformat(), views=views,
+        ))
+    return ViewCatalog(server, replica_id, views)
+
+def open_view_by_name(db, vname: str, catalog: Optional[ViewCatalog] = None):
+    for nm in [vname] + (catalog.aliases_for(vname) if catalog else []):
+        try:
+            v = db.GetView(nm)
+        except Exception:
+            v = None
+        if v:
+            return v
+    for v in list(db.Views):
+        if getattr(v, "Name", "") == vname:
+            return v
+    raise RuntimeError(f"View '{vname}' not found after reopen")
+
 def select_views_for_plan(notes_db, canon_targets: List[str], overrides_by_canon: Dict[str, Optional[str]],
-                          plan_id: Optional[int] = None, max_suggestions: int = 20) -> List[Any]:
-    all_views = list(notes_db.Views)
+                          plan_id: Optional[int] = None, max_suggestions: int = 20,
+                          catalog: Optional[ViewCatalog] = None, with_canon: bool = False) -> List[Any]:
+    if catalog is not None:
+        all_views = None; names: List[str] = catalog.names
+    else:
+        all_views = list(notes_db.Views); names = [getattr(v, "Name", "") or "" for v in all_views]
     print("[INFO] All available views in the database:")
-    for v in all_views:
-        print(f"  - {v.Name}")
-
-    decorated: List[Tuple[Any, str, str, str, str]] = []
-    for v in all_views:
-        full_raw = v.Name or ""
-        leaf_raw = _leaf(full_raw)
-        full_norm = _normalize(full_raw)
-        leaf_norm = _normalize(leaf_raw)
-        decorated.append((v, full_norm, leaf_norm, full_raw, leaf_raw))
+    for nm in names: print(f"  - {nm}")
 
     def is_excluded(vname: str) -> bool:
         low = (vname or "").lower().strip()
         return low.startswith(EXCLUDE_PREFIXES)
 
-    def prefer(curr: Optional[str], cand: str) -> bool:
-        if curr is None: return True
-        return ("english / anglais" not in (curr or "").lower()) and ("english / anglais" in cand.lower())
-
-    chosen: Dict[str, Any] = {}
-
-    for canon in canon_targets:
-        override_raw = overrides_by_canon.get(canon)
-        if override_raw:
-            needles = [_normalize(override_raw), (override_raw or "").lower()]
-        else:
-            needles = CONTAINS_MAP.get(canon, [canon.lower()])
+    def is_english(vname: str) -> int:
+        return 1 if "english / anglais" in (vname or "").lower() else 0
 
-        nn: List[str] = []
-        for n in needles:
-            if not isinstance(n, str): continue
-            n = " ".join(n.split()).strip()
-            if n: nn.append(n)
-        needles = nn
+    matcher = get_view_matcher(synonyms_for_plan(canon_targets, overrides_by_canon))
+    wanted = set(canon_targets)
 
-        if DEBUG: log(f"[DEBUG] Matching canon='{canon}' with needles={needles}")
+    # English/Anglais first, then distinct patterns hit, then leaf hit; earliest view breaks ties.
+    best: Dict[str, Tuple[Tuple[int, int, int, int], int]] = {}
+    for idx, full_raw in enumerate(names):
+        if is_excluded(full_raw): continue
+        for canon, (n_hits, leaf_hit) in matcher.hits(full_raw).items():
+            if canon not in wanted: continue
+            score = (is_english(full_raw), n_hits, leaf_hit, -idx)
+            if canon not in best or score > best[canon][0]:
+                best[canon] = (score, idx)
+    matcher.save()
 
-        for v, full_norm, leaf_norm, full_raw, leaf_raw in decorated:
-            if is_excluded(full_raw): continue
-            match = any((n in full_norm) or (n in leaf_norm) or (n in full_raw.lower()) or (n in leaf_raw.lower()) for n in needles)
-            if match:
-                already = chosen.get(canon)
-                if (already is None) or prefer(getattr(already, "Name", None), v.Name):
-                    chosen[canon] = v
+    chosen: Dict[str, Any] = {}
+    for canon, (_, idx) in best.items():
+        try:
+            chosen[canon] = all_views[idx] if all_views is not None else open_view_by_name(notes_db, names[idx], catalog)
+        except Exception as e:
+            print(f"[WARN] Could not open view '{names[idx]}' for '{canon}': {e}")
+    if DEBUG:
+        for canon in canon_targets:
+            if canon in best: log(f"[DEBUG] canon='{canon}' score={best[canon][0]}")
 
     targets = [v for v in (chosen.get(c) for c in canon_targets) if v is not None]
 
     if not targets:
         print("[WARN] None of the plan’s requested views were found by synonyms/overrides.")
         try:
-            all_names = [getattr(v, "Name", "") or "" for v in all_views]
-            show = all_names[:max_suggestions]
+            show = names[:max_suggestions]
             if show:
                 print("[INFO] Here are some visible view names (first {}):".format(len(show)))
                 for nm in show: print(f"  - {nm}")
@@ -920,8 +1817,33 @@ def select_views_for_plan(notes_db, canon_targets: List[str], overrides_by_canon
     for canon in canon_targets:
         v = chosen.get(canon)
         if v: print(f"  - {canon}  =>  {v.Name}")
+    if with_canon:
+        return [(c, chosen[c]) for c in canon_targets if c in chosen]
     return targets
 
+# ------------------------- SELECTION FORMULAS --------------------------
+# Optional @formulas on ingestion_plans / ingestion_plan_views, evaluated on the server
+# with NotesDatabase.Search; only matching notes are snapshotted and processed.
+
+def combine_selection_formulas(*formulas: Optional[str]) -> Optional[str]:
+    parts = [f.strip() for f in formulas if f and f.strip()]
+    if not parts: return None
+    return parts[0] if len(parts) == 1 else " & ".join(f"({p})" for p in parts)
+
+def search_documents(notes_db, formula: str):
+    """Server-side selection; returns a NotesDocumentCollection (no cutoff, no max)."""
+    return notes_db.Search(formula, None, 0)
+
+def _collection_unids(dc) -> ViewSnapshot:
+    """UNIDs of a document collection, packed (membership tests only)."""
+    unids = ViewSnapshot()
+    doc = resilient_com(dc.GetFirstDocument)
+    while doc:
+        unid = getattr(doc, "UniversalID", None)
+        if unid: unids.add(unid)
+        doc = resilient_com(dc.GetNextDocument, doc)
+    return unids
+
 # ---------------------------- PIPELINE --------------------------------
 
 def _iter_embedded_objects_collection(eos):
@@ -944,28 +1866,44 @@ def flatten_rich_text_item(item) -> str:
     except Exception:
         return ""
 
-def coerce_insert_item_values(cur, unid: str, item_name: str, values_any, is_rich: bool=False):
-    item_id = get_item_id(cur, item_name)
+def _text_row(v: Any, is_rich: bool) -> Tuple[str, Dict[str, Any]]:
+    if v is None: return 'unknown', {}
+    sv = str(v)
+    if len(sv) <= 1024: return ('richtext' if is_rich else 'string'), dict(s=sv)
+    return ('richtext' if is_rich else 'text'), dict(s=sv[:1024], t=sv)
+
+# Date shape (2024-01-31 or 20240131, time optional) checked before sniffing an untyped
+# value, since most of them are plain text and would only raise in fromisoformat()
+_ISO_DATE_RE = re.compile(r"\d{4}(?:-\d{2}-\d{2}|\d{4})(?:$|[T ])")
+
+def _untyped_row(v: Any, is_rich: bool) -> Tuple[str, Dict[str, Any]]:
+    if isinstance(v, bool): return 'bool', dict(b=int(v))
+    if isinstance(v, (int, float)): return 'number', dict(n=float(v))
+    dt = as_dt(v) if isinstance(v, datetime) or _ISO_DATE_RE.match(str(v)) else None
+    if dt is not None: return 'datetime', dict(dt=dt)
+    return _text_row(v, is_rich)
+
+def coerce_item_values(values_any, item_type: Optional[int] = None, is_rich: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Convert one item's value list to (kind, columns) rows in a single pass.
+    The branch is chosen once from NotesItem.Type; only untyped values fall back to sniffing.
+    pywintypes datetimes are datetime subclasses and are taken as-is.
+    """
     vals = list(values_any) if isinstance(values_any, (list, tuple)) else [values_any]
-    for idx, v in enumerate(vals):
-        if isinstance(v, bool):
-            insert_item_value(cur, unid, item_id, idx, 'bool', b=int(v))
-        elif isinstance(v, (int, float)):
-            insert_item_value(cur, unid, item_id, idx, 'number', n=float(v))
-        elif isinstance(v, datetime):
-            insert_item_value(cur, unid, item_id, idx, 'datetime', dt=as_dt(v))
-        else:
-            dt = as_dt(v)
-            if dt is not None:
-                insert_item_value(cur, unid, item_id, idx, 'datetime', dt=dt); continue
-            if v is None:
-                insert_item_value(cur, unid, item_id, idx, 'unknown')
-            else:
-                s = str(v)
-                if len(s) <= 1024:
-                    insert_item_value(cur, unid, item_id, idx, 'richtext' if is_rich else 'string', s=s)
-                else:
-                    insert_item_value(cur, unid, item_id, idx, 'richtext' if is_rich else 'text', s=s[:1024], t=s)
+    if is_rich or item_type == IT_RICHTEXT:
+        return [_text_row(v, True) for v in vals]
+    if item_type in TEXT_ITEM_TYPES:
+        return [_text_row(v, False) for v in vals]
+    if item_type == IT_NUMBERS:
+        return [('number', dict(n=float(v))) if isinstance(v, (int, float)) else _untyped_row(v, False) for v in vals]
+    if item_type == IT_DATETIMES:
+        return [('datetime', dict(dt=as_dt(v))) if isinstance(v, datetime) else _untyped_row(v, False) for v in vals]
+    return [_untyped_row(v, is_rich) for v in vals]
+
+def coerce_insert_item_values(cur, unid: str, item_name: str, values_any, is_rich: bool=False, item_type: Optional[int]=None):
+    item_id = get_item_id(cur, item_name)
+    for idx, (kind, cols) in enumerate(coerce_item_values(values_any, item_type, is_rich)):
+        insert_item_value(cur, unid, item_id, idx, kind, **cols)
 
 def extract_embedded_attachments_from_doc(doc, unid: str, tmp_dir: Path) -> List[Dict[str,Any]]:
     out: List[Dict[str,Any]] = []
@@ -1020,25 +1958,81 @@ def get_doc_text_body(doc) -> str:
                 if sv and len(sv) <= 4096: parts.append(f"{item.Name}: {sv}")
     return "\n".join(parts)
 
-def upsert_document_from_notes(doc, source_id: int, con, tmp_dir: Path, stats: Dict[str,int]) -> str:
+# ---------------------------- ITEM PROJECTION ----------------------------
+# Projected runs read only allow-listed items (items.notes_filter = 1) with GetFirstItem
+# instead of walking doc.Items; the documents columns below are always read.
+ITEM_PROJECTION_DEFAULT = os.environ.get("NOTES_ITEM_PROJECTION", "0") == "1"
+DOC_COLUMN_ITEMS = ("Form", "Subject", "Author", "From", "PostedBy")
+
+class ItemProjection:
+    def __init__(self, names: List[str]):
+        # $FILE can repeat per attachment, so it is linked via the attachment path instead.
+        self.names = [n for n in dict.fromkeys(names) if n and n.upper() != "$FILE"]
+        self.with_files = any((n or "").upper() == "$FILE" for n in names)
+
+    def __len__(self):
+        return len(self.names)
+
+def _has_embedded(doc) -> bool:
+    try:
+        return bool(doc.HasEmbedded)
+    except Exception:
+        return True
+
+def read_projected_items(doc, projection: ItemProjection) -> List[Tuple[str, Optional[int], bool, Any]]:
+    """(name, type, is_rich, text-or-values) for each allow-listed item present on doc."""
+    rows = []
+    for name in projection.names:
+        try:
+            item = doc.GetFirstItem(name)
+        except Exception:
+            item = None
+        if item is None: continue
+        itype = getattr(item, "Type", None)
+        is_rich = itype == IT_RICHTEXT or bool(getattr(item, "EmbeddedObjects", None)) or hasattr(item, "AppendText")
+        payload = flatten_rich_text_item(item) if is_rich else getattr(item, "Values", None)
+        rows.append((getattr(item, "Name", None) or name, itype, is_rich, payload))
+    return rows
+
+def _projected_doc_columns(doc, rows) -> Tuple[Any, Any, Any]:
+    """Form/Subject/Author from the projected rows, falling back to GetItemValue for the rest."""
+    got = {name.lower(): payload for name, _, is_rich, payload in rows if not is_rich}
+    first: Dict[str, Any] = {}
+    for name in DOC_COLUMN_ITEMS:
+        vals = got.get(name.lower())
+        if vals is None:
+            try: vals = doc.GetItemValue(name)
+            except Exception: vals = None
+        if vals:
+            first[name.lower()] = vals[0] if isinstance(vals, (list, tuple)) else vals
+    author = next((first[k] for k in ("author", "from", "postedby") if first.get(k) is not None), None)
+    return first.get("form"), first.get("subject"), author
+
+def upsert_document_from_notes(doc, source_id: int, con, tmp_dir: Path, stats: Dict[str,int],
+                               projection: Optional[ItemProjection]=None) -> str:
     cur = con.cursor()
     unid = getattr(doc, "UniversalID", None)
     if not unid: return ""
-    form = subject = author = None
-    for item in doc.Items:
-        nm = (getattr(item, "Name", "") or "").lower()
-        vals = getattr(item, "Values", None)
-        if not vals: continue
-        v0 = vals[0] if isinstance(vals, (list, tuple)) else vals
-        if subject is None and nm == "subject": subject = v0
-        if form    is None and nm == "form":    form    = v0
-        if author  is None and nm in ("author","from","postedby"): author = v0
+    projected = read_projected_items(doc, projection) if projection else None
+    if projected is not None:
+        form, subject, author = _projected_doc_columns(doc, projected)
+    else:
+        form = subject = author = None
+        for item in doc.Items:
+            nm = (getattr(item, "Name", "") or "").lower()
+            vals = getattr(item, "Values", None)
+            if not vals: continue
+            v0 = vals[0] if isinstance(vals, (list, tuple)) else vals
+            if subject is None and nm == "subject": subject = v0
+            if form    is None and nm == "form":    form    = v0
+            if author  is None and nm in ("author","from","postedby"): author = v0
 
     subject    = safe_str(subject, SUBJECT_MAX, "subject"); form = safe_str(form, FORM_MAX, "form"); author = safe_str(author, AUTHOR_MAX, "author")
     created_at, modified_at = get_doc_times(doc)
-    text_body = get_doc_text_body(doc)
+    text_body = get_doc_text_body(doc) if projected is None else notes_records.text_body(projected)
     text_hash = sha256_bytes(text_body.encode("utf-8")) if text_body else None
-    attachments_meta = extract_embedded_attachments_from_doc(doc, unid, tmp_dir)
+    embedded = projected is None or _has_embedded(doc)
+    attachments_meta = extract_embedded_attachments_from_doc(doc, unid, tmp_dir) if embedded else []
     has_atts = 1 if attachments_meta else 0
     note_id_hex = (str(getattr(doc, "NoteID", "") or "").strip() or None)
 
@@ -1050,16 +2044,21 @@ def upsert_document_from_notes(doc, source_id: int, con, tmp_dir: Path, stats: D
     )
     upsert_document(cur, source_id, doc_row); stats["upserted"] += 1
 
-    for item in doc.Items:
-        name = getattr(item, "Name", "UnknownItem")
-        if not should_store_item(cur, name): continue
-        is_rich = bool(getattr(item, "EmbeddedObjects", None)) or hasattr(item, "AppendText") or getattr(item, "Type", None) == 1
-        if is_rich:
-            txt = flatten_rich_text_item(item)
-            coerce_insert_item_values(cur, unid, name, txt, is_rich=True)
-        else:
-            vals = getattr(item, "Values", None)
-            if vals is not None: coerce_insert_item_values(cur, unid, name, vals, is_rich=False)
+    if projected is not None:
+        for name, itype, is_rich, payload in projected:
+            if payload is not None: coerce_insert_item_values(cur, unid, name, payload, is_rich=is_rich, item_type=itype)
+    else:
+        for item in doc.Items:
+            name = getattr(item, "Name", "UnknownItem")
+            if not should_store_item(cur, name): continue
+            itype = getattr(item, "Type", None)
+            is_rich = itype == IT_RICHTEXT or bool(getattr(item, "EmbeddedObjects", None)) or hasattr(item, "AppendText")
+            if is_rich:
+                txt = flatten_rich_text_item(item)
+                coerce_insert_item_values(cur, unid, name, txt, is_rich=True, item_type=itype)
+            else:
+                vals = getattr(item, "Values", None)
+                if vals is not None: coerce_insert_item_values(cur, unid, name, vals, is_rich=False, item_type=itype)
 
     att_ids_by_filename: Dict[str,int] = {}
     for meta in attachments_meta:
@@ -1067,25 +2066,275 @@ def upsert_document_from_notes(doc, source_id: int, con, tmp_dir: Path, stats: D
         if att_id: att_ids_by_filename[meta.get("filename") or ""] = att_id
         stats["atts"] += 1
 
-    for item in doc.Items:
-        if getattr(item, "Name", "") != "$FILE": continue
-        if not should_store_item(cur, "$FILE"): continue
-        item_id = get_item_id(cur, "$FILE")
-        vals = getattr(item, "Values", []) or []
-        if not isinstance(vals, (list, tuple)): vals = [vals]
-        for i, fn in enumerate(vals):
-            fn_s = str(fn); att_id = att_ids_by_filename.get(fn_s)
-            insert_item_value(cur, unid, item_id, i, 'string', s=fn_s, att_id=att_id)
+    if projected is None or (projection.with_files and embedded):
+        for item in doc.Items:
+            if getattr(item, "Name", "") != "$FILE": continue
+            if projected is None and not should_store_item(cur, "$FILE"): continue
+            item_id = get_item_id(cur, "$FILE")
+            vals = getattr(item, "Values", []) or []
+            if not isinstance(vals, (list, tuple)): vals = [vals]
+            for i, fn in enumerate(vals):
+                fn_s = str(fn); att_id = att_ids_by_filename.get(fn_s)
+                insert_item_value(cur, unid, item_id, i, 'string', s=fn_s, att_id=att_id)
 
     con.commit()
     return unid
 
-def snapshot_view_entries(view, category_col_idx: int = CATEGORY_COLUMN_INDEX, max_restarts: int = 5):
-    out: List[Tuple[str, Optional[str]]] = []
-    seen: set = set()
+# ------------------------------ DXL ENGINE ------------------------------
+# `--engine dxl`: each batch is exported with NotesDXLExporter to a temp file and
+# stream-parsed by notes_dxl; $FILE data is decoded straight into the CAS.
+EXTRACT_ENGINE = os.environ.get("NOTES_EXTRACT_ENGINE", "com")
+
+def export_dxl_batch(notes_db, unids: List[str], out_path: Path) -> int:
+    session = notes_db.Parent
+    dc = notes_db.CreateDocumentCollection()
+    for unid in unids:
+        try:
+            doc = notes_db.GetDocumentByUNID(unid)
+        except Exception as e:
+            if _is_transient_com_error(e): raise
+            doc = None
+        if doc: dc.AddDocument(doc)
+    exporter = session.CreateDXLExporter()
+    exporter.OutputDOCTYPE = False
+    try: exporter.UncompressAttachments = True  # 8.5.3+; compressed $FILE data is skipped by the parser
+    except Exception: pass
+    try:
+        stream = session.CreateStream()
+        stream.Open(str(out_path), "UTF-8"); stream.Truncate()
+        exporter.SetInput(dc); exporter.SetOutput(stream); exporter.Process()
+        stream.Close()
+    except Exception as e:
+        if _is_transient_com_error(e): raise
+        log(f"[DXL] Stream export unavailable ({e}); using Export()")
+        out_path.write_text(exporter.Export(dc), encoding="utf-8")
+    return int(dc.Count)
+
+def upsert_document_from_dxl(rec: "notes_dxl.DxlDocument", source_id: int, con, stats: Dict[str,int],
+                             projection: Optional[ItemProjection]=None, commit: bool=True, partial: bool=False) -> str:
+    """partial: rec is a view-column (summary) record; see upsert_document."""
+    cur = con.cursor()
+    if projection is not None:
+        allowed = {n.lower() for n in projection.names} | ({"$file"} if projection.with_files else set())
+        keep = lambda name: name.lower() in allowed
+    else:
+        keep = lambda name: should_store_item(cur, name)
+    mapped = notes_records.record_rows(rec, keep, body_from_all=projection is None)
+    upsert_document(cur, source_id, mapped.doc, partial=partial); stats["upserted"] += 1
+
+    for name, itype, is_rich, payload in mapped.items:
+        coerce_insert_item_values(cur, rec.unid, name, payload, is_rich=is_rich, item_type=itype)
+
+    att_ids_by_filename: Dict[str,int] = {}
+    for meta in rec.attachments:
+        att_id = insert_attachment(cur, meta)
+        if att_id: att_ids_by_filename[meta.get("filename") or ""] = att_id
+        stats["atts"] += 1
+    if mapped.files:
+        item_id = get_item_id(cur, "$FILE")
+        for i, fn in enumerate(mapped.files):
+            insert_item_value(cur, rec.unid, item_id, i, 'string', s=fn, att_id=att_ids_by_filename.get(fn))
+
+    if commit: con.commit()
+    return rec.unid
+
+# -------------------------------- SPOOL ---------------------------------
+# `--sink spool` (or `--spool`): extraction writes document records to SPOOL_ROOT
+# (notes_spool) instead of SQL; checkpoints then live next to the spool.
+# `--load-spool`: replays published spool files; each file is loaded in one transaction
+# together with its spool_loads row, so a file is applied exactly once.
+
+def read_all_items(doc) -> List[Tuple[str, Optional[int], bool, Any]]:
+    """(name, type, is_rich, text-or-values) for every item except $FILE."""
+    rows = []
+    for item in doc.Items:
+        name = getattr(item, "Name", "UnknownItem")
+        if name.upper() == "$FILE": continue
+        itype = getattr(item, "Type", None)
+        is_rich = itype == IT_RICHTEXT or bool(getattr(item, "EmbeddedObjects", None)) or hasattr(item, "AppendText")
+        payload = flatten_rich_text_item(item) if is_rich else getattr(item, "Values", None)
+        if payload is not None: rows.append((name, itype, is_rich, payload))
+    return rows
+
+def record_from_notes(doc, tmp_dir: Path, projection: Optional[ItemProjection]=None) -> "notes_dxl.DxlDocument":
+    """Read a NotesDocument into the record shape shared by the DXL engine and the spool."""
+    rec = notes_dxl.DxlDocument()
+    rec.unid = getattr(doc, "UniversalID", None)
+    rec.note_id = (str(getattr(doc, "NoteID", "") or "").strip() or None)
+    rec.created, rec.modified = get_doc_times(doc)
+    rec.items = read_projected_items(doc, projection) if projection else read_all_items(doc)
+    rec.form, rec.subject, rec.author = _projected_doc_columns(doc, rec.items)
+    embedded = _has_embedded(doc)
+    if embedded:
+        rec.attachments = extract_embedded_attachments_from_doc(doc, rec.unid, tmp_dir)
+        for item in doc.Items:
+            if getattr(item, "Name", "") != "$FILE": continue
+            vals = getattr(item, "Values", []) or []
+            rec.files.extend(str(v) for v in (vals if isinstance(vals, (list, tuple)) else [vals]))
+    return rec
+
+def load_spools(root: Path = SPOOL_ROOT, archive: bool = True) -> Dict[str, int]:
+    totals = dict(files=0, skipped=0, records=0, errors=0, mismatched=0)
+    files = notes_spool.pending_spool_files(root)
+    print(f"[INFO] {len(files)} spool file(s) pending under {root}")
+    for path in files:
+        key = f"{path.parent.name}/{path.name}"
+        with sql_db() as con:
+            loaded = loaded_spool_sha256(con.cursor(), key)
+            if loaded is not None:
+                # Already loaded: only archive it if it is still the file we loaded
+                digest = sha256_file(path).hex()
+                if loaded and loaded != digest:
+                    totals["mismatched"] += 1
+                    print(f"[WARN] Spool {key} was loaded with sha256 {loaded} but now hashes to {digest}; left in place")
+                    continue
+                totals["skipped"] += 1
+                if archive: notes_spool.archive_spool(path, root)
+                continue
+            counts = dict(records=0)
+            def _load_file():
+                counts["records"] = 0
+                stats = dict(upserted=0, atts=0)
+                sources: Dict[Tuple[str, str], int] = {}
+                hasher = hashlib.sha256()   # hashed while reading; no second pass over the file
+                for src, view_name, category_path, rec in notes_spool.read_spool(path, hasher):
+                    skey = (src.get("server_name"), src.get("filepath"))
+                    if skey not in sources:
+                        sources[skey] = get_or_create_source(con.cursor(), skey[0], skey[1], src.get("title"), src.get("replica_id"))
+                    upsert_document_from_dxl(rec, sources[skey], con, stats, commit=False)
+                    if view_name: insert_document_view(con.cursor(), rec.unid, view_name, category_path)
+                    counts["records"] += 1
+                record_spool_load(con.cursor(), key, hasher.hexdigest(), counts["records"])
+                con.commit()
+            try:
+                resilient_sql(con, _load_file)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                totals["errors"] += 1
+                print(f"[ERROR] Spool {key} not loaded: {e}")
+                continue
+        totals["files"] += 1; totals["records"] += counts["records"]
+        log(f"[INFO] Loaded spool {key}: {counts['records']} record(s)")
+        if archive: notes_spool.archive_spool(path, root)
+    if totals["records"]:
+        with sql_db() as con:
+            refresh_wide_tables(con)
+            refresh_fulltext(con)
+    print(f"[INFO] Spool load: {totals}")
+    return totals
+
+# -------------------------------- SINKS ---------------------------------
+# `--sink KIND` (repeatable) fans one walk out to several destinations (notes_sinks).
+# EavSink is this script's writer as a sink: its own connection, its own batches (records
+# are buffered and replayed as one retryable transaction per flush) and its own
+# etl_checkpoints rows, keyed by this database's plan and source ids.
+
+def find_plan_id(cur, server_name: Optional[str], filepath: Optional[str]) -> Optional[int]:
+    cur.execute("SELECT id FROM dbo.ingestion_plans WHERE server_name = ? AND filepath = ?", (server_name, filepath))
+    r = cur.fetchone()
+    return int(r[0]) if r else None
+
+class EavSink(notes_sinks.RecordSink):
+    name = "fabric"
+    fatal_errors = (RetryBudgetExhausted,)
+
+    def __init__(self, batch_size: int = 0):
+        super().__init__(batch_size)
+        ensure_schema()
+        self._stack = ExitStack()
+        self.con = self._stack.enter_context(sql_db())
+        self.source_id: Optional[int] = None
+        self.plan_id: Optional[int] = None
+        self.checkpointing = False
+        self.snapshot_sig: Optional[str] = None
+        self.buffer: List[Tuple[Any, str, Optional[str]]] = []
+        self.stats = dict(upserted=0, atts=0)
+        self.errors = 0
+
+    def open_source(self, source):
+        self.errors = 0
+        def _open():
+            cur = self.con.cursor()
+            self.source_id = get_or_create_source(cur, source["server_name"], source["filepath"],
+                                                  source.get("title"), source.get("replica_id"))
+            self.plan_id = find_plan_id(cur, source.get("plan_server"), source.get("plan_filepath"))
+            self.con.commit()
+        resilient_sql(self.con, _open)
+        if self.plan_id is None:
+            print(f"[WARN] {self.name}: no ingestion plan for {source.get('plan_server')}:{source.get('plan_filepath')}; not checkpointing")
+
+    def begin_view(self, plan_id, view_name, snapshot_sig):
+        self.snapshot_sig = snapshot_sig
+        self.checkpointing = plan_id is not None and self.plan_id is not None
+        if not self.checkpointing: return 0
+        ckpt = resilient_sql(self.con, lambda: load_checkpoint(self.con.cursor(), self.plan_id, self.source_id, view_name))
+        return ckpt["next_index"] if ckpt and ckpt["snapshot_sig"] == snapshot_sig else 0
+
+    def write(self, rec, view_name, category_path):
+        self.buffer.append((rec, view_name, category_path))
+
+    def _apply(self, counts: Dict[str,int], view_name: str, next_index: int, last_unid: Optional[str]) -> Tuple[int, int]:
+        written = failed = 0
+        for rec, vname, category_path in self.buffer:
+            try:
+                if upsert_document_from_dxl(rec, self.source_id, self.con, counts, commit=False):
+                    insert_document_view(self.con.cursor(), rec.unid, vname, category_path)
+                    written += 1
+            except Exception as e:
+                if _is_transient_sql_error(e): raise
+                failed += 1
+                print(f"[WARN] {self.name}: skipping UNID {rec.unid}: {e}")
+        if self.checkpointing:
+            upsert_checkpoint(self.con.cursor(), self.plan_id, self.source_id, view_name, self.snapshot_sig, next_index, last_unid)
+        self.con.commit()
+        return written, failed
+
+    def flush(self, view_name, next_index, last_unid):
+        written, failed = resilient_sql_counted(self.con, self.stats, self._apply, view_name, next_index, last_unid)
+        self.written += written; self.errors += failed
+        self.buffer = []
+
+    def close(self):
+        self.buffer = []
+        try:
+            refresh_wide_tables(self.con)
+            refresh_fulltext(self.con)
+        finally:
+            self._stack.close()
+
+    def describe(self):
+        return f"{self.name}={self.written}" + (f" ({self.errors} failed)" if self.errors else "")
+
+def build_sinks(kinds: List[str], batch_specs: Optional[List[str]] = None) -> notes_sinks.SinkFanout:
+    batch_sizes: Dict[str, int] = {}
+    for spec in batch_specs or []:
+        kind, _, n = spec.partition("=")
+        batch_sizes[kind.strip()] = int(n)
+    return notes_sinks.build_sinks(kinds, EavSink.name, EavSink, Path(__file__).resolve().parent,
+                                   SPOOL_ROOT, FILES_ROOT, CAS_ROOT, batch_sizes)
+
+def _category_path_from_columns(cols, category_col_idx: int = CATEGORY_COLUMN_INDEX) -> Optional[str]:
+    raw = str(cols[category_col_idx]).strip() if len(cols) > category_col_idx else ""
+    parts = [sanitize_folder_name(p.strip()) for p in raw.split("\\") if p.strip()] if raw else []
+    return "\\".join(parts) if parts else None
+
+def snapshot_view_entries(view, category_col_idx: int = CATEGORY_COLUMN_INDEX, max_restarts: int = 5,
+                          selection=None) -> ViewSnapshot:
+    out = ViewSnapshot()
+    keep: Optional[ViewSnapshot] = None  # client-side fallback when Intersect is unavailable
 
     def _get_entries():
-        return view.AllEntries
+        nonlocal keep
+        entries = view.AllEntries
+        if selection is not None and keep is None:
+            try:
+                entries.Intersect(selection)
+            except Exception as e:
+                if _is_transient_com_error(e): raise
+                log(f"[WARN] ViewEntryCollection.Intersect unavailable ({e}); filtering by UNID")
+                keep = _collection_unids(selection)
+        return entries
 
     restarts = 0
     entries = resilient_com(_get_entries)
@@ -1097,22 +2346,17 @@ def snapshot_view_entries(view, category_col_idx: int = CATEGORY_COLUMN_INDEX, m
                 doc = resilient_com(lambda e=entry: e.Document)
                 if doc:
                     unid = getattr(doc, "UniversalID", None)
-                    if unid and unid not in seen:
+                    if unid and unid not in out and (keep is None or unid in keep):
                         try:
                             cols = resilient_com(lambda e=entry: e.ColumnValues) or []
                         except Exception:
                             cols = []
-                        raw = str(cols[category_col_idx]).strip() if len(cols) > category_col_idx else ""
-                        category_path = None
-                        if raw:
-                            parts = [sanitize_folder_name(p.strip()) for p in raw.split("\\") if p.strip()]
-                            if parts:
-                                category_path = "\\".join(parts)
-                        out.append((unid, category_path))
-                        seen.add(unid)
+                        out.add(unid, _category_path_from_columns(cols, category_col_idx))
 
             entry = resilient_com(entries.GetNextEntry, entry)
 
+        except RetryBudgetExhausted:
+            raise
         except Exception as e:
             if _is_transient_com_error(e) and restarts < max_restarts:
                 restarts += 1
@@ -1122,98 +2366,1092 @@ def snapshot_view_entries(view, category_col_idx: int = CATEGORY_COLUMN_INDEX, m
                     entry = resilient_com(entries.GetFirstEntry)
                 except Exception:
                     print(f"[WARN] Failed to restart; proceeding with snapshot of {len(out)} entries.")
+                    out.complete = False
                     break
                 continue
             print(f"[WARN] Snapshot aborted after {len(out)} entries due to error: {e}")
+            out.complete = False
             break
 
     return out
 
+# ---------------------------- SNAPSHOT CACHE ----------------------------
+# Snapshots persist per (source, view) under CACHE_ROOT with the view's EntryCount,
+# design LastModified and the database's LastModified. Unchanged markers -> reused as is.
+# Data-only changes -> refreshed from GetModifiedDocuments(since): each changed UNID is
+# removed and, if the selection formula still matches, appended with its new category.
+# Positions of untouched entries never move, so the cached signature (and any checkpoint
+# against it) stays valid and changed documents land in the unprocessed tail. The holes
+# count against NOTES_SNAPSHOT_REFRESH_MAX too, and a walk that starts at index 0 anyway
+# compacts them away under a new signature (see process_view_into_db).
+
+SNAPSHOT_CACHE = os.environ.get("NOTES_SNAPSHOT_CACHE", "1").lower() not in ("0", "false", "no")
+SNAPSHOT_REFRESH_MAX = float(os.environ.get("NOTES_SNAPSHOT_REFRESH_MAX", "0.2"))  # changed/total before a full re-walk
+SNAPSHOT_SINCE_MARGIN_MIN = 60  # client/server clock skew allowance for the first `since`
+
+_UNEVALUABLE_SELECTION = re.compile(r"@AllDescendants|@AllChildren|@DeleteDocument|:=", re.I)
+_SELECT_PREFIX = re.compile(r"^\s*SELECT\s+", re.I)
+
+class SelectionFailed(RuntimeError):
+    """The plan/view selection formula could not be searched; the view is skipped."""
+
+def _snapshot_cache_path(source_id: int, view_name: str) -> Path:
+    return CACHE_ROOT / "view_snapshots" / f"{source_id}_{hashlib.sha1(view_name.encode('utf-8')).hexdigest()[:16]}.snap"
+
+def save_cached_snapshot(source_id: int, view_name: str, snap: ViewSnapshot, meta: Dict[str, Any]):
+    try:
+        snap.save(_snapshot_cache_path(source_id, view_name), meta)
+    except OSError as e:
+        log(f"[WARN] Snapshot cache not written: {e}")
+
+def _search_selection(notes_db, selection_formula: Optional[str]):
+    """NotesDocumentCollection for the formula (None without one); only needed when the view is walked."""
+    if not selection_formula: return None
+    try:
+        selection = resilient_com(search_documents, notes_db, selection_formula)
+    except RetryBudgetExhausted:
+        raise
+    except Exception as e:
+        raise SelectionFailed(str(e)) from e
+    print(f"[INFO]   Selection formula matched {resilient_com(lambda: selection.Count)} document(s)")
+    return selection
+
+def _com_attr(obj, attr: str) -> Any:
+    try:
+        return resilient_com(lambda: getattr(obj, attr))
+    except RetryBudgetExhausted:
+        raise
+    except Exception:
+        return None
+
+def _view_markers(notes_db, view, selection_formula: Optional[str]) -> Optional[Dict[str, Any]]:
+    count = _com_attr(view, "EntryCount")
+    view_mod, db_mod = as_dt(_com_attr(view, "LastModified")), as_dt(_com_attr(notes_db, "LastModified"))
+    if count is None or view_mod is None or db_mod is None: return None
+    return dict(entry_count=int(count), db_modified=db_mod.isoformat(),
+                design=dict(view_modified=view_mod.isoformat(), selection=selection_formula or "",
+                            category_col=CATEGORY_COLUMN_INDEX))
+
+def _view_selection_test(view, selection_formula: Optional[str]) -> Optional[str]:
+    """@If(...; 1; 0) formula equivalent to the view's SELECT (and the plan formula); None if not evaluable per document."""
+    raw = (_com_attr(view, "SelectionFormula") or "").strip()
+    parts = [_SELECT_PREFIX.sub("", raw).rstrip(";").strip() or "@All"]
+    if selection_formula: parts.append(selection_formula)
+    if any(_UNEVALUABLE_SELECTION.search(p) for p in parts): return None
+    return "@If(" + " & ".join(f"({p})" for p in parts) + "; 1; 0)"
+
+def _category_formula(view, category_col_idx: int = CATEGORY_COLUMN_INDEX) -> Optional[str]:
+    for pos, col in enumerate(_com_attr(view, "Columns") or []):
+        if int(getattr(col, "ColumnValuesIndex", pos) or 0) != category_col_idx: continue
+        return (getattr(col, "Formula", "") or "").strip() or (getattr(col, "ItemName", "") or "").strip() or None
+    return None
+
+def refresh_view_snapshot(notes_db, view, snap: ViewSnapshot, since_text: str,
+                          selection_formula: Optional[str]=None) -> Optional[Tuple[int, str]]:
+    """Apply changes since since_text in place; (changed, next since) or None when a full walk is needed."""
+    test = _view_selection_test(view, selection_formula)
+    if test is None: return None
+    session = notes_db.Parent
+    since = resilient_com(session.CreateDateTime, since_text)
+    changed = resilient_com(notes_db.GetModifiedDocuments, since)
+    n = resilient_com(lambda: changed.Count)
+    if n + snap.holes > SNAPSHOT_REFRESH_MAX * max(snap.live, 1): return None
+    cat_formula = _category_formula(view)
+    doc = resilient_com(changed.GetFirstDocument)
+    while doc:
+        unid = getattr(doc, "UniversalID", None)
+        if unid:
+            snap.remove(unid)
+            live = not getattr(doc, "IsDeleted", False) and getattr(doc, "IsValid", True)
+            if live and (resilient_com(session.Evaluate, test, doc) or [0])[0] == 1:
+                cat = None
+                if cat_formula:
+                    vals = resilient_com(session.Evaluate, cat_formula, doc) or [""]
+                    cat = _category_path_from_columns([None] * CATEGORY_COLUMN_INDEX + [vals[0]])
+                snap.add(unid, cat)
+        doc = resilient_com(changed.GetNextDocument, doc)
+    return n, resilient_com(lambda: changed.UntilTime.LocalTime)
+
+def cached_view_snapshot(notes_db, view, source_id: int,
+                         selection_formula: Optional[str]=None) -> Tuple[ViewSnapshot, str, Optional[Dict[str, Any]]]:
+    """(snapshot, signature, cache meta): reused or refreshed from the on-disk cache when possible,
+    else a full walk (the only path that runs the selection search). Meta is None when not cached."""
+    view_name = getattr(view, "Name", "UnknownView")
+    path = _snapshot_cache_path(source_id, view_name)
+    markers = _view_markers(notes_db, view, selection_formula) if SNAPSHOT_CACHE and source_id is not None else None
+    if markers is not None:
+        got = ViewSnapshot.load(path)
+        if got is not None and got[1].get("design") == markers["design"]:
+            snap, meta = got
+            if (meta.get("db_modified"), meta.get("entry_count")) == (markers["db_modified"], markers["entry_count"]):
+                print(f"[INFO]   Snapshot reused from cache: {snap.live} entries")
+                return snap, meta["sig"], meta
+            try:
+                refreshed = refresh_view_snapshot(notes_db, view, snap, meta["since"], selection_formula)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                log(f"[WARN] Snapshot refresh failed ({e}); walking the view")
+                refreshed = None
+            if refreshed is not None:
+                changed, since = refreshed
+                meta = dict(markers, sig=meta["sig"], since=since)
+                save_cached_snapshot(source_id, view_name, snap, meta)
+                print(f"[INFO]   Snapshot refreshed from cache: {changed} changed document(s), {snap.live} entries")
+                return snap, meta["sig"], meta
+
+    since = None
+    if markers is not None:
+        start = resilient_com(notes_db.Parent.CreateDateTime, "Today")
+        start.SetNow(); start.AdjustMinute(-SNAPSHOT_SINCE_MARGIN_MIN)
+        since = start.LocalTime
+    snap = snapshot_view_entries(view, selection=_search_selection(notes_db, selection_formula))
+    sig = _sig_for_snapshot(snap)
+    print(f"[INFO]   Snapshot captured: {len(snap)} entries, {snap.categories} categories")
+    meta = None
+    if since is not None and snap.complete:
+        meta = dict(markers, sig=sig, since=since)
+        save_cached_snapshot(source_id, view_name, snap, meta)
+    return snap, sig, meta
+
+# ----------------------------- TOMBSTONES -----------------------------
+# After a complete walk the fresh snapshot is the view's membership. Stored
+# document_views rows for (source, view) that it no longer holds are dropped in
+# one pass (hash anti-join against the snapshot), and documents left in no view
+# at all get documents.deleted_at. A later upsert clears the mark again.
+
+TOMBSTONE_MAX_FRACTION = float(os.environ.get("NOTES_TOMBSTONE_MAX_FRACTION", "0.5"))  # larger drops are refused
+PURGE_TOMBSTONED = os.environ.get("NOTES_PURGE_TOMBSTONED", "0") == "1"                # also delete their doc_item_values
+TOMBSTONE_CHUNK = 1000
+
+def _chunks(seq: List[Any], n: int = TOMBSTONE_CHUNK) -> Iterable[List[Any]]:
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _marks(n: int) -> str:
+    return ",".join(["?"] * n)
+
+def stale_view_rows(cur, source_id: int, view_name: str, snapshot: ViewSnapshot) -> Tuple[List[int], List[str], int]:
+    """(document_views ids, their UNIDs, rows scanned) for stored membership the snapshot no longer has."""
+    cur.execute("""
+      SELECT dv.id, dv.unid, dv.category_id FROM dbo.document_views dv
+      JOIN dbo.documents d ON d.unid = dv.unid
+      WHERE d.source_id = ? AND dv.view_id = ?
+    """, (source_id, VIEW_DIMS.view_id(view_name)))
+    rows = cur.fetchall() or []
+    ids, unids, seen = [], [], 0
+    for row_id, unid, cat in rows:
+        seen += 1
+        pos = snapshot.index_of(unid)
+        if pos >= 0 and VIEW_DIMS.category_id(snapshot.category_at(pos)) == cat: continue
+        ids.append(row_id); unids.append(unid)
+    return ids, list(dict.fromkeys(unids)), seen
+
+def unlink_view_rows(cur, ids: List[int]):
+    for chunk in _chunks(ids):
+        cur.execute(f"DELETE FROM dbo.document_views WHERE id IN ({_marks(len(chunk))})", chunk)
+
+def tombstone_orphans(cur, unids: List[str]) -> List[str]:
+    """Set deleted_at on the given documents that are no longer in any view; returns those UNIDs."""
+    gone: List[str] = []
+    for chunk in _chunks(unids):
+        marks = _marks(len(chunk))
+        cur.execute(f"""
+          SELECT d.unid FROM dbo.documents d
+          WHERE d.unid IN ({marks}) AND d.deleted_at IS NULL
+            AND NOT EXISTS (SELECT 1 FROM dbo.document_views dv WHERE dv.unid = d.unid)
+        """, chunk)
+        found = [r[0] for r in cur.fetchall() or []]
+        if not found: continue
+        cur.execute(f"UPDATE dbo.documents SET deleted_at = SYSUTCDATETIME() WHERE unid IN ({_marks(len(found))})", found)
+        gone.extend(found)
+    WIDE_TOUCHED.update(gone); FTS_TOUCHED.update(gone)
+    return gone
+
+def purge_doc_item_values(cur, unids: List[str]):
+    for chunk in _chunks(unids):
+        cur.execute(f"DELETE FROM dbo.doc_item_values WHERE unid IN ({_marks(len(chunk))})", chunk)
+
+def reconcile_view_membership(con, source_id: int, view_name: str, snapshot: ViewSnapshot, stats: Dict[str,int]):
+    """Set difference between stored and fresh membership of one view; only call after a complete walk."""
+    def _apply():
+        cur = con.cursor()
+        ids, unids, seen = stale_view_rows(cur, source_id, view_name, snapshot)
+        if not ids: return 0, 0
+        if len(ids) > TOMBSTONE_MAX_FRACTION * seen and len(ids) > 10:
+            print(f"[WARN]   {len(ids)} of {seen} stored memberships missing from '{view_name}'; "
+                  f"above NOTES_TOMBSTONE_MAX_FRACTION, nothing removed")
+            return 0, 0
+        unlink_view_rows(cur, ids)
+        gone = tombstone_orphans(cur, unids)
+        if gone and PURGE_TOMBSTONED:
+            purge_doc_item_values(cur, gone)
+        con.commit()
+        return len(ids), len(gone)
+    unlinked, gone = resilient_sql(con, _apply)
+    if unlinked:
+        stats["unlinked"] = stats.get("unlinked", 0) + unlinked
+        stats["tombstoned"] = stats.get("tombstoned", 0) + gone
+        print(f"[INFO]   Membership: {unlinked} stale view row(s) removed, {gone} document(s) tombstoned")
+
 def process_view_into_db(notes_db, view, source_id: int, con, stats: Dict[str,int],
                          plan_id: Optional[int]=None, batch_size: int=50,
-                         reopen_ctx: Optional[NotesReopenContext]=None):
+                         reopen_ctx: Optional[NotesReopenContext]=None,
+                         batch_sizer: Optional[AdaptiveBatchSizer]=None,
+                         projection: Optional[ItemProjection]=None,
+                         selection_formula: Optional[str]=None, engine: str="com",
+                         sinks: Optional[notes_sinks.SinkFanout]=None,
+                         snapshot: Optional[ViewSnapshot]=None):
     tmp_dir = Path(tempfile.mkdtemp(prefix="notes_tmp_"))
     view_name = getattr(view, "Name", "UnknownView")
     try:
         print(f"[INFO] → View '{view_name}'")
 
-        snapshot = snapshot_view_entries(view)
-        print(f"[INFO]   Snapshot captured: {len(snapshot)} entries")
-        snapshot_sig = _sig_for_snapshot(snapshot)
+        reconcile = snapshot is None and sinks is None
+        cache_meta = None
+        if snapshot is None:
+            try:
+                snapshot, snapshot_sig, cache_meta = cached_view_snapshot(notes_db, view, source_id, selection_formula)
+            except SelectionFailed as e:
+                stats["errors"] += 1
+                print(f"[ERROR] Selection formula failed for '{view_name}'; view skipped: {e}")
+                return
+        else:
+            snapshot_sig = _sig_for_snapshot(snapshot)
 
-        cur = con.cursor()
         ckpt = None
-        if plan_id is not None:
-            ckpt = load_checkpoint(cur, plan_id, source_id, view_name)
+        if sinks is not None:
+            ckpt = dict(next_index=sinks.begin_view(plan_id, view_name, snapshot_sig))
+        elif plan_id is not None:
+            ckpt = load_checkpoint(con.cursor(), plan_id, source_id, view_name)
             if ckpt and ckpt["snapshot_sig"] != snapshot_sig:
                 print("[INFO] View membership changed; restarting index at 0")
                 ckpt = None
 
         next_idx = (ckpt["next_index"] if ckpt else 0)
+        if cache_meta is not None and snapshot.holes and next_idx == 0 and (sinks is None or not any(sinks.resume.values())):
+            # Walking from 0 anyway, so positions may move: drop the holes refreshes left
+            holes = snapshot.holes
+            snapshot = snapshot.compacted()
+            snapshot_sig = _sig_for_snapshot(snapshot)
+            save_cached_snapshot(source_id, view_name, snapshot, dict(cache_meta, sig=snapshot_sig))
+            if sinks is not None: sinks.begin_view(plan_id, view_name, snapshot_sig)
+            print(f"[INFO]   Snapshot compacted: {holes} hole(s) dropped")
         total = len(snapshot)
+        last_unid = None
+        open_failures = set() if con is None else resilient_sql(con, lambda: load_open_failures(con.cursor(), source_id, view_name))
+        resolved: List[str] = []
+
+        def _record_failure(unid: str, category_path: Optional[str], error_class: str, message: str):
+            record_failure(con.cursor(), source_id, view_name, unid, category_path, error_class, message)
+            con.commit()
+
+        def _fail(unid: str, category_path: Optional[str], err: BaseException, quiet: bool = False):
+            """Count, report and dead-letter one document (see --retry-failures)."""
+            stats["errors"] += 1
+            if not quiet: print(f"[WARN] Skipping UNID {unid}: {err}")
+            if con is None: return      # offline sink run: nowhere to dead-letter it
+            try:
+                resilient_sql(con, _record_failure, unid, category_path, type(err).__name__, str(err))
+                open_failures.add(unid)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                log(f"[WARN] Could not record failure for {unid}: {e}")
+
+        def _ok(unid: str):
+            if unid in open_failures: resolved.append(unid)
+
+        def _resolve():
+            resolve_failures(con.cursor(), source_id, view_name, resolved)
+            con.commit()
+
+        def _store_doc(counts: Dict[str,int], doc, category_path: Optional[str]):
+            upserted_unid = upsert_document_from_notes(doc, source_id, con, tmp_dir, counts, projection)
+            if upserted_unid:
+                insert_document_view(con.cursor(), upserted_unid, view_name, category_path)
+                con.commit()
+
+        def _current_db():
+            return reopen_ctx.notes_db if reopen_ctx.notes_db is not None else notes_db
 
         def _get_doc(unid: str):
-            return notes_db.GetDocumentByUNID(unid)
+            return _current_db().GetDocumentByUNID(unid)
+
+        def _store_record(counts: Dict[str,int], rec, category_path: Optional[str]):
+            if upsert_document_from_dxl(rec, source_id, con, counts, projection):
+                insert_document_view(con.cursor(), rec.unid, view_name, category_path)
+                con.commit()
+
+        def _store_batch_dxl(batch, base_index: int):
+            cats = dict(batch)
+            positions = {u: pos for pos, u, _ in batch.items()}
+            dxl_path = tmp_dir / "batch.dxl"
+            try:
+                resilient_com_with_reopen(lambda: export_dxl_batch(_current_db(), list(cats), dxl_path), reopen_ctx)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                print(f"[WARN] DXL export failed; skipping {len(cats)} document(s): {e}")
+                for u, cat in cats.items(): _fail(u, cat, e, quiet=True)
+                return
+            done: set = set()
+            try:
+                for rec in notes_dxl.iter_dxl_file(dxl_path, CAS_ROOT):
+                    try:
+                        if sinks is not None:
+                            failures = sinks.write(positions.get(rec.unid, base_index), rec, view_name, cats.get(rec.unid))
+                            if failures: raise failures[0][1]
+                        else:
+                            resilient_sql_counted(con, stats, _store_record, rec, cats.get(rec.unid))
+                        stats["scanned"] += 1
+                        _ok(rec.unid)
+                    except RetryBudgetExhausted:
+                        raise
+                    except Exception as e:
+                        _fail(rec.unid, cats.get(rec.unid), e)
+                    done.add(rec.unid)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                print(f"[WARN] DXL parse failed after {len(done)} document(s): {e}")
+            finally:
+                try: dxl_path.unlink()
+                except OSError: pass
+            missing = [u for u in cats if u not in done]
+            if missing:
+                print(f"[WARN] {len(missing)} UNID(s) missing from DXL export (first: {missing[0]})")
+                for u in missing: _fail(u, cats.get(u), LookupError("missing from DXL export"), quiet=True)
 
         if reopen_ctx is None:
             def _open_db_again():
                 return notes_db
-            def _get_view_again(db, vname):
-                all_views = list(db.Views)
-                for v in all_views:
-                    if getattr(v, "Name", "") == vname:
-                        return v
-                raise RuntimeError(f"View '{vname}' not found after reopen")
-            reopen_ctx = NotesReopenContext(_open_db_again, _get_view_again, view_name=view_name)
+            reopen_ctx = NotesReopenContext(_open_db_again, open_view_by_name, view_name=view_name)
 
         while next_idx < total:
-            end = min(next_idx + batch_size, total)
+            size = batch_sizer.next_size() if batch_sizer else batch_size
+            end = min(next_idx + size, total)
             batch = snapshot[next_idx:end]
+            t_batch = time.monotonic()
+            errs_before = reopen_ctx.transient_errors
 
             resilient_com_with_reopen(lambda: getattr(view, "Name"), reopen_ctx)
 
-            for (unid, category_path) in batch:
-                try:
-                    doc = resilient_com_with_reopen(lambda u=unid: _get_doc(u), reopen_ctx)
-                    if not doc:
-                        stats["errors"] += 1
-                        print(f"[WARN] Skipping UNID {unid}: not found")
-                        continue
-
-                    upserted_unid = upsert_document_from_notes(doc, source_id, con, tmp_dir, stats)
-                    if upserted_unid:
-                        insert_document_view(con.cursor(), upserted_unid, view_name, category_path)
-                    stats["scanned"] += 1
-
-                except Exception as e:
-                    stats["errors"] += 1
-                    print(f"[WARN] Skipping UNID {unid} due to error: {e}")
-
-            con.commit()
+            if engine == "dxl":
+                _store_batch_dxl(batch, next_idx)
+            else:
+                for pos, unid, category_path in batch.items():
+                    try:
+                        doc = resilient_com_with_reopen(lambda u=unid: _get_doc(u), reopen_ctx)
+                        if not doc:
+                            _fail(unid, category_path, LookupError("not found"))
+                            continue
+
+                        if sinks is not None:
+                            failures = sinks.write(pos, record_from_notes(doc, tmp_dir, projection), view_name, category_path)
+                            if failures: raise failures[0][1]
+                        else:
+                            resilient_sql_counted(con, stats, _store_doc, doc, category_path)
+                        stats["scanned"] += 1
+                        _ok(unid)
+
+                    except RetryBudgetExhausted:
+                        raise
+                    except Exception as e:
+                        _fail(unid, category_path, e)
+
+            t_commit = time.monotonic()
             next_idx = end
-            if plan_id is not None:
-                upsert_checkpoint(cur, plan_id, source_id, view_name, snapshot_sig, next_idx, batch[-1][0] if batch else None)
-                con.commit()
+            last_unid = batch[-1][0] if batch else None
+            if sinks is not None:
+                sinks.end_batch(view_name, next_idx, last_unid)
+            else:
+                resilient_sql(con, con.commit)
+            if resolved:
+                resilient_sql(con, _resolve)
+                stats["resolved"] = stats.get("resolved", 0) + len(resolved)
+                open_failures.difference_update(resolved); resolved.clear()
+            if plan_id is not None and sinks is None:
+                def _save_checkpoint():
+                    upsert_checkpoint(con.cursor(), plan_id, source_id, view_name, snapshot_sig, next_idx, last_unid)
+                    con.commit()
+                resilient_sql(con, _save_checkpoint)
                 print(f"[INFO]   Checkpoint updated: {next_idx}/{total}")
+            if batch_sizer:
+                now = time.monotonic()
+                batch_sizer.note_batch(len(batch), now - t_batch, now - t_commit,
+                                       reopen_ctx.transient_errors - errs_before)
+
+        if sinks is not None:
+            sinks.end_batch(view_name, next_idx, last_unid, final=True)
+        if reconcile and snapshot.complete and next_idx >= total:
+            reconcile_view_membership(con, source_id, view_name, snapshot, stats)
 
     finally:
         shutil.rmtree(tmp_dir, ignore_errors=True)
 
+# ------------------------------ RETRY RUN -------------------------------
+
+def retry_failed_documents(notes_db, source_id: int, con, stats: Dict[str,int], catalog=None,
+                           reopen_ctx_for: Optional[Callable[[str], NotesReopenContext]]=None, **kwargs):
+    """--retry-failures: re-process only the dead-lettered UNIDs that are due, grouped by view."""
+    due = resilient_sql(con, lambda: due_failures(con.cursor(), source_id))
+    exhausted = resilient_sql(con, lambda: count_exhausted_failures(con.cursor(), source_id))
+    if exhausted:
+        print(f"[WARN] {exhausted} failed document(s) reached {FAILURE_MAX_ATTEMPTS} attempts; not retried")
+    if not due:
+        print("[INFO] No failed documents due for retry.")
+        return
+    by_view: Dict[str, ViewSnapshot] = {}
+    for view_name, unid, category_path in due:
+        by_view.setdefault(view_name, ViewSnapshot()).add(unid, category_path)
+    print(f"[INFO] Retrying {len(due)} failed document(s) across {len(by_view)} view(s)")
+    for view_name, snap in by_view.items():
+        try:
+            view = resilient_com(open_view_by_name, notes_db, view_name, catalog)
+        except RetryBudgetExhausted:
+            raise
+        except Exception as e:
+            print(f"[WARN] View '{view_name}' unavailable; {len(snap)} failure(s) left for later: {e}")
+            continue
+        process_view_into_db(notes_db, view, source_id, con, stats, plan_id=None,
+                             reopen_ctx=reopen_ctx_for(view_name) if reopen_ctx_for else None,
+                             snapshot=snap, **kwargs)
+
+# ----------------------------- WIDE TABLES -----------------------------
+# One flat table per form listed in wide_forms (e.g. Person -> person_wide): a row
+# per live document of that form and a column per allow-listed item (items.notes_filter
+# = 1, narrowed by wide_forms.item_names when set), multi-values joined with "; ".
+# Each run re-pivots only the UNIDs it upserted or tombstoned; --rebuild-wide redoes
+# every document. Columns for newly allow-listed items are added on the fly. Texts
+# offloaded to the CAS are read back into their cells after the pivot.
+
+WIDE_SEPARATOR = "; "
+WIDE_CHUNK = 500
+WIDE_FIXED_COLUMNS = ("unid", "source_id", "modified_at", "refreshed_at")
+WIDE_TOUCHED: set = set()       # UNIDs written since the last refresh_wide_tables()
+
+def _wide_name(s: str, max_len: int = 64) -> str:
+    n = re.sub(r"[^0-9a-z]+", "_", (s or "").lower()).strip("_") or "x"
+    if n[0].isdigit(): n = "i_" + n
+    return n[:max_len]
+
+def load_wide_forms(cur, forms: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Enabled wide_forms as dict(form, table, columns=[(item_id, column), ...]).
+
+    With forms, exactly those forms; one without a wide_forms row gets the whole allow-list.
+    """
+    cur.execute("SELECT form, table_name, item_names FROM dbo.wide_forms WHERE enabled = 1")
+    conf = [tuple(f) for f in cur.fetchall() or []]
+    if forms is not None:
+        by_form = {c[0].lower(): c for c in conf}
+        conf = [by_form.get(f.lower(), (f, None, None)) for f in forms]
+    if not conf: return []
+    cur.execute("SELECT id, name FROM dbo.items WHERE notes_filter = 1 ORDER BY id")
+    allow = [(int(r[0]), r[1]) for r in cur.fetchall() or []]
+    specs = []
+    for form, table_name, item_names in conf:
+        wanted = {n.strip().lower() for n in item_names.split(",") if n.strip()} if item_names else None
+        cols, used = [], set(WIDE_FIXED_COLUMNS)
+        for item_id, name in allow:
+            if wanted is not None and name.lower() not in wanted: continue
+            col = _wide_name(name, 60)
+            if col in used: col = f"{col[:48]}_{item_id}"
+            used.add(col); cols.append((item_id, col))
+        specs.append(dict(form=form, table=_wide_name(table_name or f"{form}_wide"), columns=cols))
+    return specs
+
+def ensure_wide_table(cur, spec: Dict[str, Any]):
+    t = spec["table"]
+    cur.execute(f"""
+    IF OBJECT_ID('dbo.{t}','U') IS NULL
+    CREATE TABLE dbo.[{t}](
+      unid         CHAR(32) NOT NULL PRIMARY KEY,
+      source_id    BIGINT NOT NULL,
+      modified_at  DATETIME2 NULL,
+      refreshed_at DATETIME2 NOT NULL
+    );
+    """)
+    cur.execute("SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = ?", (t,))
+    have = {r[0].lower() for r in cur.fetchall() or []}
+    missing = [c for _, c in spec["columns"] if c not in have]
+    if missing:
+        cur.execute(f"ALTER TABLE dbo.[{t}] ADD " + ", ".join(f"[{c}] NVARCHAR(MAX) NULL" for c in missing))
+
+def refresh_wide_table(cur, spec: Dict[str, Any], unids: List[str]):
+    """Delete and re-pivot unids in one wide table (documents of another form or tombstoned just drop out)."""
+    t, cols = spec["table"], spec["columns"]
+    # v_text first: v_string only holds a text's first 1024 characters
+    val = ("COALESCE(v.v_text, v.v_string, CONVERT(NVARCHAR(64), v.v_number), "
+           "CONVERT(NVARCHAR(19), v.v_datetime, 120), CONVERT(NVARCHAR(1), v.v_bool))")
+    names = "".join(f", [{c}]" for _, c in cols)
+    aggs = "".join(f", STRING_AGG(CASE WHEN x.item_id = {i} THEN {val} END, N'{WIDE_SEPARATOR}') WITHIN GROUP (ORDER BY x.val_order)"
+                   for i, _ in cols)
+    ids = ",".join(str(i) for i, _ in cols) or "NULL"
+    for chunk in _chunks(unids, WIDE_CHUNK):
+        marks = _marks(len(chunk))
+        cur.execute(f"DELETE FROM dbo.[{t}] WHERE unid IN ({marks})", chunk)
+        cur.execute(f"""
+          INSERT INTO dbo.[{t}] (unid, source_id, modified_at, refreshed_at{names})
+          SELECT d.unid, d.source_id, d.modified_at, SYSUTCDATETIME(){aggs}
+          FROM dbo.documents d
+          LEFT JOIN dbo.doc_item_values x ON x.unid = d.unid AND x.item_id IN ({ids})
+          LEFT JOIN dbo.item_values v ON v.id = x.item_value_id
+          WHERE d.unid IN ({marks}) AND d.form = ? AND d.deleted_at IS NULL
+          GROUP BY d.unid, d.source_id, d.modified_at
+        """, list(chunk) + [spec["form"]])
+        _fill_offloaded_cells(cur, spec, val, chunk)
+
+def _fill_offloaded_cells(cur, spec: Dict[str, Any], val: str, unids: List[str]):
+    """Rewrite the cells holding a CAS-offloaded value, which the pivot only sees as its v_string prefix."""
+    t, cols = spec["table"], spec["columns"]
+    if not cols: return
+    ids = ",".join(str(i) for i, _ in cols)
+    marks = _marks(len(unids))
+    cur.execute(f"""
+      SELECT x.unid, x.item_id, {val} AS val, v.v_text_sha256, v.v_text_len
+      FROM dbo.doc_item_values x
+      JOIN dbo.documents d ON d.unid = x.unid AND d.form = ? AND d.deleted_at IS NULL
+      JOIN dbo.item_values v ON v.id = x.item_value_id
+      WHERE x.unid IN ({marks}) AND x.item_id IN ({ids})
+        AND EXISTS (SELECT 1 FROM dbo.doc_item_values x2 JOIN dbo.item_values v2 ON v2.id = x2.item_value_id
+                    WHERE x2.unid = x.unid AND x2.item_id = x.item_id AND v2.v_text_sha256 IS NOT NULL)
+      ORDER BY x.unid, x.item_id, x.val_order
+    """, [spec["form"]] + list(unids))
+    cells: Dict[Tuple[str, int], List[str]] = {}
+    for unid, item_id, v, sha256, length in cur.fetchall() or []:
+        if sha256 is not None:
+            full = lazy_text(None, sha256, length).read()
+            if full is None:
+                print(f"[WARN] Wide table {t}: CAS text {bytes(sha256).hex()} for {unid} "
+                      f"is missing; the cell keeps its first {len(v or '')} characters")
+            else:
+                v = full
+        if v is not None: cells.setdefault((unid, int(item_id)), []).append(v)
+    col_of = dict(cols)
+    for (unid, item_id), parts in cells.items():
+        cur.execute(f"UPDATE dbo.[{t}] SET [{col_of[item_id]}] = ? WHERE unid = ?", (WIDE_SEPARATOR.join(parts), unid))
+
+def refresh_wide_tables(con, rebuild: bool = False) -> int:
+    """Re-pivot the UNIDs touched since the last call (every document with rebuild); returns UNIDs handled."""
+    touched = list(WIDE_TOUCHED); WIDE_TOUCHED.clear()
+    if not touched and not rebuild: return 0
+    def _apply() -> int:
+        cur = con.cursor()
+        specs = load_wide_forms(cur)
+        done = 0
+        for spec in specs:
+            ensure_wide_table(cur, spec)
+            con.commit()
+            unids = touched
+            if rebuild:
+                cur.execute(f"DELETE FROM dbo.[{spec['table']}]")
+                cur.execute("SELECT unid FROM dbo.documents WHERE form = ? AND deleted_at IS NULL", (spec["form"],))
+                unids = [r[0] for r in cur.fetchall() or []]
+            refresh_wide_table(cur, spec, unids)
+            con.commit()
+            done = max(done, len(unids))
+            log(f"[INFO] Wide table {spec['table']}: {len(unids)} UNID(s) refreshed")
+        return done
+    try:
+        return resilient_sql(con, _apply)
+    except RetryBudgetExhausted:
+        WIDE_TOUCHED.update(touched)
+        raise
+    except Exception as e:
+        WIDE_TOUCHED.update(touched)
+        print(f"[WARN] Wide table refresh failed; retried at the next refresh: {e}")
+        return 0
+
+# --------------------------- FULL-TEXT INDEX ---------------------------
+# Local SQLite FTS5 index (notes_fts) over subject, text_body and string item values,
+# one file per store under CACHE_ROOT. Like the wide tables it is refreshed from the
+# UNIDs each run upserted or tombstoned; --rebuild-fulltext re-indexes every live
+# document. Query with `python notes_fts.py --store fabric WORDS...` or
+# notes_fts.FullTextIndex(FTS_PATH, readonly=True).search(...).
+
+FTS_ENABLED = os.environ.get("NOTES_FTS", "1").lower() not in ("0", "false", "no")
+FTS_PATH = Path(os.environ.get("NOTES_FTS_INDEX") or notes_fts.index_path(CACHE_ROOT, "fabric"))
+FTS_CHUNK = 200
+FTS_TOUCHED: set = set()        # UNIDs written since the last refresh_fulltext()
+
+def fulltext_rows(cur, unids: List[str]) -> List["notes_fts.IndexRow"]:
+    """Index rows for the live documents among unids (offloaded bodies read from the CAS)."""
+    marks = _marks(len(unids))
+    cur.execute(f"""
+      SELECT unid, source_id, form, modified_at, subject, text_body, text_hash, doc_size_bytes
+      FROM dbo.documents WHERE unid IN ({marks}) AND deleted_at IS NULL""", unids)
+    docs = {r[0]: r for r in cur.fetchall() or []}
+    cur.execute(f"""
+      SELECT x.unid, v.v_string FROM dbo.doc_item_values x
+      JOIN dbo.item_values v ON v.id = x.item_value_id
+      WHERE x.unid IN ({marks}) AND v.val_kind = 'string' AND v.v_string IS NOT NULL
+      ORDER BY x.unid, x.item_id, x.val_order""", unids)
+    values: Dict[str, List[str]] = {}
+    for u, v in cur.fetchall() or []:
+        values.setdefault(u, []).append(v)
+    rows = [(u, d[1], d[2], d[3], d[4], str(lazy_text(d[5], d[6], d[7]) or ""), "\n".join(values.get(u, ())))
+            for u, d in docs.items()]
+    return rows
+
+def refresh_fulltext(con, rebuild: bool = False) -> int:
+    """Re-index the UNIDs touched since the last call (every live document with rebuild); returns UNIDs handled."""
+    touched = list(FTS_TOUCHED); FTS_TOUCHED.clear()
+    if not FTS_ENABLED or (not touched and not rebuild): return 0
+    try:
+        with notes_fts.FullTextIndex(FTS_PATH) as idx:
+            if rebuild:
+                cur = con.cursor()
+                cur.execute("SELECT unid FROM dbo.documents WHERE deleted_at IS NULL")
+                touched = [r[0] for r in cur.fetchall() or []]
+                idx.clear()
+            for chunk in _chunks(touched, FTS_CHUNK):
+                rows = resilient_sql(con, lambda: fulltext_rows(con.cursor(), chunk))
+                live = {r[0] for r in rows}
+                idx.update(rows, deleted=[u for u in chunk if u not in live])
+            if rebuild: idx.optimize()
+        log(f"[INFO] Full-text index: {len(touched)} UNID(s) refreshed ({FTS_PATH})")
+        return len(touched)
+    except RetryBudgetExhausted:
+        if not rebuild: FTS_TOUCHED.update(touched)
+        raise
+    except Exception as e:
+        if not rebuild: FTS_TOUCHED.update(touched)
+        print(f"[WARN] Full-text index refresh failed; retried at the next refresh: {e}")
+        return 0
+
+# --------------------------- PARQUET EXPORT ----------------------------
+# `--export-parquet DIR`: documents and the wide forms (or --export-forms) as
+# partitioned Parquet datasets (notes_export), read through a server-side cursor
+# so neither side holds more than a fetch / row group in memory.
+
+EXPORT_FETCH_ROWS = 5000
+
+def _export_text(inline: Optional[str], sha256: Optional[bytes], length: Optional[int]) -> Optional[str]:
+    """text_body / v_text as exported: offloaded texts read back from the CAS (None if the blob is gone)."""
+    t = lazy_text(inline, sha256, length)
+    return t.read() if isinstance(t, notes_cas.LazyText) else t
+
+def _stream_rows(cur, sql: str, params: Tuple = ()) -> Iterator[Tuple]:
+    cur.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(EXPORT_FETCH_ROWS)
+        if not rows: return
+        yield from rows
+
+def item_value_kinds(cur, item_ids: List[int]) -> Dict[int, set]:
+    kinds: Dict[int, set] = {}
+    for chunk in _chunks(item_ids):
+        cur.execute(f"SELECT DISTINCT item_id, val_kind FROM dbo.item_values WHERE item_id IN ({_marks(len(chunk))})", chunk)
+        for r in cur.fetchall() or []:
+            kinds.setdefault(int(r[0]), set()).add(r[1])
+    return kinds
+
+def export_parquet(out_dir: Path, forms: Optional[List[str]] = None) -> Dict[str, int]:
+    """Write documents/ and one dataset per wide form under out_dir; returns rows per dataset."""
+    with sql_db() as con:
+        cur = con.cursor()
+        specs = load_wide_forms(cur, forms)
+        kinds = item_value_kinds(cur, sorted({i for s in specs for i, _ in s["columns"]}))
+    totals: Dict[str, int] = {}
+    with sql_db() as con:
+        cur = con.cursor()      # pyodbc streams; fetchmany bounds what is held
+        with notes_export.PartitionedParquetWriter(out_dir, "documents", "source_id", notes_export.DOCUMENT_COLUMNS) as w:
+            for row in _stream_rows(cur, """
+              SELECT unid, source_id, note_id, form, subject, author, created_at, modified_at,
+                     has_attachments, text_hash, doc_size_bytes, deleted_at, text_body
+              FROM dbo.documents ORDER BY source_id, unid"""):
+                rec = notes_export.document_record(row)
+                rec["text_body"] = _export_text(row[12], row[9], row[10])    # text_body, text_hash, doc_size_bytes
+                w.write(row[1], rec)
+        totals["documents"] = w.rows
+        print(f"[INFO] Exported documents: {w.rows} row(s) in {w.files} file(s)")
+        for spec in specs:
+            columns = {i: (c, notes_export.item_column_type(kinds.get(i, ()))) for i, c in spec["columns"]}
+            ids = ",".join(str(i) for i in columns) or "NULL"
+            layout = notes_export.FORM_COLUMNS + [(c, t, True) for c, t in columns.values()]
+            with notes_export.PartitionedParquetWriter(out_dir, spec["table"], "source_id", layout) as w:
+                rows = ((u, sid, mod, item, order, kind, s, _export_text(t, sha, n), num, dt, b)
+                        for u, sid, mod, item, order, kind, s, t, sha, n, num, dt, b in _stream_rows(cur, f"""
+                  SELECT d.unid, d.source_id, d.modified_at, x.item_id, x.val_order, v.val_kind,
+                         v.v_string, v.v_text, v.v_text_sha256, v.v_text_len, v.v_number, v.v_datetime, v.v_bool
+                  FROM dbo.documents d
+                  LEFT JOIN dbo.doc_item_values x ON x.unid = d.unid AND x.item_id IN ({ids})
+                  LEFT JOIN dbo.item_values v ON v.id = x.item_value_id
+                  WHERE d.form = ? AND d.deleted_at IS NULL
+                  ORDER BY d.source_id, d.unid, x.item_id, x.val_order""", (spec["form"],)))
+                for rec in notes_export.pivot_rows(rows, columns):
+                    w.write(rec["source_id"], rec)
+            totals[spec["table"]] = w.rows
+            print(f"[INFO] Exported {spec['table']} ({spec['form']}): {w.rows} row(s) in {w.files} file(s)")
+    return totals
+
+# ---------------------------- DOCUMENT READS ----------------------------
+# get_document(unid) / get_documents(unids) for tools reading what this ETL writes:
+# documents rebuilt from the EAV tables with items in val_order, one query per table
+# per batch. Rebuilt documents stay in an LRU of NOTES_DOC_CACHE_SIZE entries and are
+# reused while documents.modified_at (and deleted_at) are unchanged.
+
+DOC_CACHE_SIZE = int(os.environ.get("NOTES_DOC_CACHE_SIZE", "2048"))
+DOC_CACHE = notes_reader.DocumentCache(DOC_CACHE_SIZE)
+
+def get_documents(unids: Iterable[str], con=None) -> Dict[str, "notes_reader.StoredDocument"]:
+    """unid -> document for the UNIDs that are stored; tombstoned ones come back with deleted_at set."""
+    if con is None:
+        with sql_db() as con:
+            return get_documents(unids, con)
+    cur = con.cursor()
+    out: Dict[str, notes_reader.StoredDocument] = {}
+    for chunk in _chunks(list(dict.fromkeys(u.upper() for u in unids if u))):
+        cur.execute(f"SELECT {', '.join(notes_reader.DOCUMENT_FIELDS)} FROM dbo.documents WHERE unid IN ({_marks(len(chunk))})", chunk)
+        stale = []
+        for row in cur.fetchall() or []:
+            doc = DOC_CACHE.get(row[0], notes_reader.document_version(row))
+            if doc is not None: out[doc.unid] = doc
+            else: stale.append(row)
+        if not stale: continue
+        ids = [r[0] for r in stale]
+        cur.execute(f"""
+          SELECT x.unid, i.name, x.val_order, v.val_kind, v.v_string, v.v_text, v.v_text_sha256, v.v_text_len,
+                 v.v_number, v.v_datetime, v.v_bool, v.v_bytes
+          FROM dbo.doc_item_values x
+          JOIN dbo.items i ON i.id = x.item_id
+          JOIN dbo.item_values v ON v.id = x.item_value_id
+          WHERE x.unid IN ({_marks(len(ids))})
+          ORDER BY x.unid, x.item_id, x.val_order""", ids)
+        items = [(u, name, order, kind, vs, lazy_text(vt, sha, n), num, dt, b, by)
+                 for u, name, order, kind, vs, vt, sha, n, num, dt, b, by in cur.fetchall() or []]
+        atts: List[Tuple] = []
+        with_atts = [r[0] for r in stale if r[notes_reader.DOCUMENT_FIELDS.index("has_attachments")]]
+        if with_atts:
+            cur.execute(f"SELECT {', '.join(notes_reader.ATTACHMENT_FIELDS)} FROM dbo.attachments "
+                        f"WHERE unid IN ({_marks(len(with_atts))}) ORDER BY unid, id", with_atts)
+            atts = cur.fetchall() or []
+        for unid, doc in notes_reader.build_documents(stale, items, atts).items():
+            DOC_CACHE.put(doc)
+            out[unid] = doc
+    return out
+
+def get_document(unid: str, con=None) -> Optional["notes_reader.StoredDocument"]:
+    return get_documents([unid], con).get(unid.upper())
+
+# --------------------------- SUMMARY MODE -----------------------------
+# Plan views with read_mode='summary' are ingested from view ColumnValues alone: one
+# sequential scan, no NotesDocument opened. column_map (JSON) maps column titles or
+# "#<position>" to item names; null drops a column and "*": null drops unmapped ones.
+# Unmapped columns default to their field (ItemName), else their title.
+# A scan commits per row and checkpoints every SUMMARY_CHECKPOINT_EVERY rows; a rerun
+# resumes there unless the columns, the selection or the entry before it changed.
+# Failed rows are dead-lettered like full reads (--retry-failures re-reads them in full).
+SUMMARY_CHECKPOINT_EVERY = 500
+
+def _summary_sig(cols: List[Tuple[int, str]], selection_formula: Optional[str]) -> str:
+    h = hashlib.sha256(b"summary\x00")
+    h.update((selection_formula or "").encode("utf-8")); h.update(b"\x00")
+    for idx, name in cols:
+        h.update(f"{idx}\x1f{name}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+def summary_columns(view, column_map: Optional[Dict[str, Optional[str]]] = None) -> List[Tuple[int, str]]:
+    """(ColumnValues index, item name) per stored column; read once per view."""
+    cmap = {str(k).strip().lower(): v for k, v in (column_map or {}).items()}
+    keep_unmapped = not ("*" in cmap and cmap["*"] is None)
+    out: List[Tuple[int, str]] = []
+    for pos, col in enumerate(view.Columns):
+        title = (getattr(col, "Title", "") or "").strip()
+        idx = getattr(col, "ColumnValuesIndex", pos)
+        if idx is None or int(idx) >= 65535: continue  # constant columns have no ColumnValues slot
+        for key in (f"#{pos}", title.lower()):
+            if key in cmap:
+                name = cmap[key]; break
+        else:
+            if not keep_unmapped or getattr(col, "IsCategory", False) or getattr(col, "IsIcon", False): continue
+            field = (getattr(col, "ItemName", "") or "").strip()
+            name = field if field and not field.startswith("$") else title
+        if name: out.append((int(idx), name))
+    return out
+
+def iter_summary_entries(view, selection=None, skip: int = 0):
+    """(unid, note_id, ColumnValues) per document entry, in view order; the first
+    `skip` entries come back as (unid, None, None) without reading their columns."""
+    try: view.AutoUpdate = False
+    except Exception: pass
+    if selection is not None:
+        coll = resilient_com(lambda: view.AllEntries)
+        resilient_com(coll.Intersect, selection)
+        first, nxt = coll.GetFirstEntry, coll.GetNextEntry
+    else:
+        nav = resilient_com(view.CreateViewNav)
+        try: nav.BufferMaxEntries = 400
+        except Exception: pass
+        first, nxt = nav.GetFirst, nav.GetNext
+    entry = resilient_com(first)
+    while entry:
+        if resilient_com(lambda e=entry: e.IsDocument):
+            if skip > 0:
+                skip -= 1
+                yield resilient_com(lambda e=entry: e.UniversalID), None, None
+            else:
+                yield (resilient_com(lambda e=entry: e.UniversalID),
+                       resilient_com(lambda e=entry: e.NoteID),
+                       resilient_com(lambda e=entry: e.ColumnValues) or ())
+        entry = resilient_com(nxt, entry)
+
+def process_view_summary_into_db(notes_db, view, source_id: int, con, stats: Dict[str,int],
+                                 column_map: Optional[Dict[str, Optional[str]]] = None,
+                                 selection_formula: Optional[str] = None, progress_every: int = 500,
+                                 plan_id: Optional[int] = None):
+    view_name = getattr(view, "Name", "UnknownView")
+    print(f"[INFO] → View '{view_name}' (summary columns only)")
+    selection = None
+    if selection_formula:
+        try:
+            selection = resilient_com(search_documents, notes_db, selection_formula)
+        except RetryBudgetExhausted:
+            raise
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"[ERROR] Selection formula failed for '{view_name}'; view skipped: {e}")
+            return
+
+    cols = resilient_com(summary_columns, view, column_map)
+    if not cols:
+        print(f"[WARN] No usable columns in '{view_name}'; check its column_map.")
+        return
+    log("[INFO]   Summary columns: " + ", ".join(f"#{i}->{n}" for i, n in cols))
+    sig = _summary_sig(cols, selection_formula)
+
+    def _item_ids() -> List[int]:
+        ids = list(dict.fromkeys(get_item_id(con.cursor(), name) for _, name in cols))
+        con.commit()
+        return ids
+    item_ids = resilient_sql(con, _item_ids)
+
+    def _store_row(counts: Dict[str,int], rec, category_path: Optional[str]):
+        # Empty columns carry no row, so a cleared field is only dropped by unlinking first
+        unlink_doc_items(con.cursor(), rec.unid, item_ids)
+        if upsert_document_from_dxl(rec, source_id, con, counts, partial=True):
+            insert_document_view(con.cursor(), rec.unid, view_name, category_path)
+            con.commit()
+
+    def _record_failure(unid: str, category_path: Optional[str], error_class: str, message: str):
+        record_failure(con.cursor(), source_id, view_name, unid, category_path, error_class, message)
+        con.commit()
+
+    open_failures = resilient_sql(con, lambda: load_open_failures(con.cursor(), source_id, view_name))
+    resolved: List[str] = []
+
+    def _save_progress(next_index: int, last_unid: Optional[str]):
+        resolve_failures(con.cursor(), source_id, view_name, resolved)
+        if plan_id is not None:
+            upsert_checkpoint(con.cursor(), plan_id, source_id, view_name, sig, next_index, last_unid)
+        con.commit()
+
+    ckpt = resilient_sql(con, lambda: load_checkpoint(con.cursor(), plan_id, source_id, view_name)) if plan_id is not None else None
+    start = ckpt["next_index"] if ckpt and ckpt["snapshot_sig"] == sig else 0
+
+    def _scan(start: int) -> Optional[int]:
+        """Rows stored from `start` on; None when the entry before `start` is not the checkpointed one."""
+        n = pos = 0
+        last_unid = None
+        for pos, (unid, note_id, values) in enumerate(iter_summary_entries(view, selection, skip=start)):
+            if pos < start:
+                if pos == start - 1 and unid != ckpt["last_unid"]: return None
+                continue
+            if not unid: continue
+            category_path = _category_path_from_columns(values)
+            rec = notes_dxl.DxlDocument()
+            rec.unid, rec.note_id = unid, (str(note_id or "").strip() or None)
+            for idx, name in cols:
+                if idx >= len(values): continue
+                v = values[idx]
+                vals = list(v) if isinstance(v, (list, tuple)) else [v]
+                if vals and vals != [""]: rec.items.append((name, None, False, vals))
+            try:
+                resilient_sql_counted(con, stats, _store_row, rec, category_path)
+                stats["scanned"] += 1
+                if unid in open_failures: resolved.append(unid)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"[WARN] Skipping UNID {unid} due to error: {e}")
+                try:
+                    resilient_sql(con, _record_failure, unid, category_path, type(e).__name__, str(e))
+                except RetryBudgetExhausted:
+                    raise
+                except Exception as e2:
+                    log(f"[WARN] Could not record failure for {unid}: {e2}")
+            n += 1; last_unid = unid
+            if n % progress_every == 0: print(f"[INFO]   {n} summary rows stored")
+            if n % SUMMARY_CHECKPOINT_EVERY == 0:
+                resilient_sql(con, _save_progress, pos + 1, last_unid)
+                stats["resolved"] = stats.get("resolved", 0) + len(resolved); resolved.clear()
+        return n
+
+    if start:
+        print(f"[INFO]   Resuming summary scan at entry {start}")
+    n = _scan(start)
+    if n is None:
+        print("[INFO]   View changed since the checkpoint; restarting at entry 0")
+        n = _scan(0)
+    # A finished scan starts over next run
+    resilient_sql(con, _save_progress, 0, None)
+    stats["resolved"] = stats.get("resolved", 0) + len(resolved); resolved.clear()
+    print(f"[INFO]   {n} summary rows stored from '{view_name}'")
+
+# ---------------------------- ITEM PROFILER ----------------------------
+# `--profile-items`: sample documents per form, report what each item costs in the
+# EAV tables and print notes_filter SQL for high-volume, low-value items. Read-only.
+PROFILE_SAMPLE_PER_FORM  = 200
+PROFILE_HEAVY_AVG_BYTES  = 512      # per document; flagged for review, not dropped
+PROFILE_KEEP_SYSTEM      = ("$FILE",)
+# Rough per-row footprint used for the storage estimate (bytes, excluding payload)
+ITEM_VALUE_ROW_BYTES     = 96
+DOC_ITEM_VALUE_ROW_BYTES = 64
+
+class ItemProfile:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = 0
+        self.values = 0
+        self.bytes = 0
+        self.forms: set = set()
+        self._distinct: Dict[bytes, int] = {}
+
+    def add(self, form: str, rows: List[Tuple[str, Dict[str, Any]]]):
+        self.docs += 1
+        self.forms.add(form)
+        for kind, cols in rows:
+            payload = cols.get("t") if cols.get("t") is not None else cols.get("s")
+            size = len(payload.encode("utf-8")) if payload is not None else (0 if kind == 'unknown' else 8)
+            self.values += 1
+            self.bytes += size
+            h = _compute_val_hash(0, kind, cols.get("s"), cols.get("t"), cols.get("n"), cols.get("dt"), cols.get("b"), None)
+            self._distinct[h] = size
+
+    @property
+    def distinct(self) -> int:
+        return len(self._distinct)
+
+    def distinct_ratio(self) -> float:
+        return self.distinct / self.values if self.values else 0.0
+
+    def est_bytes(self) -> int:
+        """item_values rows are shared (val_hash dedup); doc_item_values rows are per value."""
+        return sum(self._distinct.values()) + self.distinct * ITEM_VALUE_ROW_BYTES + self.values * DOC_ITEM_VALUE_ROW_BYTES
+
+    def verdict(self) -> Optional[str]:
+        if self.name.startswith("$") and self.name.upper() not in PROFILE_KEEP_SYSTEM:
+            return "system item"
+        if self.values >= 20 and self.distinct == 1:
+            return "constant value"
+        if self.docs and self.bytes / self.docs >= PROFILE_HEAVY_AVG_BYTES and self.distinct_ratio() >= 0.9:
+            return "review: heavy, rarely shared"
+        return None
+
+def _read_doc_item_rows(doc):
+    for name, itype, is_rich, payload in read_all_items(doc):
+        yield name, coerce_item_values(payload, itype, is_rich)
+
+def profile_view_items(notes_db, views, per_form: int = PROFILE_SAMPLE_PER_FORM) -> Tuple[Dict[str, ItemProfile], Dict[str, int]]:
+    """Strided sample over each view's snapshot, capped at per_form documents per form."""
+    profiles: Dict[str, ItemProfile] = {}
+    forms: Dict[str, int] = {}
+    seen: set = set()
+    for view in views:
+        snapshot = snapshot_view_entries(view)
+        stride = max(1, len(snapshot) // (per_form * 10))
+        for unid, _ in snapshot[::stride]:
+            if unid in seen: continue
+            seen.add(unid)
+            try:
+                doc = resilient_com(notes_db.GetDocumentByUNID, unid)
+                if not doc: continue
+                vals = doc.GetItemValue("Form")
+                form = str(vals[0]) if vals else "(none)"
+                if forms.get(form, 0) >= per_form: continue
+                forms[form] = forms.get(form, 0) + 1
+                for name, rows in _read_doc_item_rows(doc):
+                    key = name.lower()
+                    if key not in profiles: profiles[key] = ItemProfile(name)
+                    profiles[key].add(form, rows)
+            except RetryBudgetExhausted:
+                raise
+            except Exception as e:
+                log(f"[WARN] Profiler skipped {unid}: {e}")
+    return profiles, forms
+
+def report_item_profiles(profiles: Dict[str, ItemProfile], forms: Dict[str, int]):
+    n_docs = sum(forms.values())
+    print(f"[INFO] Sampled {n_docs} document(s): " + ", ".join(f"{f}={c}" for f, c in sorted(forms.items())))
+    print(f"  {'item':<32} {'docs':>6} {'values':>7} {'avg B':>8} {'total B':>10} {'dist/val':>8} {'est B/doc':>9}  note")
+    ranked = sorted(profiles.values(), key=lambda p: p.est_bytes(), reverse=True)
+    for p in ranked:
+        print(f"  {p.name[:32]:<32} {p.docs:>6} {p.values:>7} {p.bytes / max(1, p.values):>8.0f} {p.bytes:>10} "
+              f"{p.distinct_ratio():>8.2f} {p.est_bytes() / max(1, n_docs):>9.0f}  {p.verdict() or ''}")
+    drop   = [p for p in ranked if p.verdict() and not p.verdict().startswith("review")]
+    review = [p for p in ranked if p.verdict() and p.verdict().startswith("review")]
+    print("-- Suggested notes_filter settings (0 = do not store):")
+    for p in drop:
+        print(_fmt_sql_item_filter(p.name, 0))
+    for p in review:
+        print("-- " + _fmt_sql_item_filter(p.name, 0))
+    if not drop and not review:
+        print("-- (nothing to suggest)")
+
+def profile_items(per_form: int = PROFILE_SAMPLE_PER_FORM):
+    with sql_db() as con:
+        plans = load_ingestion_plans(con)
+    for plan in plans:
+        server = plan["server_name"]; path = plan["filepath"]
+        set_active_notes_server(server)
+        RETRY_BUDGET.reset()
+        try:
+            _, server_eff, _, notes_db = open_database(server, path)
+        except Exception as e:
+            print(f"[ERROR] Failed to open {server}:{path} -> {e}")
+            continue
+        try:
+            catalog = load_view_catalog(notes_db, server_eff)
+        except Exception:
+            catalog = None
+        views = select_views_for_plan(notes_db, plan.get("canon_targets", []) or [], plan.get("regex_overrides", {}) or {},
+                                      plan_id=plan["id"], catalog=catalog)
+        if not views: continue
+        print(f"[INFO] Profiling items for plan {server}:{path}")
+        try:
+            report_item_profiles(*profile_view_items(notes_db, views, per_form))
+        except RetryBudgetExhausted as e:
+            print(f"[ERROR] Profiling {server}:{path} aborted: {e}")
+
 # ------------------------------- MAIN ---------------------------------
 
+def _parse_column_map(canon: str, raw: str) -> Dict[str, Optional[str]]:
+    try:
+        cmap = json.loads(raw)
+        if isinstance(cmap, dict): return cmap
+    except ValueError:
+        pass
+    print(f"[WARN] Ignoring column_map for '{canon}': expected a JSON object")
+    return {}
+
 def load_ingestion_plans(con) -> List[Dict[str, Any]]:
     cur = con.cursor()
     cur.execute("""
-      SELECT p.id, p.server_name, p.filepath
+      SELECT p.id, p.server_name, p.filepath, p.item_projection, p.selection_formula
       FROM dbo.ingestion_plans p
       WHERE p.enabled = 1
       ORDER BY p.server_name, p.filepath
     """)
     plans = []
     for row in cur.fetchall() or []:
-        plan = {"id": row[0], "server_name": row[1], "filepath": row[2]}
+        plan = {"id": row[0], "server_name": row[1], "filepath": row[2],
+                "item_projection": ITEM_PROJECTION_DEFAULT if row[3] is None else bool(row[3]),
+                "selection_formula": row[4]}
         cur.execute("""
-          SELECT canon_name, COALESCE(NULLIF(regex_override,''), NULL) AS regex_override
+          SELECT canon_name, COALESCE(NULLIF(regex_override,''), NULL) AS regex_override,
+                 NULLIF(LTRIM(RTRIM(selection_formula)),'') AS selection_formula, read_mode, column_map
           FROM dbo.ingestion_plan_views
           WHERE plan_id=? AND enabled=1
           ORDER BY priority, canon_name
@@ -1221,12 +3459,59 @@ def load_ingestion_plans(con) -> List[Dict[str, Any]]:
         rows = cur.fetchall() or []
         plan["canon_targets"] = [r[0] for r in rows]
         plan["regex_overrides"] = {r[0]: r[1] for r in rows if r[1]}
+        plan["view_formulas"] = {r[0]: r[2] for r in rows if r[2]}
+        plan["view_modes"] = {r[0]: (r[3] or "").strip().lower() for r in rows if r[3]}
+        plan["column_maps"] = {r[0]: _parse_column_map(r[0], r[4]) for r in rows if r[4]}
         plans.append(plan)
     if not plans:
         print("[WARN] No enabled ingestion plans found.")
     return plans
 
-def main():
+# Runs that only write spools or folders (--spool, --sink spool|files) fall back to the
+# plans, source ids and item allow-list cached here by the last run that reached SQL,
+# so extraction goes on through a SQL outage; --load-spool loads the spools later.
+OFFLINE_CACHE_PATH = CACHE_ROOT / "offline_plans.json"
+
+def _offline_source_key(server: str, filepath: str) -> str:
+    return f"{server}|{filepath}".lower()
+
+def load_offline_cache() -> Dict[str, Any]:
+    return _load_json_cache(OFFLINE_CACHE_PATH) or {}
+
+def save_offline_cache(cache: Dict[str, Any]):
+    _save_json_cache(OFFLINE_CACHE_PATH, cache)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Plan-driven Notes ingest.")
+    ap.add_argument("--profile-items", action="store_true",
+                    help="sample documents per form, report item volume and print notes_filter SQL (no writes)")
+    ap.add_argument("--sample-per-form", type=int, default=PROFILE_SAMPLE_PER_FORM, metavar="N",
+                    help=f"documents sampled per form by --profile-items (default {PROFILE_SAMPLE_PER_FORM})")
+    ap.add_argument("--engine", choices=("com", "dxl"), default=EXTRACT_ENGINE,
+                    help="document reader: per-item COM (default) or batched DXL export")
+    ap.add_argument("--sink", action="append", choices=notes_sinks.SINK_KINDS, default=[], metavar="KIND",
+                    help=f"send records to this destination instead of the direct writer; repeatable ({', '.join(notes_sinks.SINK_KINDS)})")
+    ap.add_argument("--sink-batch", action="append", default=[], metavar="KIND=N",
+                    help="records a sink buffers before it commits and checkpoints (default: every walk batch)")
+    ap.add_argument("--spool", action="store_true",
+                    help="shorthand for --sink spool: write records to the local spool (NOTES_SPOOL_ROOT) instead of SQL; "
+                         "with SQL down it runs from the plans cached by the last connected run")
+    ap.add_argument("--export-parquet", metavar="DIR",
+                    help="export documents and wide forms as partitioned Parquet under DIR, then exit")
+    ap.add_argument("--export-forms", metavar="FORM[,FORM...]",
+                    help="with --export-parquet: these forms instead of the enabled wide_forms")
+    ap.add_argument("--rebuild-wide", action="store_true",
+                    help="rebuild every wide table (wide_forms) from the EAV tables, then exit")
+    ap.add_argument("--rebuild-fulltext", action="store_true",
+                    help="re-index every live document in the local full-text index (notes_fts), then exit")
+    ap.add_argument("--retry-failures", action="store_true",
+                    help="re-process only documents in etl_failures that are due (exponential backoff across runs)")
+    ap.add_argument("--load-spool", action="store_true",
+                    help="load published spool files into SQL, exactly once per file, then exit")
+    return ap.parse_args(argv)
+
+def main(args: Optional[argparse.Namespace] = None):
+    args = args or parse_args()
     import struct as _struct, sys as _sys
     print(f"[BOOT] Python {_sys.version.split()[0]} ({'64' if _struct.calcsize('P')==8 else '32'}-bit)")
 
@@ -1239,26 +3524,61 @@ def main():
         print(f"[WARN] CAS_ROOT not writable; fell back to: {temp_root}")
         globals()['CAS_ROOT'] = temp_root
 
-    ensure_schema()
-
-    with sql_db() as con:
-        cur = con.cursor()
-        # Seed a default plan when empty
-        cur.execute("""
-            IF NOT EXISTS (SELECT 1 FROM dbo.ingestion_plans)
-            BEGIN
-                INSERT INTO dbo.ingestion_plans(server_name, filepath, enabled, notes)
-                VALUES (?, ?, 1, 'Seeded plan');
-                DECLARE @pid BIGINT = SCOPE_IDENTITY();
-                INSERT INTO dbo.ingestion_plan_views(plan_id, canon_name, enabled, priority)
-                VALUES (@pid, 'Person By Surname', 1, 10),
-                       (@pid, 'Person By Organization', 1, 20),
-                       (@pid, 'Organizational Structure', 1, 30);
-            END
-        """, (PREF_SERVER, PREF_SERVER_PATH))
-        con.commit()
-
-        plans = load_ingestion_plans(con)
+    sink_kinds = args.sink + (["spool"] if args.spool else [])
+    sql_modes = (args.profile_items or args.load_spool or args.rebuild_wide or args.rebuild_fulltext
+                 or args.export_parquet or args.retry_failures or args.bulk_initial_load)
+    offline_ok = bool(sink_kinds) and not sql_modes and not any(k in notes_sinks.SQL_SINK_SCRIPTS for k in sink_kinds)
+    offline = False
+    try:
+        ensure_schema()
+    except Exception as e:
+        if not offline_ok: raise
+        offline = True
+        print(f"[WARN] SQL unavailable ({e}); extracting to {', '.join(sink_kinds)} with the cached plans")
+    if args.profile_items:
+        profile_items(args.sample_per_form)
+        return
+    if args.load_spool:
+        load_spools()
+        return
+    if args.rebuild_wide or args.rebuild_fulltext:
+        with sql_db() as con:
+            if args.rebuild_wide: refresh_wide_tables(con, rebuild=True)
+            if args.rebuild_fulltext: refresh_fulltext(con, rebuild=True)
+        return
+    if args.export_parquet:
+        forms = [f.strip() for f in args.export_forms.split(",") if f.strip()] if args.export_forms else None
+        export_parquet(Path(args.export_parquet), forms)
+        return
+
+    sinks = build_sinks(sink_kinds, args.sink_batch) if sink_kinds else None
+    if sinks is not None:
+        print(f"[INFO] Sinks: {', '.join(s.name for s in sinks.sinks)}")
+
+    offline_cache = load_offline_cache()
+    with ExitStack() as stack:
+        con = None if offline else stack.enter_context(sql_db())
+        if con is not None:
+            # Seed a default plan when empty
+            con.cursor().execute("""
+                IF NOT EXISTS (SELECT 1 FROM dbo.ingestion_plans)
+                BEGIN
+                    INSERT INTO dbo.ingestion_plans(server_name, filepath, enabled, notes)
+                    VALUES (?, ?, 1, 'Seeded plan');
+                    DECLARE @pid BIGINT = SCOPE_IDENTITY();
+                    INSERT INTO dbo.ingestion_plan_views(plan_id, canon_name, enabled, priority)
+                    VALUES (@pid, 'Person By Surname', 1, 10),
+                           (@pid, 'Person By Organization', 1, 20),
+                           (@pid, 'Organizational Structure', 1, 30);
+                END
+            """, (PREF_SERVER, PREF_SERVER_PATH))
+            con.commit()
+            plans = load_ingestion_plans(con)
+            offline_cache["plans"] = plans
+            save_offline_cache(offline_cache)
+        else:
+            plans = offline_cache.get("plans") or []
+            print(f"[INFO] Offline: {len(plans)} cached plan(s) from {OFFLINE_CACHE_PATH}")
         if not plans:
             print("[INFO] Nothing to do. Populate ingestion_plans and ingestion_plan_views.")
             return
@@ -1267,46 +3587,92 @@ def main():
             server = plan["server_name"]; path = plan["filepath"]
             canon_targets = plan.get("canon_targets", []) or []
             overrides     = plan.get("regex_overrides", {}) or {}
-
-            def _open_db_again_closure(s=server, p=path):
-                session = win32com.client.Dispatch("Lotus.NotesSession")
-                session.Initialize(LOTUS_PASSWORD)
-                def _get_db():
-                    db = session.GetDatabase(s, p)
-                    if not db.IsOpen:
-                        try: db.Open(s, p)
-                        except Exception: pass
-                    return db
-                return resilient_com(_get_db)
-
-            def _get_view_again_closure(db, vname):
-                all_views = list(db.Views)
-                for v in all_views:
-                    if getattr(v, "Name", "") == vname:
-                        return v
-                raise RuntimeError(f"View '{vname}' not found after reopen")
+            set_active_notes_server(server)
+            RETRY_BUDGET.reset()
+            breakers_before = breaker_stats()
 
             try:
                 session, server_eff, filepath_eff, notes_db = open_database(server, path)
             except Exception as e:
                 print(f"[ERROR] Failed to open {server}:{path} -> {e}")
                 continue
+            NOTES_POOL.adopt_db(server_eff, filepath_eff, notes_db)
+
+            # Reconnects reuse the pooled session and handle (see NotesSessionPool)
+            def _open_db_again_closure(s=server_eff, p=filepath_eff):
+                return resilient_com(NOTES_POOL.get_db, s, p)
+
+            try:
+                catalog = load_view_catalog(notes_db, server_eff)
+            except Exception as e:
+                print(f"[WARN] View catalog unavailable for {server_eff}:{filepath_eff} -> {e}")
+                catalog = None
+
+            def _get_view_again_closure(db, vname, c=catalog):
+                return open_view_by_name(db, vname, c)
 
             db_title   = getattr(notes_db, "Title", None)
             replica_id = getattr(notes_db, "ReplicaID", None)
 
-            source_id = get_or_create_source(cur, server_eff, filepath_eff, db_title, replica_id)
-            run_id    = start_etl_run(cur, source_id)
+            skey = _offline_source_key(server_eff, filepath_eff)
             stats     = dict(scanned=0, upserted=0, atts=0, errors=0)
-            con.commit()
+            sizer     = AdaptiveBatchSizer()
+            projection = None
+            if con is not None:
+                # Fresh cursors per step: the pooled connection may be swapped by a reconnect
+                source_id = get_or_create_source(con.cursor(), server_eff, filepath_eff, db_title, replica_id)
+                run_id    = start_etl_run(con.cursor(), source_id)
+                offline_cache.setdefault("sources", {})[skey] = source_id
+                if plan.get("item_projection"):
+                    projection = load_item_projection(con.cursor())
+                    offline_cache["projection"] = projection.names + (["$FILE"] if projection.with_files else [])
+            else:
+                source_id = (offline_cache.get("sources") or {}).get(skey)   # None: snapshot cache off
+                run_id = None
+                if plan.get("item_projection"):
+                    projection = ItemProjection(offline_cache.get("projection") or [])
+            if projection is not None and not len(projection):
+                print("[WARN] Item projection requested but no items have notes_filter = 1; reading all items.")
+                projection = None
+            elif projection is not None:
+                print(f"[INFO] Item projection: {len(projection)} allow-listed item(s)")
+            if sinks is not None:
+                sinks.open_source(dict(server_name=server_eff, filepath=filepath_eff, title=db_title,
+                                       replica_id=replica_id, plan_server=server, plan_filepath=path))
+            if con is not None: con.commit()
 
             try:
-                targets = select_views_for_plan(notes_db, canon_targets, overrides, plan_id=plan["id"])
-                if not targets:
+                targets = [] if args.retry_failures else select_views_for_plan(
+                    notes_db, canon_targets, overrides, plan_id=plan["id"], catalog=catalog, with_canon=True)
+                if args.retry_failures:
+                    retry_failed_documents(
+                        notes_db, source_id, con, stats, catalog,
+                        reopen_ctx_for=lambda vname: NotesReopenContext(
+                            open_db_fn=_open_db_again_closure,
+                            get_view_fn=_get_view_again_closure,
+                            view_name=vname
+                        ),
+                        batch_sizer=sizer, projection=projection, engine=args.engine, sinks=sinks
+                    )
+                elif not targets:
                     print(f"[INFO] No views selected for plan {server}:{path}.")
                 else:
-                    for v in targets:
+                    view_formulas = plan.get("view_formulas", {}) or {}
+                    view_modes    = plan.get("view_modes", {}) or {}
+                    column_maps   = plan.get("column_maps", {}) or {}
+                    for canon, v in targets:
                         vname = getattr(v, "Name", "UnknownView")
+                        formula = combine_selection_formulas(plan.get("selection_formula"), view_formulas.get(canon))
+                        if view_modes.get(canon) == "summary":
+                            if con is None:
+                                print(f"[WARN] Summary view '{vname}' writes to SQL directly; skipped while offline.")
+                                continue
+                            process_view_summary_into_db(
+                                notes_db, v, source_id, con, stats,
+                                column_map=column_maps.get(canon), selection_formula=formula,
+                                plan_id=plan["id"]
+                            )
+                            continue
                         reopen_ctx = NotesReopenContext(
                             open_db_fn=_open_db_again_closure,
                             get_view_fn=_get_view_again_closure,
@@ -1314,12 +3680,40 @@ def main():
                         )
                         process_view_into_db(
                             notes_db, v, source_id, con, stats,
-                            plan_id=plan["id"], batch_size=50, reopen_ctx=reopen_ctx
+                            plan_id=plan["id"], reopen_ctx=reopen_ctx, batch_sizer=sizer,
+                            projection=projection, selection_formula=formula, engine=args.engine,
+                            sinks=sinks
                         )
+                if sinks is None:
+                    stats["wide"] = refresh_wide_tables(con)
+                    stats["fulltext"] = refresh_fulltext(con)
+            except RetryBudgetExhausted as e:
+                print(f"[ERROR] Plan {server}:{path} aborted: {e}")
+                stats["aborted"] = 1
             finally:
-                finish_etl_run(cur, run_id, stats)
-                con.commit()
-
+                if sinks is not None:
+                    stats["sinks"] = sinks.describe()
+                stats.update(sizer.stats())
+                stats["retries"] = RETRY_BUDGET.used
+                stats.update({k: v - breakers_before.get(k, 0) for k, v in breaker_stats().items()})
+                if con is None:
+                    print(f"[INFO] Offline run for {server}:{path}: {stats}")
+                else:
+                    if _run_notes(stats): print(f"[INFO] Run {run_id}: {_run_notes(stats)}")
+                    def _finish():
+                        finish_etl_run(con.cursor(), run_id, stats)
+                        con.commit()
+                    resilient_sql(con, _finish)
+
+        if con is not None:
+            refresh_wide_tables(con)
+            refresh_fulltext(con)
+            save_offline_cache(offline_cache)
+
+    if sinks is not None: sinks.close()
+    log(f"[INFO] Notes session pool: {NOTES_POOL.stats()}")
+    log(f"[INFO] Fabric connection pool: {FABRIC_POOL.stats()}")
+    FABRIC_POOL.close_all()
     print("[DONE] Ingest complete for all enabled plans.")
 
 if __name__ == "__main__":
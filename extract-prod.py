@@ -3,6 +3,8 @@ import re
 import win32com.client
 import concurrent.futures
 
+from notes_paths import sanitize_folder_name
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -11,7 +13,6 @@ NSF_PATH = "FND-CHHAD-Reference-Libraryl.nsf"
 LOTUS_PASSWORD = ""
 OUTPUT_DIR = "output"
 CATEGORY_COLUMN_INDEX = 0
-MAX_FOLDER_NAME_LENGTH = 100
 DEBUG = True
 
 # Notes EmbeddedObject.Type (for COM extraction)
@@ -28,13 +29,6 @@ def log(msg):
     if DEBUG:
         print(msg)
 
-def sanitize_folder_name(name, max_length=MAX_FOLDER_NAME_LENGTH):
-    if not name or not name.strip():
-        return "Unnamed"
-    name = re.sub(r'[<>:"/\\|?*]', '_', name)
-    name = re.sub(r'[\s_]+', '_', name)
-    return name[:max_length].strip('_')
-
 def get_document_subject(doc):
     for item in doc.Items:
         if getattr(item, "Name", "").lower() == "subject" and getattr(item, "Values", None):
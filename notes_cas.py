@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# notes_cas.py
+# ======================================================================
+# Content-addressed store (CAS) on local disk, shared by the ingest scripts
+# - Blobs live under <cas_root>/ab/cd/<sha256><suffix>, so equal content is
+#   stored once and a path never changes once written
+# - CasBlobWriter: attachment bytes streamed in while hashing (DXL $FILE)
+# - store_text / load_text / LazyText: large texts offloaded from SQL
+#   (documents.text_body, item_values.v_text) as gzip blobs; SQL keeps
+#   only their sha256 and length
+# - Pure Python (no COM, no SQL)
+# ======================================================================
+
+import os, gzip, hashlib, tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+TEXT_SUFFIX = ".txt.gz"
+
+# ------------------------------- BLOBS ----------------------------------
+
+class CasBlobWriter:
+    """Streams bytes into a temp file under cas_root while hashing; commit() moves it to its sha256 path."""
+    def __init__(self, cas_root: Path):
+        self.cas_root = Path(cas_root)
+        self.cas_root.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(prefix="dxl_", suffix=".tmp", dir=str(self.cas_root))
+        self._f = os.fdopen(fd, "wb")
+        self._h = hashlib.sha256()
+        self.size = 0
+
+    def write(self, b: bytes):
+        self._f.write(b); self._h.update(b); self.size += len(b)
+
+    def commit(self) -> Tuple[bytes, str, int]:
+        self._f.close()
+        digest = self._h.digest()
+        hexs = digest.hex()
+        rel  = Path(hexs[0:2]) / hexs[2:4] / (hexs + ".bin")
+        dest = self.cas_root / rel
+        if dest.exists():
+            os.unlink(self._tmp)
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp, dest)
+        return digest, str(rel).replace("\\", "/"), self.size
+
+    def abort(self):
+        try: self._f.close()
+        except Exception: pass
+        try: os.unlink(self._tmp)
+        except OSError: pass
+
+# ------------------------------- TEXTS ----------------------------------
+
+def text_blob_path(cas_root: Path, sha256: bytes) -> Path:
+    hexs = sha256.hex()
+    return Path(cas_root) / hexs[0:2] / hexs[2:4] / (hexs + TEXT_SUFFIX)
+
+def store_text(cas_root: Path, text: str) -> Tuple[bytes, int]:
+    """gzip text into the CAS under the sha256 of its UTF-8 bytes; returns (sha256, byte length)."""
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).digest()
+    dest = text_blob_path(cas_root, digest)
+    if not dest.exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix="txt_", suffix=".tmp", dir=str(dest.parent))
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(data, compresslevel=6, mtime=0))
+        os.replace(tmp, dest)
+    return digest, len(data)
+
+def load_text(cas_root: Path, sha256: bytes) -> Optional[str]:
+    """Text stored by store_text(), or None when the blob is missing."""
+    try:
+        with gzip.open(text_blob_path(cas_root, sha256), "rb") as f:
+            return f.read().decode("utf-8")
+    except FileNotFoundError:
+        return None
+
+class LazyText:
+    """Offloaded text; the blob is only read (once) when the text is asked for."""
+    __slots__ = ("cas_root", "sha256", "length", "_text")
+
+    def __init__(self, cas_root: Path, sha256: bytes, length: Optional[int] = None):
+        self.cas_root = Path(cas_root)
+        self.sha256 = sha256
+        self.length = length                # UTF-8 bytes, as kept in SQL
+        self._text: Optional[str] = None
+
+    def read(self) -> Optional[str]:
+        if self._text is None: self._text = load_text(self.cas_root, self.sha256)
+        return self._text
+
+    def __str__(self) -> str:
+        return self.read() or ""
+
+    def __repr__(self) -> str:
+        return f"LazyText({self.sha256.hex()[:12]}..., {self.length} bytes)"
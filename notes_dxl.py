@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# notes_dxl.py
+# ======================================================================
+# Streaming DXL reader shared by the Notes ingest scripts
+# - SAX-based and incremental: a record is yielded as soon as </document> closes
+# - $FILE attachments: base64 decoded chunk by chunk straight into the CAS
+# - Pure Python (no COM), so captured DXL exports can be parsed anywhere
+# Records carry (name, item_type, is_rich, payload) item rows, the same
+# shape the scripts' projected path feeds to coerce_insert_item_values.
+# ======================================================================
+
+import re, base64
+import xml.sax
+import xml.sax.handler
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from notes_cas import CasBlobWriter
+
+# NotesItem.Type values (same constants as the ingest scripts)
+IT_RICHTEXT  = 1
+IT_NUMBERS   = 768
+IT_DATETIMES = 1024
+IT_NAMES     = 1074
+IT_READERS   = 1075
+IT_AUTHORS   = 1076
+IT_TEXT      = 1280
+
+READ_CHUNK = 1 << 16
+
+# 20240131T235959,00-05 | 20240131 | 20240131T235959,00Z | 20240131T235959,00+05:30
+_DXL_DT_RE = re.compile(r"^(\d{8})(?:T(\d{6})(?:,(\d{1,2}))?)?(Z|[+-]\d{2}(?::?\d{2})?)?$")
+
+def parse_dxl_datetime(s: Optional[str]) -> Optional[datetime]:
+    """DXL datetime -> naive UTC datetime (naive local when no zone is given); None for time-only values."""
+    m = _DXL_DT_RE.match((s or "").strip())
+    if not m: return None
+    d, t, cs, tz = m.groups()
+    try:
+        dt = datetime.strptime(d + (t or "000000"), "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    if cs: dt += timedelta(milliseconds=int(cs.ljust(2, "0")) * 10)
+    if tz and tz != "Z":
+        sign = -1 if tz[0] == "-" else 1
+        digits = tz[1:].replace(":", "")
+        dt -= sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:4] or 0))
+    return dt
+
+# ------------------------------ RECORDS ---------------------------------
+
+class DxlDocument:
+    def __init__(self, form: Optional[str] = None):
+        self.unid: Optional[str] = None
+        self.note_id: Optional[str] = None
+        self.form = form
+        self.subject: Any = None            # set when read outside DXL; else first("Subject")
+        self.author: Any = None
+        self.created: Optional[datetime] = None
+        self.modified: Optional[datetime] = None
+        self.items: List[Tuple[str, Optional[int], bool, Any]] = []
+        self.attachments: List[Dict[str, Any]] = []
+        self.files: List[str] = []          # $FILE names, in document order
+        self.skipped_files: List[str] = []  # compressed or otherwise unreadable $FILE objects
+
+    def first(self, name: str) -> Any:
+        low = name.lower()
+        for nm, _, is_rich, payload in self.items:
+            if nm.lower() != low: continue
+            if is_rich: return payload
+            return payload[0] if payload else None
+        return None
+
+# ------------------------------- BASE64 ---------------------------------
+
+class _Base64Stream:
+    """Incremental base64 decoder; SAX may split character data anywhere."""
+    def __init__(self, out: CasBlobWriter):
+        self.out = out
+        self._pending = ""
+
+    def feed(self, chars: str):
+        s = self._pending + "".join(chars.split())
+        n = len(s) - len(s) % 4
+        if n: self.out.write(base64.b64decode(s[:n]))
+        self._pending = s[n:]
+
+    def close(self):
+        if self._pending:
+            self.out.write(base64.b64decode(self._pending + "=" * (-len(self._pending) % 4)))
+            self._pending = ""
+
+# ------------------------------- PARSER ---------------------------------
+
+_SCALAR_TAGS = ("text", "number", "datetime")
+
+def _item_type(tag: str, attrs) -> Optional[int]:
+    if tag in ("text", "textlist"):
+        if attrs.get("names") == "true":   return IT_NAMES
+        if attrs.get("readers") == "true": return IT_READERS
+        if attrs.get("authors") == "true": return IT_AUTHORS
+        return IT_TEXT
+    if tag in ("number", "numberlist"): return IT_NUMBERS
+    if tag in ("datetime", "datetimelist", "datetimerange"): return IT_DATETIMES
+    if tag == "richtext": return IT_RICHTEXT
+    return None
+
+class _DxlHandler(xml.sax.handler.ContentHandler):
+    def __init__(self, cas_root: Path, emit: Callable[[DxlDocument], None]):
+        super().__init__()
+        self.cas_root = cas_root
+        self.emit = emit
+        self.path: List[str] = []
+        self.doc: Optional[DxlDocument] = None
+        self.item: Optional[Dict[str, Any]] = None
+        self.buf: Optional[List[str]] = None
+        self.writer: Optional[CasBlobWriter] = None
+        self.b64: Optional[_Base64Stream] = None
+        self.file_name: Optional[str] = None
+
+    def startElement(self, name, attrs):
+        parent = self.path[-1] if self.path else None
+        self.path.append(name)
+        if name == "document":
+            self.doc = DxlDocument(form=attrs.get("form"))
+            return
+        if self.doc is None: return
+        if name == "noteinfo":
+            self.doc.unid = attrs.get("unid"); self.doc.note_id = attrs.get("noteid")
+        elif name == "item" and self.item is None:
+            self.item = dict(name=attrs.get("name") or "UnknownItem", type=None, rich=None, values=[], item_attrs=attrs)
+        elif self.item is not None and parent == "item":
+            self.item["type"] = _item_type(name, self.item["item_attrs"] if name in ("text", "textlist") else attrs)
+            if name == "richtext": self.item["rich"] = []
+        if self.item is not None and self.item["rich"] is not None:
+            return
+        if name == "file" and self.item is not None:
+            self.file_name = attrs.get("name")
+            if (attrs.get("compression") or "none") == "none" and (attrs.get("encoding") or "none") == "none":
+                self.writer = CasBlobWriter(self.cas_root)
+            elif self.file_name:
+                self.doc.skipped_files.append(self.file_name)
+        elif name == "filedata" and self.writer is not None:
+            self.b64 = _Base64Stream(self.writer)
+        elif name in _SCALAR_TAGS and "file" not in self.path:
+            self.buf = []
+
+    def characters(self, content):
+        if self.b64 is not None:
+            self.b64.feed(content)
+        elif self.item is not None and self.item["rich"] is not None:
+            self.item["rich"].append(content)
+        elif self.buf is not None:
+            self.buf.append(content)
+
+    def endElement(self, name):
+        self.path.pop()
+        if self.doc is None: return
+        if name == "document":
+            doc, self.doc = self.doc, None
+            if doc.unid: self.emit(doc)
+            return
+        if self.item is not None and self.item["rich"] is not None:
+            if name == "par": self.item["rich"].append("\n")
+            elif name == "item": self._close_item()
+            return
+        if name in _SCALAR_TAGS and self.buf is not None:
+            raw = "".join(self.buf); self.buf = None
+            if self.item is not None:
+                self.item["values"].append(self._convert(name, raw))
+            elif len(self.path) >= 2 and self.path[-2] == "noteinfo" and self.path[-1] in ("created", "modified"):
+                setattr(self.doc, self.path[-1], parse_dxl_datetime(raw))
+        elif name == "filedata" and self.b64 is not None:
+            self.b64.close(); self.b64 = None
+        elif name == "file" and self.item is not None:
+            self._close_file()
+        elif name == "item":
+            self._close_item()
+
+    @staticmethod
+    def _convert(tag: str, raw: str) -> Any:
+        if tag == "number":
+            try: return float(raw)
+            except ValueError: return raw
+        if tag == "datetime":
+            return parse_dxl_datetime(raw) or raw
+        return raw
+
+    def _close_file(self):
+        if self.writer is None:
+            self.file_name = None
+            return
+        writer, self.writer = self.writer, None
+        try:
+            sha, rel, size = writer.commit()
+        except Exception:
+            writer.abort()
+            if self.file_name: self.doc.skipped_files.append(self.file_name)
+            self.file_name = None
+            return
+        name = self.file_name or "Unnamed"
+        self.doc.attachments.append(dict(
+            unid=self.doc.unid, item_name=self.item["name"], kind="attachment",
+            filename=name, mime_type=None, size_bytes=size, sha256=sha, storage_path=rel,
+        ))
+        self.file_name = None
+
+    def _close_item(self):
+        it, self.item = self.item, None
+        if it["name"].upper() == "$FILE":
+            self.doc.files.extend(a["filename"] for a in self.doc.attachments if a["item_name"] == it["name"] and a["filename"] not in self.doc.files)
+            self.doc.files.extend(n for n in self.doc.skipped_files if n not in self.doc.files)
+            return
+        if it["type"] is None: return
+        if it["rich"] is not None:
+            self.doc.items.append((it["name"], IT_RICHTEXT, True, "".join(it["rich"]).strip()))
+        else:
+            self.doc.items.append((it["name"], it["type"], False, it["values"]))
+
+def iter_dxl_documents(stream: BinaryIO, cas_root: Path, chunk_size: int = READ_CHUNK) -> Iterator[DxlDocument]:
+    """Yield DxlDocument records from a DXL byte stream while it is still being read."""
+    ready: deque = deque()
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setFeature(xml.sax.handler.feature_external_pes, False)
+    parser.setContentHandler(_DxlHandler(Path(cas_root), ready.append))
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk: break
+        parser.feed(chunk)
+        while ready: yield ready.popleft()
+    parser.close()
+    while ready: yield ready.popleft()
+
+def iter_dxl_file(path: Path, cas_root: Path) -> Iterator[DxlDocument]:
+    with open(path, "rb") as f:
+        yield from iter_dxl_documents(f, cas_root)
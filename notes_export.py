@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# notes_export.py
+# ======================================================================
+# Parquet export of the EAV store (see --export-parquet in the ingest scripts)
+# - Rows come in from server-side cursors and leave in fixed-size row
+#   groups, so memory stays at ~ROW_GROUP_ROWS rows whatever the table size
+# - One dataset per table: documents/ and one per wide form (person_wide/ ...),
+#   Hive-style partitioned by source_id=N (the column comes from the path)
+# - Item columns are typed from the value kinds stored for the item (number,
+#   datetime, bool, else string) and hold lists, since Notes items are
+#   multi-valued
+# - text_body and item texts offloaded to the CAS are read back by the
+#   scripts before they get here; a blob missing from the CAS comes out
+#   NULL, with documents.text_hash still naming it
+# - A dataset is written next to the old one and swapped in when complete
+# ======================================================================
+
+import os, re, math, shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None   # only needed for --export-parquet
+
+ROW_GROUP_ROWS = int(os.environ.get("NOTES_EXPORT_ROW_GROUP", "50000"))
+FILE_ROWS      = int(os.environ.get("NOTES_EXPORT_FILE_ROWS", "1000000"))
+
+# (name, type, repeated); row order of the documents SELECT in the scripts
+DOCUMENT_COLUMNS: List[Tuple[str, str, bool]] = [
+    ("unid", "string", False), ("source_id", "int64", False), ("note_id", "string", False),
+    ("form", "string", False), ("subject", "string", False), ("author", "string", False),
+    ("created_at", "timestamp", False), ("modified_at", "timestamp", False),
+    ("has_attachments", "bool", False), ("text_hash", "string", False),
+    ("doc_size_bytes", "int64", False), ("deleted_at", "timestamp", False),
+    ("text_body", "string", False),
+]
+FORM_COLUMNS: List[Tuple[str, str, bool]] = [
+    ("unid", "string", False), ("source_id", "int64", False), ("modified_at", "timestamp", False),
+]
+
+def _arrow_type(kind: str, repeated: bool = False):
+    t = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+         "bool": pa.bool_(), "timestamp": pa.timestamp("us")}[kind]
+    return pa.list_(t) if repeated else t
+
+def item_column_type(kinds: Iterable[str]) -> str:
+    """Column type for an item from the val_kinds stored for it; mixed or textual kinds are strings."""
+    kinds = set(kinds) - {"unknown"}
+    if kinds == {"number"}:   return "float64"
+    if kinds == {"datetime"}: return "timestamp"
+    if kinds == {"bool"}:     return "bool"
+    return "string"
+
+def document_record(row: Tuple) -> Dict[str, Any]:
+    rec = {name: row[i] for i, (name, _, _) in enumerate(DOCUMENT_COLUMNS)}
+    if rec["has_attachments"] is not None: rec["has_attachments"] = bool(rec["has_attachments"])
+    if rec["text_hash"] is not None: rec["text_hash"] = bytes(rec["text_hash"]).hex()
+    return rec
+
+def _item_value(kind: str, s, t, n, dt, b) -> Any:
+    if kind == "float64":   return n
+    if kind == "timestamp": return dt
+    if kind == "bool":      return None if b is None else bool(b)
+    for v in (s, t):
+        if v is not None: return v
+    if n is not None:  return str(int(n)) if math.isfinite(n) and n == int(n) else repr(n)   # nan/inf as repr
+    if dt is not None: return dt.isoformat(sep=" ")
+    if b is not None:  return str(int(b))
+    return None
+
+def pivot_rows(rows: Iterable[Tuple], columns: Dict[int, Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+    """Wide records from rows ordered by unid, then item and value order.
+
+    rows: (unid, source_id, modified_at, item_id, val_order, val_kind, v_string, v_text, v_number, v_datetime, v_bool)
+    columns: item_id -> (column name, column type)
+    """
+    cur: Optional[Dict[str, Any]] = None
+    for unid, source_id, modified_at, item_id, _, _, s, t, n, dt, b in rows:
+        if cur is None or cur["unid"] != unid:
+            if cur is not None: yield cur
+            cur = dict(unid=unid, source_id=source_id, modified_at=modified_at)
+            for name, _ in columns.values(): cur[name] = None
+        col = columns.get(item_id)
+        if col is None: continue
+        v = _item_value(col[1], s, t, n, dt, b)
+        if v is None: continue
+        if cur[col[0]] is None: cur[col[0]] = []
+        cur[col[0]].append(v)
+    if cur is not None: yield cur
+
+def _partition_value(v: Any) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(v)).strip("_") or "_"
+
+class PartitionedParquetWriter:
+    """<root>/<dataset>/<key>=<value>/part-NNNNN.parquet, ROW_GROUP_ROWS rows per row group.
+
+    Use as a context manager: the dataset replaces the previous export only
+    when the block completes; an error leaves the previous export in place.
+    """
+    def __init__(self, root: Path, dataset: str, partition_key: str, columns: List[Tuple[str, str, bool]],
+                 row_group_rows: int = ROW_GROUP_ROWS, file_rows: int = FILE_ROWS):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for the Parquet export (pip install pyarrow)")
+        self.final = Path(root) / dataset
+        self.root = Path(root) / f".{dataset}.partial"
+        self.partition_key = partition_key
+        # Hive layout: the partition column lives in the directory name, not in the files
+        self.schema = pa.schema([(n, _arrow_type(k, rep)) for n, k, rep in columns if n != partition_key])
+        self.row_group_rows = max(1, row_group_rows)
+        self.file_rows = max(self.row_group_rows, file_rows)
+        self.rows = 0
+        self.files = 0
+        self._buf: List[Dict[str, Any]] = []
+        self._part: Any = None
+        self._parts: Dict[str, int] = {}
+        self._writer = None
+        self._path: Optional[Path] = None
+        self._file_rows = 0
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, partition: Any, record: Dict[str, Any]):
+        if partition != self._part:
+            self._close_file()
+            self._part = partition
+        self._buf.append(record)
+        if len(self._buf) >= self.row_group_rows: self._flush()
+
+    def _open(self):
+        part = _partition_value(self._part)
+        d = self.root / f"{self.partition_key}={part}"
+        d.mkdir(parents=True, exist_ok=True)
+        n = self._parts.get(part, 0)
+        self._parts[part] = n + 1
+        self._path = d / f"part-{n:05d}.parquet"
+        self._writer = pq.ParquetWriter(str(self._path), self.schema, compression="snappy")
+        self._file_rows = 0
+
+    def _flush(self):
+        if not self._buf: return
+        if self._writer is not None and self._file_rows >= self.file_rows: self._close_writer()
+        if self._writer is None: self._open()
+        self._writer.write_table(pa.Table.from_pylist(self._buf, schema=self.schema), row_group_size=self.row_group_rows)
+        self._file_rows += len(self._buf)
+        self.rows += len(self._buf)
+        self._buf = []
+
+    def _close_writer(self):
+        if self._writer is None: return
+        self._writer.close()
+        self._writer = None
+        self.files += 1
+
+    def _close_file(self):
+        self._flush()
+        self._close_writer()
+
+    def close(self):
+        """Finish the last file and publish the dataset in place of the previous one."""
+        self._close_file()
+        self.root.mkdir(parents=True, exist_ok=True)
+        old = self.final.with_name(f".{self.final.name}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.final.exists(): os.replace(self.final, old)
+        os.replace(self.root, self.final)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def abort(self):
+        self._buf = []
+        try: self._close_writer()
+        except Exception: pass
+        shutil.rmtree(self.root, ignore_errors=True)
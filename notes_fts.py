@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# notes_fts.py
+# ======================================================================
+# Local full-text index over extracted documents (SQLite FTS5)
+# - One row per live document: subject, text_body and its string item
+#   values, keyed by UNID; the ingest scripts update it for the UNIDs each
+#   run touched (see refresh_fulltext there)
+# - Works the same for the MySQL and the Fabric store: one index file each
+#   under the cache root, so Fabric gets full-text search too
+# - search() ranks with bm25 (subject > items > body)
+#
+# Query from a shell:
+#   python notes_fts.py --store fabric "smith ottawa"
+#   python notes_fts.py --raw 'subject:budget AND (2023 OR 2024)'
+# ======================================================================
+
+import os, re, sys, time, sqlite3, argparse
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+FTS_FORMAT = 1
+STORES = ("mysql", "fabric")
+RANK_WEIGHTS = (8.0, 1.0, 2.0)        # bm25 weights: subject, body, items
+SNIPPET_TOKENS = 12
+
+# (unid, source_id, form, modified_at, subject, body, items)
+IndexRow = Tuple[str, Optional[int], Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS docs(
+         id          INTEGER PRIMARY KEY,
+         unid        TEXT NOT NULL UNIQUE,
+         source_id   INTEGER,
+         form        TEXT,
+         modified_at TEXT)""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(
+         subject, body, items,
+         tokenize = 'unicode61 remove_diacritics 2',
+         prefix = '2 3')""",
+]
+
+def index_path(cache_root: Path, store: str) -> Path:
+    """Index file for a store ("mysql" / "fabric") under the scripts' cache root."""
+    return Path(cache_root) / f"fulltext_{store}.sqlite"
+
+def default_cache_root() -> Path:
+    """CACHE_ROOT as the ingest scripts compute it."""
+    return Path(os.environ.get("NOTES_CACHE_ROOT") or os.environ.get("LOCALAPPDATA") or Path.home()) / "notes_cache"
+
+_WORD = re.compile(r"\w+\*?", re.UNICODE)
+
+def match_expression(text: str) -> str:
+    """FTS5 MATCH string for plain words: every word required, a trailing * makes it a prefix."""
+    terms = []
+    for w in _WORD.findall(text or ""):
+        star = w.endswith("*")
+        terms.append('"' + w.rstrip("*") + '"' + ("*" if star else ""))
+    return " ".join(terms)
+
+class SearchHit(NamedTuple):
+    unid: str
+    score: float              # higher is better
+    form: Optional[str]
+    subject: Optional[str]
+    snippet: str
+
+class FullTextIndex:
+    """The index file; use as a context manager, or call close()."""
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = Path(path)
+        if readonly:
+            if not self.path.exists(): raise FileNotFoundError(f"No full-text index at {self.path}")
+            self.con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=60)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path), timeout=60)
+        self.con.execute("PRAGMA journal_mode=WAL")   # searches keep working while a run writes
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        if self.con.execute("PRAGMA user_version").fetchone()[0] not in (0, FTS_FORMAT):
+            self.con.executescript("DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS fts;")
+        for ddl in _SCHEMA:
+            self.con.execute(ddl)
+        self.con.execute(f"PRAGMA user_version = {FTS_FORMAT}")
+        self.con.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.con.close()
+
+    # -- writing ----------------------------------------------------------
+
+    def _drop(self, unid: str) -> Optional[int]:
+        got = self.con.execute("SELECT id FROM docs WHERE unid = ?", (unid,)).fetchone()
+        if got is None: return None
+        self.con.execute("DELETE FROM fts WHERE rowid = ?", (got[0],))
+        return got[0]
+
+    def update(self, rows: Iterable[IndexRow], deleted: Iterable[str] = ()) -> int:
+        """(Re)index rows and drop the deleted UNIDs, in one transaction; returns rows indexed."""
+        n = 0
+        with self.con:
+            for unid in deleted:
+                if self._drop(unid) is not None:
+                    self.con.execute("DELETE FROM docs WHERE unid = ?", (unid,))
+            for unid, source_id, form, modified_at, subject, body, items in rows:
+                if hasattr(modified_at, "isoformat"): modified_at = modified_at.isoformat(sep=" ")
+                row_id = self._drop(unid)
+                if row_id is None:
+                    row_id = self.con.execute("INSERT INTO docs(unid, source_id, form, modified_at) VALUES (?,?,?,?)",
+                                              (unid, source_id, form, modified_at)).lastrowid
+                else:
+                    self.con.execute("UPDATE docs SET source_id = ?, form = ?, modified_at = ? WHERE id = ?",
+                                     (source_id, form, modified_at, row_id))
+                self.con.execute("INSERT INTO fts(rowid, subject, body, items) VALUES (?,?,?,?)",
+                                 (row_id, subject, body, items))
+                n += 1
+        return n
+
+    def clear(self):
+        with self.con:
+            self.con.execute("DELETE FROM fts")
+            self.con.execute("DELETE FROM docs")
+
+    def optimize(self):
+        """Merge the index segments; worth it after a rebuild."""
+        with self.con:
+            self.con.execute("INSERT INTO fts(fts) VALUES ('optimize')")
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # -- reading ----------------------------------------------------------
+
+    def search(self, query: str, limit: int = 20, raw: bool = False, form: Optional[str] = None) -> List[SearchHit]:
+        """Best matches first. raw=True takes FTS5 query syntax (OR, NEAR, column:, "phrases")."""
+        expr = query if raw else match_expression(query)
+        if not expr.strip(): return []
+        sql = f"""
+          SELECT d.unid, -bm25(fts, {', '.join(str(w) for w in RANK_WEIGHTS)}) AS score, d.form, fts.subject,
+                 snippet(fts, -1, '[', ']', '...', {SNIPPET_TOKENS})
+          FROM fts JOIN docs d ON d.id = fts.rowid
+          WHERE fts MATCH ?"""
+        params: List = [expr]
+        if form is not None:
+            sql += " AND d.form = ?"; params.append(form)
+        sql += " ORDER BY score DESC LIMIT ?"; params.append(max(1, limit))
+        return [SearchHit(*r) for r in self.con.execute(sql, params)]
+
+# --------------------------------- CLI ----------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Search the local full-text index of extracted Notes documents.")
+    ap.add_argument("query", nargs="+", help="words to find (all required; word* for a prefix)")
+    ap.add_argument("--store", choices=STORES, default="mysql", help="which ingest script's index (default mysql)")
+    ap.add_argument("--index", metavar="PATH", help="index file (default: NOTES_FTS_INDEX, else the store's file under the cache root)")
+    ap.add_argument("--form", help="only documents of this form")
+    ap.add_argument("-n", "--limit", type=int, default=20, help="hits to show (default 20)")
+    ap.add_argument("--raw", action="store_true", help="pass the query to FTS5 as is (OR, NEAR, column:, phrases)")
+    args = ap.parse_args(argv)
+    path = Path(args.index or os.environ.get("NOTES_FTS_INDEX") or index_path(default_cache_root(), args.store))
+    try:
+        with FullTextIndex(path, readonly=True) as idx:
+            t0 = time.perf_counter()
+            hits = idx.search(" ".join(args.query), args.limit, raw=args.raw, form=args.form)
+            ms = (time.perf_counter() - t0) * 1000
+    except (OSError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    for h in hits:
+        print(f"{h.score:9.4g}  {h.unid}  {(h.form or '')[:20]:<20}  {h.subject or ''}")
+        if h.snippet: print(f"           {' '.join(h.snippet.split())}")
+    print(f"[INFO] {len(hits)} hit(s) in {ms:.1f} ms ({path})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
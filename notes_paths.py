@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# notes_paths.py
+# ======================================================================
+# File and folder naming shared by every exporter (the folder exports in
+# extract-prod*.py, FolderSink, the ingest scripts' caches and
+# attachment temp files), so they all lay files out the same way
+# ======================================================================
+
+import re
+from typing import Any
+
+MAX_FOLDER_NAME_LENGTH = 100
+
+def sanitize_folder_name(name: Any, max_length: int = MAX_FOLDER_NAME_LENGTH) -> str:
+    name = str(name) if name is not None else ""
+    if not name.strip():
+        return "Unnamed"
+    name = re.sub(r'[<>:"/\\|?*]', '_', name)
+    name = re.sub(r'[\s_]+', '_', name)
+    return name[:max_length].strip('_')
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# notes_reader.py
+# ======================================================================
+# Documents read back from the EAV store (get_document / get_documents in
+# the ingest scripts)
+# - A batch costs one query per table (documents, doc_item_values joined to
+#   items / item_values, attachments) however many UNIDs and items it has
+# - Rebuilt documents are notes_dxl.DxlDocument records, so anything that
+#   takes a walk record (sinks, FolderSink layout) takes them too
+# - DocumentCache is a size-bounded LRU; an entry is only served while
+#   documents.modified_at / deleted_at still match what it was built from
+# ======================================================================
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from notes_dxl import DxlDocument
+
+# Row order of the SELECTs in the scripts
+DOCUMENT_FIELDS = ("unid", "source_id", "note_id", "form", "subject", "author", "created_at", "modified_at",
+                   "has_attachments", "deleted_at")
+ITEM_FIELDS = ("unid", "name", "val_order", "val_kind", "v_string", "v_text", "v_number", "v_datetime",
+               "v_bool", "v_bytes")          # v_text already through lazy_text()
+ATTACHMENT_FIELDS = ("unid", "item_name", "kind", "filename", "mime_type", "size_bytes", "sha256", "storage_path")
+
+class StoredDocument(DxlDocument):
+    """A DxlDocument rebuilt from SQL, plus the store's own columns."""
+    def __init__(self, form: Optional[str] = None):
+        super().__init__(form)
+        self.source_id: Optional[int] = None
+        self.deleted_at: Optional[datetime] = None
+        self.has_attachments = False
+
+    @property
+    def version(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        return self.modified, self.deleted_at
+
+def document_version(row: Tuple) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """(modified_at, deleted_at) of a DOCUMENT_FIELDS row; what a cached copy must match."""
+    return row[DOCUMENT_FIELDS.index("modified_at")], row[DOCUMENT_FIELDS.index("deleted_at")]
+
+def stored_value(kind: str, s, t, n, dt, b, by) -> Any:
+    """The value an item_values row holds, by its val_kind."""
+    if kind == "string":               return s
+    if kind in ("text", "richtext"):   return t
+    if kind == "number":               return n
+    if kind == "datetime":             return dt
+    if kind == "bool":                 return None if b is None else bool(b)
+    if kind == "bytes":                return None if by is None else bytes(by)
+    return next((v for v in (s, t, n, dt, b, by) if v is not None), None)
+
+def build_documents(doc_rows: Iterable[Tuple], item_rows: Iterable[Tuple],
+                    attachment_rows: Iterable[Tuple] = ()) -> Dict[str, StoredDocument]:
+    """unid -> StoredDocument from DOCUMENT_FIELDS / ITEM_FIELDS / ATTACHMENT_FIELDS rows.
+
+    item_rows must come ordered by unid, item and val_order. Rich text items
+    hold one value; $FILE names go to files, as the DXL parser leaves them.
+    """
+    docs: Dict[str, StoredDocument] = {}
+    for row in doc_rows:
+        r = dict(zip(DOCUMENT_FIELDS, row))
+        doc = StoredDocument(r["form"])
+        doc.unid, doc.note_id, doc.source_id = r["unid"], r["note_id"], r["source_id"]
+        doc.subject, doc.author = r["subject"], r["author"]
+        doc.created, doc.modified, doc.deleted_at = r["created_at"], r["modified_at"], r["deleted_at"]
+        doc.has_attachments = bool(r["has_attachments"])
+        docs[doc.unid] = doc
+    last: Optional[Tuple[str, str]] = None
+    values: List[Any] = []
+    for unid, name, _, kind, s, t, n, dt, b, by in item_rows:
+        doc = docs.get(unid)
+        if doc is None: continue
+        v = stored_value(kind, s, t, n, dt, b, by)
+        if name.upper() == "$FILE":
+            if v is not None: doc.files.append(v)
+            continue
+        if last != (unid, name):
+            last = (unid, name)
+            is_rich = kind == "richtext"
+            values = []
+            doc.items.append((name, None, is_rich, v if is_rich else values))
+            if is_rich: continue
+        values.append(v)
+    for row in attachment_rows:
+        a = dict(zip(ATTACHMENT_FIELDS, row))
+        doc = docs.get(a["unid"])
+        if doc is None: continue
+        if a["sha256"] is not None: a["sha256"] = bytes(a["sha256"])
+        doc.attachments.append(a)
+    return docs
+
+class DocumentCache:
+    """Thread-safe LRU of StoredDocument by UNID, bounded to max_docs entries (0 disables it)."""
+    def __init__(self, max_docs: int):
+        self.max_docs = max(0, max_docs)
+        self._docs: "OrderedDict[str, StoredDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, unid: str, version: Tuple[Optional[datetime], Optional[datetime]]) -> Optional[StoredDocument]:
+        """The cached copy if it was built from this version; a stale copy is dropped."""
+        with self._lock:
+            doc = self._docs.get(unid)
+            if doc is not None and doc.version == version:
+                self._docs.move_to_end(unid)
+                self.hits += 1
+                return doc
+            if doc is not None: del self._docs[unid]
+            self.misses += 1
+            return None
+
+    def put(self, doc: StoredDocument):
+        # Without modified_at there is nothing to notice a change by
+        if self.max_docs == 0 or doc.modified is None: return
+        with self._lock:
+            self._docs[doc.unid] = doc
+            self._docs.move_to_end(doc.unid)
+            while len(self._docs) > self.max_docs:
+                self._docs.popitem(last=False)
+
+    def discard(self, unid: str):
+        with self._lock:
+            self._docs.pop(unid, None)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# notes_records.py
+# ======================================================================
+# Record -> SQL row mapping shared by the Notes ingest scripts
+# - Turns a notes_dxl.DxlDocument (DXL engine, spool, sinks) into the
+#   documents row, the item rows to store and the $FILE names to link
+# - No SQL and no COM: which items are kept (items.notes_filter or the
+#   plan's item projection) comes in as a predicate, so the mapping can
+#   be checked against captured DXL on any platform
+# ======================================================================
+
+import hashlib
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from notes_dxl import DxlDocument
+
+ItemRow = Tuple[str, Optional[int], bool, Any]
+
+# Widths of the documents columns (FORM_MAX / SUBJECT_MAX / AUTHOR_MAX in the scripts)
+DOC_FIELD_MAX = dict(form=256, subject=1024, author=512)
+AUTHOR_ITEMS = ("Author", "From", "PostedBy")
+BODY_VALUE_MAX = 4096     # longer plain values stay out of text_body
+
+def clip(val: Any, field: str) -> Optional[str]:
+    if val is None: return None
+    s = str(val)
+    return s[:DOC_FIELD_MAX[field]]
+
+def text_body(rows: List[ItemRow]) -> str:
+    """documents.text_body: rich text items in full, short plain values as 'Name: v1; v2'."""
+    parts = []
+    for name, _, is_rich, payload in rows:
+        if is_rich:
+            if payload: parts.append(f"{name}:\n{payload}\n")
+        elif payload:
+            sv = "; ".join(str(x) for x in payload) if isinstance(payload, (list, tuple)) else str(payload)
+            if sv and len(sv) <= BODY_VALUE_MAX: parts.append(f"{name}: {sv}")
+    return "\n".join(parts)
+
+class RecordRows(NamedTuple):
+    doc: Dict[str, Any]       # documents row, as upsert_document takes it
+    items: List[ItemRow]      # item rows to store
+    files: List[str]          # $FILE names to link, in document order; empty when $FILE is not kept
+
+def record_rows(rec: DxlDocument, keep: Callable[[str], bool], body_from_all: bool = True) -> RecordRows:
+    """Rows for rec. keep(name) decides per item (and for "$FILE"); body_from_all builds
+    text_body from every item rather than only the kept ones (False under a projection)."""
+    items = [r for r in rec.items if keep(r[0])]
+    author = rec.author if rec.author is not None else next(
+        (v for v in (rec.first(n) for n in AUTHOR_ITEMS) if v is not None), None)
+    body = text_body(rec.items if body_from_all else items)
+    data = body.encode("utf-8") if body else None
+    doc = dict(
+        unid=rec.unid, note_id=rec.note_id,
+        form=clip(rec.form or rec.first("Form"), "form"),
+        subject=clip(rec.subject if rec.subject is not None else rec.first("Subject"), "subject"),
+        author=clip(author, "author"),
+        created_at=rec.created, modified_at=rec.modified,
+        has_attachments=1 if rec.attachments else 0,
+        text_hash=hashlib.sha256(data).digest() if data else None,
+        text_body=body, doc_size_bytes=len(data) if data else None
+    )
+    files = list(rec.files) if rec.files and keep("$FILE") else []
+    return RecordRows(doc, items, files)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# notes_retry.py
+# ======================================================================
+# Per-plan retry budget shared by the Notes ingest scripts
+# - resilient_sql / COM reopen spend one unit per retry; once the budget
+#   is spent the plan is abandoned with RetryBudgetExhausted
+# - One budget per process, reset by the running script for each plan.
+#   A sibling script loaded as a sink (notes_sinks.load_script) gets its
+#   own module globals but imports this same module, so its EavSink
+#   spends the same budget and raises the same exception class
+# ======================================================================
+
+import os
+
+class RetryBudgetExhausted(RuntimeError):
+    pass
+
+class RetryBudget:
+    def __init__(self, total: int):
+        self.total = total
+        self.used = 0
+
+    def reset(self):
+        self.used = 0
+
+    def spend(self, what: str):
+        if self.used >= self.total:
+            raise RetryBudgetExhausted(f"Retry budget of {self.total} exhausted ({what})")
+        self.used += 1
+
+RETRY_BUDGET = RetryBudget(int(os.environ.get("NOTES_RETRY_BUDGET", "300")))
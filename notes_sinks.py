@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# notes_sinks.py
+# ======================================================================
+# Record sinks: one Notes walk, many destinations
+# - The walk produces notes_dxl.DxlDocument records (COM or DXL engine)
+#   and hands each one to every configured sink
+# - Each sink batches and checkpoints on its own: a sink resumes from its
+#   own next_index and only commits once it has batch_size records pending
+# - File-based sinks (spool, per-document folders) live here; the SQL
+#   writers are EavSink classes in the ingest scripts, loaded by path so a
+#   MySQL run can also feed Fabric and vice versa
+# ======================================================================
+
+import os, re, json, shutil, hashlib, tempfile, importlib.util
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import notes_spool
+from notes_dxl import DxlDocument
+from notes_paths import sanitize_folder_name
+
+SINK_KINDS = ("mysql", "fabric", "files", "spool")
+SQL_SINK_SCRIPTS = {
+    "mysql":  "extract-users-db_prod.py",
+    "fabric": "extract-prod-domino-lakehouse.py",
+}
+
+# ------------------------------- HELPERS --------------------------------
+
+def _load_json(path: Path) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_json(path: Path, obj: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=str(path.parent))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _view_key(view_name: str) -> str:
+    return hashlib.sha1(view_name.encode("utf-8")).hexdigest()[:16]
+
+def load_script(path: Path):
+    """Import an ingest script (hyphenated file name) as a module."""
+    name = "_sink_" + path.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+# -------------------------------- SINKS ---------------------------------
+
+class RecordSink:
+    """Base sink. write() may buffer; flush() makes everything written durable and records the checkpoint."""
+    name = "sink"
+    fatal_errors: Tuple[type, ...] = ()   # re-raised by the fan-out instead of counted
+
+    def __init__(self, batch_size: int = 0):
+        self.batch_size = batch_size        # 0: flush at every walk batch
+        self.written = 0
+
+    def open_source(self, source: Dict[str, Any]): pass
+    def begin_view(self, plan_id: Optional[int], view_name: str, snapshot_sig: str) -> int: return 0
+    def write(self, rec: DxlDocument, view_name: str, category_path: Optional[str]): raise NotImplementedError
+    def flush(self, view_name: str, next_index: int, last_unid: Optional[str]): pass
+    def close(self): pass
+    def describe(self) -> str: return f"{self.name}={self.written}"
+
+class _JsonCheckpoints:
+    """Per-view checkpoints kept as JSON files under a sink's own directory."""
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.plan_id: Optional[int] = None
+        self.sig: Dict[str, str] = {}
+
+    def _path(self, source_key: str, view_name: str) -> Path:
+        return self.root / f"{self.plan_id}_{source_key}_{_view_key(view_name)}.json"
+
+    def load(self, plan_id: Optional[int], source_key: str, view_name: str, snapshot_sig: str) -> int:
+        self.plan_id = plan_id
+        self.sig[view_name] = snapshot_sig
+        if plan_id is None: return 0
+        ck = _load_json(self._path(source_key, view_name))
+        if not ck or ck.get("snapshot_sig") != snapshot_sig: return 0
+        return int(ck.get("next_index") or 0)
+
+    def save(self, source_key: str, view_name: str, next_index: int, last_unid: Optional[str]):
+        if self.plan_id is None: return
+        _save_json(self._path(source_key, view_name),
+                   dict(snapshot_sig=self.sig.get(view_name), next_index=next_index, last_unid=last_unid))
+
+class SpoolSink(RecordSink):
+    """notes_spool files, one published file per flush (see --load-spool)."""
+    name = "spool"
+
+    def __init__(self, root: Path, batch_size: int = 0):
+        super().__init__(batch_size)
+        self.root = Path(root)
+        self.writer: Optional[notes_spool.SpoolWriter] = None
+        self.ckpt = _JsonCheckpoints(self.root / "checkpoints")
+
+    def open_source(self, source):
+        self.close()
+        self.writer = notes_spool.SpoolWriter(self.root, source)
+        print(f"[INFO] Spooling to {self.writer.dir}")
+
+    def begin_view(self, plan_id, view_name, snapshot_sig):
+        return self.ckpt.load(plan_id, self.writer.dir.name, view_name, snapshot_sig)
+
+    def write(self, rec, view_name, category_path):
+        self.writer.write(rec, view_name, category_path)
+        self.written += 1
+
+    def flush(self, view_name, next_index, last_unid):
+        self.writer.rotate()
+        self.ckpt.save(self.writer.dir.name, view_name, next_index, last_unid)
+
+    def close(self):
+        if self.writer is not None: self.writer.close()
+
+    def describe(self):
+        return f"spool={self.written} in {self.writer.files if self.writer else 0} file(s)"
+
+class FolderSink(RecordSink):
+    """Per-document folders, laid out like extract-prod-domino.py: <view>/<category...>/<Subject_UNID8>/document.txt."""
+    name = "files"
+
+    def __init__(self, root: Path, cas_root: Path, batch_size: int = 0):
+        super().__init__(batch_size)
+        self.root = Path(root)
+        self.cas_root = Path(cas_root)
+        self.source_key = "source"
+        self.ckpt = _JsonCheckpoints(self.root / ".checkpoints")
+
+    def open_source(self, source):
+        self.source_key = notes_spool.source_dir_name(source.get("server_name") or "", source.get("replica_id"),
+                                                      source.get("filepath") or "")
+
+    def begin_view(self, plan_id, view_name, snapshot_sig):
+        return self.ckpt.load(plan_id, self.source_key, view_name, snapshot_sig)
+
+    def write(self, rec, view_name, category_path):
+        parts = [sanitize_folder_name(p.strip()) for p in (category_path or "").split("\\") if p.strip()]
+        subject = rec.subject if rec.subject is not None else rec.first("Subject")
+        if subject is None: subject = f"Form_{rec.form}" if rec.form else "UnnamedDocument"
+        uid = (rec.unid or "unknown")[:8]
+        doc_dir = self.root.joinpath(sanitize_folder_name(view_name), *(parts or ["Uncategorized"]),
+                                     sanitize_folder_name(f"{subject}_{uid}"))
+        doc_dir.mkdir(parents=True, exist_ok=True)
+        with open(doc_dir / "document.txt", "w", encoding="utf-8") as f:
+            f.write(f"----- Document: {subject} ({uid}) -----\n")
+            for name, _, is_rich, payload in rec.items:
+                if is_rich:
+                    f.write(f"{name} (RichText):\n{str(payload).strip()}\n")
+                    if rec.attachments:
+                        summary = "; ".join(f"{a['kind']}:{a['filename']}" for a in rec.attachments)
+                        f.write(f"[EMBEDDED_SUMMARY_ITEM name='{name}': {summary}]\n")
+                else:
+                    f.write(f"{name}: {payload}\n")
+            f.write("--------------------\n")
+        for a in rec.attachments:
+            src = self.cas_root / a["storage_path"]
+            try:
+                shutil.copyfile(src, doc_dir / sanitize_folder_name(a["filename"], 255))
+            except OSError as e:
+                print(f"[WARN] files: could not copy '{a['filename']}' for {rec.unid}: {e}")
+        self.written += 1
+
+    def flush(self, view_name, next_index, last_unid):
+        self.ckpt.save(self.source_key, view_name, next_index, last_unid)
+
+# ------------------------------- FAN-OUT --------------------------------
+
+class SinkFanout:
+    """Feeds one walk to several sinks; each sink skips what it already has and flushes on its own cadence."""
+    def __init__(self, sinks: List[RecordSink]):
+        self.sinks = sinks
+        self.resume: Dict[int, int] = {}
+        self.pending: Dict[int, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def open_source(self, source: Dict[str, Any]):
+        """Start a new source (plan); counts shown by describe() restart here."""
+        self.errors = {}
+        for s in self.sinks:
+            s.written = 0
+            s.open_source(source)
+
+    def begin_view(self, plan_id: Optional[int], view_name: str, snapshot_sig: str) -> int:
+        """Index to start the walk from: the least advanced sink's checkpoint."""
+        for i, s in enumerate(self.sinks):
+            self.resume[i] = s.begin_view(plan_id, view_name, snapshot_sig)
+            self.pending[i] = 0
+            if self.resume[i]: print(f"[INFO]   {s.name}: resuming at {self.resume[i]}")
+        return min(self.resume.values()) if self.resume else 0
+
+    def write(self, index: int, rec: DxlDocument, view_name: str, category_path: Optional[str]) -> List[Tuple[str, Exception]]:
+        """(sink name, error) for every sink that failed on this record; empty when all took it."""
+        failed: List[Tuple[str, Exception]] = []
+        for i, s in enumerate(self.sinks):
+            if index < self.resume[i]: continue
+            try:
+                s.write(rec, view_name, category_path)
+                self.pending[i] += 1
+            except s.fatal_errors:
+                raise
+            except Exception as e:
+                failed.append((s.name, e))
+                self.errors[s.name] = self.errors.get(s.name, 0) + 1
+                print(f"[WARN] {s.name}: skipping UNID {rec.unid}: {e}")
+        return failed
+
+    def end_batch(self, view_name: str, next_index: int, last_unid: Optional[str], final: bool = False):
+        for i, s in enumerate(self.sinks):
+            if next_index <= self.resume[i]: continue
+            if final or self.pending[i] >= max(s.batch_size, 1):
+                s.flush(view_name, next_index, last_unid)
+                self.pending[i] = 0
+
+    def close(self):
+        for s in self.sinks:
+            try:
+                s.close()
+            except s.fatal_errors:
+                raise
+            except Exception as e:
+                print(f"[WARN] {s.name}: close failed: {e}")
+
+    def describe(self) -> str:
+        out = " ".join(s.describe() for s in self.sinks)
+        if self.errors: out += " errors(" + ", ".join(f"{k}={v}" for k, v in self.errors.items()) + ")"
+        return out
+
+def build_sinks(kinds: List[str], local_kind: str, local_factory: Callable[[], RecordSink],
+                script_dir: Path, spool_root: Path, files_root: Path, cas_root: Path,
+                batch_sizes: Optional[Dict[str, int]] = None) -> SinkFanout:
+    """Sinks in the order given; SQL sinks other than the running script's own are loaded from their script."""
+    batch_sizes = batch_sizes or {}
+    sinks: List[RecordSink] = []
+    for kind in dict.fromkeys(kinds):
+        if kind == local_kind:
+            sink = local_factory()
+        elif kind in SQL_SINK_SCRIPTS:
+            sink = load_script(Path(script_dir) / SQL_SINK_SCRIPTS[kind]).EavSink()
+        elif kind == "spool":
+            sink = SpoolSink(spool_root)
+        elif kind == "files":
+            sink = FolderSink(files_root, cas_root)
+        else:
+            raise ValueError(f"Unknown sink '{kind}' (expected one of {', '.join(SINK_KINDS)})")
+        sink.batch_size = batch_sizes.get(kind, sink.batch_size)
+        sinks.append(sink)
+    return SinkFanout(sinks)
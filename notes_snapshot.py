@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# notes_snapshot.py
+# ======================================================================
+# Compact view snapshot shared by the Notes ingest scripts
+# - UNIDs packed as 16-byte binary in one contiguous bytearray
+# - Category paths interned once and referenced by a 4-byte id
+# - Dedup/lookup through an open-addressing table of positions (array 'i')
+# - Slices and shards are range views over the same buffers (no copies)
+# - remove() leaves a hole so positions (and checkpoints) stay stable;
+#   save()/load() persist a snapshot for reuse across runs; compacted()
+#   drops the holes once positions are free to change
+# Roughly 28 bytes per entry, against ~300 for a list of (str, str) tuples
+# plus a parallel set of UNID strings.
+# ======================================================================
+
+import os, json, tempfile
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+UNID_BYTES = 16
+SNAPSHOT_FORMAT = 1
+_EMPTY = -1
+_TOMBSTONE = -2          # slot of a removed entry; probing continues past it
+_REMOVED = 0xFFFFFFFF    # category id of a removed entry
+
+def _pack_unid(unid: str) -> Optional[bytes]:
+    if len(unid) != 2 * UNID_BYTES: return None
+    try:
+        return bytes.fromhex(unid)
+    except ValueError:
+        return None
+
+class ViewSnapshot:
+    """Ordered, de-duplicated (unid, category_path) entries. UNIDs come back upper-case, as Notes reports them."""
+    def __init__(self):
+        self._unids = bytearray()
+        self._cats = array("I")
+        self._cat_ids: Dict[Optional[str], int] = {None: 0}
+        self._cat_names: List[Optional[str]] = [None]
+        self._odd: Dict[int, str] = {}          # position -> UNID that is not 32 hex digits
+        self._odd_pos: Dict[str, int] = {}
+        self._slots = array("i", [_EMPTY]) * 16
+        self._mask = 15
+        self.complete = True                    # False when the walk that built it stopped early
+        self.holes = 0                          # positions left by remove()
+
+    # -- building ---------------------------------------------------------
+
+    def _key(self, pos: int) -> bytes:
+        return bytes(self._unids[pos * UNID_BYTES:(pos + 1) * UNID_BYTES])
+
+    def _probe(self, key: bytes) -> int:
+        """Slot holding key, or the empty slot where it would go."""
+        i = hash(key) & self._mask
+        while True:
+            pos = self._slots[i]
+            if pos == _EMPTY or (pos >= 0 and self._key(pos) == key):
+                return i
+            i = (i + 1) & self._mask
+
+    def _grow(self):
+        size = (self._mask + 1) * 2
+        self._slots = array("i", [_EMPTY]) * size
+        self._mask = size - 1
+        for pos in range(len(self._cats)):
+            if pos in self._odd or self._cats[pos] == _REMOVED: continue
+            self._slots[self._probe(self._key(pos))] = pos
+
+    def add(self, unid: str, category_path: Optional[str] = None) -> bool:
+        """Append unless the UNID is already present; returns whether it was added."""
+        pos = len(self._cats)
+        key = _pack_unid(unid)
+        if key is None:
+            if unid in self._odd_pos: return False
+            self._odd[pos] = unid; self._odd_pos[unid] = pos
+            self._unids.extend(bytes(UNID_BYTES))
+        else:
+            if 2 * (pos + 1) > self._mask + 1: self._grow()
+            slot = self._probe(key)
+            if self._slots[slot] != _EMPTY: return False
+            self._slots[slot] = pos
+            self._unids.extend(key)
+        cid = self._cat_ids.get(category_path)
+        if cid is None:
+            cid = self._cat_ids[category_path] = len(self._cat_names)
+            self._cat_names.append(category_path)
+        self._cats.append(cid)
+        return True
+
+    def remove(self, unid: str) -> int:
+        """Drop unid, keeping every other position; returns its old position or -1."""
+        key = _pack_unid(unid)
+        if key is None:
+            pos = self._odd_pos.pop(unid, -1)
+        else:
+            slot = self._probe(key)
+            pos = self._slots[slot]
+            if pos >= 0: self._slots[slot] = _TOMBSTONE
+        if pos >= 0:
+            self._cats[pos] = _REMOVED
+            self.holes += 1
+        return pos
+
+    def compacted(self) -> "ViewSnapshot":
+        """Copy without the holes; live entries keep their order but not their positions."""
+        out = ViewSnapshot()
+        for unid, cat in self:
+            out.add(unid, cat)
+        out.complete = self.complete
+        return out
+
+    # -- reading ----------------------------------------------------------
+
+    def index_of(self, unid: str) -> int:
+        """Position of unid, or -1."""
+        key = _pack_unid(unid)
+        if key is None: return self._odd_pos.get(unid, -1)
+        return self._slots[self._probe(key)]
+
+    def __contains__(self, unid: str) -> bool:
+        return self.index_of(unid) >= 0
+
+    def unid_at(self, pos: int) -> str:
+        odd = self._odd.get(pos)
+        if odd is not None: return odd
+        return self._unids[pos * UNID_BYTES:(pos + 1) * UNID_BYTES].hex().upper()
+
+    def category_at(self, pos: int) -> Optional[str]:
+        cid = self._cats[pos]
+        return None if cid == _REMOVED else self._cat_names[cid]
+
+    def removed_at(self, pos: int) -> bool:
+        return self._cats[pos] == _REMOVED
+
+    def __len__(self) -> int:
+        return len(self._cats)
+
+    @property
+    def live(self) -> int:
+        return len(self._cats) - self.holes
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str]]]:
+        return iter(SnapshotView(self, range(len(self))))
+
+    def __getitem__(self, key: Union[int, slice]):
+        return SnapshotView(self, range(len(self)))[key]
+
+    def shards(self, n: int) -> List["SnapshotView"]:
+        """n contiguous, near-equal views over the snapshot."""
+        return SnapshotView(self, range(len(self))).shards(n)
+
+    @property
+    def categories(self) -> int:
+        return len(self._cat_names) - 1
+
+    def nbytes(self) -> int:
+        return len(self._unids) + self._cats.itemsize * len(self._cats) + self._slots.itemsize * len(self._slots)
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path: Path, meta: Dict[str, Any]):
+        """One JSON header line, then the packed UNIDs and category ids; written atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = dict(v=SNAPSHOT_FORMAT, meta=meta, n=len(self), itemsize=self._cats.itemsize,
+                      categories=self._cat_names[1:], odd={str(k): v for k, v in self._odd.items()})
+        fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=str(path.parent))
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            f.write(self._unids)
+            f.write(self._cats.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional[Tuple["ViewSnapshot", Dict[str, Any]]]:
+        """(snapshot, meta) from save(), or None when missing/unreadable."""
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline().decode("utf-8"))
+                if header.get("v") != SNAPSHOT_FORMAT: return None
+                n = int(header["n"])
+                unids = f.read(n * UNID_BYTES)
+                cats = array("I")
+                if cats.itemsize != header.get("itemsize"): return None
+                cats.frombytes(f.read(n * cats.itemsize))
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(unids) != n * UNID_BYTES or len(cats) != n: return None
+        snap = cls()
+        snap._unids = bytearray(unids)
+        snap._cats = cats
+        snap._cat_names = [None] + list(header.get("categories") or [])
+        snap._cat_ids = {c: i for i, c in enumerate(snap._cat_names)}
+        snap._odd = {int(k): v for k, v in (header.get("odd") or {}).items() if cats[int(k)] != _REMOVED}
+        snap._odd_pos = {v: k for k, v in snap._odd.items()}
+        snap.holes = cats.count(_REMOVED)
+        size = 16
+        while size < 2 * (n + 1): size *= 2
+        snap._mask = size // 2 - 1
+        snap._grow()
+        return snap, header.get("meta") or {}
+
+class SnapshotView:
+    """A range over a ViewSnapshot; behaves like a read-only list of (unid, category_path)."""
+    __slots__ = ("snap", "rng")
+
+    def __init__(self, snap: ViewSnapshot, rng: range):
+        self.snap = snap
+        self.rng = rng
+
+    def __len__(self) -> int:
+        return len(self.rng)
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Live entries only; removed positions are skipped."""
+        for _, unid, cat in self.items():
+            yield unid, cat
+
+    def items(self) -> Iterator[Tuple[int, str, Optional[str]]]:
+        """(position, unid, category_path) for live entries."""
+        s = self.snap
+        for pos in self.rng:
+            if s.removed_at(pos): continue
+            yield pos, s.unid_at(pos), s.category_at(pos)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return SnapshotView(self.snap, self.rng[key])
+        pos = self.rng[key]
+        return self.snap.unid_at(pos), self.snap.category_at(pos)
+
+    def unids(self) -> Iterator[str]:
+        for _, unid, _ in self.items():
+            yield unid
+
+    def shards(self, n: int) -> List["SnapshotView"]:
+        n = max(1, n)
+        size, extra = divmod(len(self.rng), n)
+        out, start = [], 0
+        for i in range(n):
+            end = start + size + (1 if i < extra else 0)
+            out.append(SnapshotView(self.snap, self.rng[start:end]))
+            start = end
+        return out
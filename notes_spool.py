@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# notes_spool.py
+# ======================================================================
+# Durable local spool between Notes extraction and SQL loading
+# - Append-only gzip JSON Lines; one file per extraction batch
+# - A batch is written to "<name>.tmp" and renamed on rotate(), so only
+#   complete, fsync'ed files are ever visible to a loader
+# - Lines carry the source, view/category and a notes_dxl.DxlDocument
+# - Pure Python (no COM): spools written on the Notes box can be loaded
+#   from any machine that sees the directory
+# ======================================================================
+
+import io, os, re, gzip, json, time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from notes_dxl import DxlDocument
+
+SPOOL_FORMAT = 1
+SPOOL_SUFFIX = ".jsonl.gz"
+
+# ------------------------------ CODEC -----------------------------------
+
+def _enc_value(v: Any) -> Any:
+    if isinstance(v, datetime): return {"$dt": v.isoformat()}
+    if isinstance(v, (str, int, float, bool)) or v is None: return v
+    return str(v)
+
+def _dec_value(v: Any) -> Any:
+    if isinstance(v, dict) and "$dt" in v: return datetime.fromisoformat(v["$dt"])
+    return v
+
+def _enc_dt(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
+
+def record_to_json(rec: DxlDocument) -> Dict[str, Any]:
+    items = []
+    for name, itype, is_rich, payload in rec.items:
+        vals = payload if is_rich else [_enc_value(v) for v in (payload if isinstance(payload, (list, tuple)) else [payload])]
+        items.append([name, itype, bool(is_rich), vals])
+    atts = []
+    for a in rec.attachments:
+        a = dict(a)
+        if isinstance(a.get("sha256"), (bytes, bytearray)): a["sha256"] = a["sha256"].hex()
+        atts.append(a)
+    return dict(unid=rec.unid, note_id=rec.note_id, form=rec.form, subject=rec.subject, author=rec.author,
+                created=_enc_dt(rec.created), modified=_enc_dt(rec.modified),
+                items=items, attachments=atts, files=list(rec.files))
+
+def record_from_json(obj: Dict[str, Any]) -> DxlDocument:
+    rec = DxlDocument(form=obj.get("form"))
+    rec.unid, rec.note_id = obj.get("unid"), obj.get("note_id")
+    rec.subject, rec.author = obj.get("subject"), obj.get("author")
+    rec.created  = datetime.fromisoformat(obj["created"]) if obj.get("created") else None
+    rec.modified = datetime.fromisoformat(obj["modified"]) if obj.get("modified") else None
+    for name, itype, is_rich, vals in obj.get("items") or []:
+        rec.items.append((name, itype, is_rich, vals if is_rich else [_dec_value(v) for v in vals]))
+    for a in obj.get("attachments") or []:
+        a = dict(a)
+        if isinstance(a.get("sha256"), str): a["sha256"] = bytes.fromhex(a["sha256"])
+        rec.attachments.append(a)
+    rec.files = list(obj.get("files") or [])
+    return rec
+
+# ------------------------------ WRITER ----------------------------------
+
+def source_dir_name(server: str, replica_id: Optional[str], filepath: str) -> str:
+    raw = f"{server}_{replica_id or filepath}"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", raw).strip("_") or "source"
+
+class SpoolWriter:
+    """One writer per source and run; write() appends, rotate() publishes the current batch file."""
+    def __init__(self, root: Path, source: Dict[str, Any]):
+        self.dir = Path(root) / source_dir_name(source.get("server_name") or "", source.get("replica_id"), source.get("filepath") or "")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.source = source
+        self.prefix = time.strftime("%Y%m%dT%H%M%S") + f"_{os.getpid()}"
+        self.seq = 0
+        self.records = 0
+        self.files = 0
+        self._f = None
+        self._tmp: Optional[Path] = None
+        self._n = 0
+
+    def _open(self):
+        self.seq += 1
+        self._tmp = self.dir / f"{self.prefix}_{self.seq:06d}{SPOOL_SUFFIX}.tmp"
+        self._f = gzip.open(self._tmp, "wt", encoding="utf-8", compresslevel=5)
+        self._n = 0
+
+    def write(self, rec: DxlDocument, view_name: Optional[str], category_path: Optional[str]):
+        if self._f is None: self._open()
+        line = dict(v=SPOOL_FORMAT, source=self.source, view=view_name, category=category_path, doc=record_to_json(rec))
+        self._f.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._n += 1
+
+    def rotate(self) -> Optional[Path]:
+        if self._f is None: return None
+        self._f.close()
+        with open(self._tmp, "rb+") as fh:
+            os.fsync(fh.fileno())
+        final = self._tmp.with_name(self._tmp.name[:-len(".tmp")])
+        os.replace(self._tmp, final)
+        self._f = None; self._tmp = None
+        self.records += self._n; self.files += 1
+        return final
+
+    def close(self):
+        self.rotate()
+
+# ------------------------------ READER ----------------------------------
+
+def pending_spool_files(root: Path) -> List[Path]:
+    """Published batch files, oldest first (names sort by run start, then sequence)."""
+    return sorted(Path(root).glob(f"*/*{SPOOL_SUFFIX}"), key=lambda p: (p.parent.name, p.name))
+
+class _HashingReader(io.RawIOBase):
+    """Raw file that feeds every byte it hands out to a hashlib object."""
+    def __init__(self, fh, hasher):
+        self._fh, self._h = fh, hasher
+    def readable(self): return True
+    def readinto(self, b):
+        n = self._fh.readinto(b)
+        if n: self._h.update(memoryview(b)[:n])
+        return n
+
+def read_spool(path: Path, hasher=None) -> Iterator[Tuple[Dict[str, Any], Optional[str], Optional[str], DxlDocument]]:
+    """Yield (source, view, category, record). With `hasher` (e.g. hashlib.sha256()), the file's
+    bytes are hashed in the same pass, so a loader need not read the file twice."""
+    with open(path, "rb") as raw:
+        fh = _HashingReader(raw, hasher) if hasher is not None else raw
+        with gzip.open(fh, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                obj = json.loads(line)
+                if obj.get("v") != SPOOL_FORMAT:
+                    raise ValueError(f"{path.name}: unsupported spool format {obj.get('v')}")
+                yield obj["source"], obj.get("view"), obj.get("category"), record_from_json(obj["doc"])
+        if hasher is not None:
+            for chunk in iter(lambda: fh.read(1 << 20), b""): pass   # trailing bytes gzip did not need
+
+def archive_spool(path: Path, root: Path) -> Path:
+    dest = Path(root) / "loaded" / path.parent.name / path.name
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(path, dest)
+    return dest
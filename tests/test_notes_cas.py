@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Local CAS: streamed blobs and offloaded texts (notes_cas); no Notes or SQL needed.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, hashlib, tempfile, shutil, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import notes_cas
+
+TEXT = "Zusammenfassung été – " * 4000
+
+class CasTest(unittest.TestCase):
+    def setUp(self):
+        self.cas = Path(tempfile.mkdtemp(prefix="cas_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.cas, ignore_errors=True)
+
+    def test_blob_writer(self):
+        for _ in range(2):
+            w = notes_cas.CasBlobWriter(self.cas)
+            w.write(b"abc"); w.write(b"def")
+            digest, rel, size = w.commit()
+        self.assertEqual(digest, hashlib.sha256(b"abcdef").digest())
+        self.assertEqual(rel, f"{digest.hex()[:2]}/{digest.hex()[2:4]}/{digest.hex()}.bin")
+        self.assertEqual(((self.cas / rel).read_bytes(), size), (b"abcdef", 6))
+        self.assertEqual(list(self.cas.glob("*.tmp")), [])
+
+    def test_blob_writer_abort(self):
+        w = notes_cas.CasBlobWriter(self.cas)
+        w.write(b"partial")
+        w.abort()
+        self.assertEqual([p for p in self.cas.rglob("*") if p.is_file()], [])
+
+    def test_text_round_trip(self):
+        digest, length = notes_cas.store_text(self.cas, TEXT)
+        self.assertEqual(digest, hashlib.sha256(TEXT.encode("utf-8")).digest())
+        self.assertEqual(length, len(TEXT.encode("utf-8")))
+        self.assertEqual(notes_cas.store_text(self.cas, TEXT), (digest, length))
+        self.assertEqual(notes_cas.load_text(self.cas, digest), TEXT)
+        self.assertIsNone(notes_cas.load_text(self.cas, hashlib.sha256(b"missing").digest()))
+
+    def test_lazy_text(self):
+        digest, length = notes_cas.store_text(self.cas, TEXT)
+        lazy = notes_cas.LazyText(self.cas, digest, length)
+        self.assertEqual(str(lazy), TEXT)
+        notes_cas.text_blob_path(self.cas, digest).unlink()
+        self.assertEqual(lazy.read(), TEXT)          # read once, then kept
+        self.assertEqual(str(notes_cas.LazyText(self.cas, digest)), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Parser checks against a captured DXL export (tests/fixtures/sample.dxl); no Notes needed.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import io, sys, hashlib, tempfile, shutil, unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import notes_dxl
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "sample.dxl"
+ATTACHMENT = b"Quarterly figures attached.\n" * 3
+
+class DxlParserTest(unittest.TestCase):
+    def setUp(self):
+        self.cas = Path(tempfile.mkdtemp(prefix="cas_"))
+        self.docs = list(notes_dxl.iter_dxl_file(FIXTURE, self.cas))
+        self.person, self.memo = self.docs
+
+    def tearDown(self):
+        shutil.rmtree(self.cas, ignore_errors=True)
+
+    def items(self, doc):
+        return {name: (itype, is_rich, payload) for name, itype, is_rich, payload in doc.items}
+
+    def test_document_headers(self):
+        self.assertEqual([d.unid for d in self.docs], ["0A1B2C3D4E5F60718293A4B5C6D7E8F9", "FFEEDDCCBBAA99887766554433221100"])
+        self.assertEqual((self.person.form, self.person.note_id), ("Person", "8fa"))
+        self.assertEqual(self.memo.first("Subject"), "Budget 2024")
+
+    def test_item_typing(self):
+        it = self.items(self.person)
+        self.assertEqual(it["Subject"], (notes_dxl.IT_TEXT, False, ["Côté, Jean"]))
+        self.assertEqual(it["FullName"][0], notes_dxl.IT_NAMES)
+        self.assertEqual(it["DocReaders"][0], notes_dxl.IT_READERS)
+        self.assertEqual(it["Grade"], (notes_dxl.IT_NUMBERS, False, [4.0, 2.5]))
+        itype, is_rich, body = it["Body"]
+        self.assertEqual((itype, is_rich), (notes_dxl.IT_RICHTEXT, True))
+        self.assertIn("First paragraph.", body)
+        self.assertIn("Second bold paragraph.", body)
+        self.assertNotIn("$FILE", it)
+
+    def test_datetimes_and_zones(self):
+        # -05 and +05:30 offsets come back as naive UTC, hundredths kept
+        self.assertEqual(self.person.created, datetime(2024, 2, 1, 4, 59, 59, 500000))
+        self.assertEqual(self.person.modified, datetime(2024, 2, 1, 6, 30))
+        self.assertEqual(self.items(self.person)["Reviewed"][2], [datetime(2023, 12, 15, 8, 30), datetime(2024, 1, 5)])
+        # no zone: left as given; date only: midnight; time only: kept as the raw string
+        self.assertEqual(self.memo.created, datetime(2024, 3, 1, 9))
+        self.assertEqual(self.memo.modified, datetime(2024, 3, 2))
+        self.assertEqual(self.items(self.memo)["Due"], (notes_dxl.IT_DATETIMES, False, ["T150000,00"]))
+        self.assertIsNone(notes_dxl.parse_dxl_datetime("not a date"))
+
+    def test_file_into_cas(self):
+        self.assertEqual(len(self.person.attachments), 1)
+        a = self.person.attachments[0]
+        self.assertEqual((a["filename"], a["item_name"], a["size_bytes"]), ("figures.txt", "$FILE", len(ATTACHMENT)))
+        self.assertEqual(a["sha256"], hashlib.sha256(ATTACHMENT).digest())
+        self.assertEqual((self.cas / a["storage_path"]).read_bytes(), ATTACHMENT)
+        self.assertEqual(list(self.cas.rglob("*.tmp")), [])
+
+    def test_compressed_file_skipped(self):
+        self.assertEqual(self.person.skipped_files, ["scan.pdf"])
+        self.assertEqual(self.person.files, ["figures.txt", "scan.pdf"])
+        self.assertNotIn("scan.pdf", [a["filename"] for a in self.person.attachments])
+
+    def test_small_chunks(self):
+        # base64 and text split across every feed boundary parse the same
+        cas = self.cas / "chunked"
+        docs = list(notes_dxl.iter_dxl_documents(io.BytesIO(FIXTURE.read_bytes()), cas, chunk_size=7))
+        self.assertEqual([d.items for d in docs], [d.items for d in self.docs])
+        self.assertEqual((cas / docs[0].attachments[0]["storage_path"]).read_bytes(), ATTACHMENT)
+
+if __name__ == "__main__":
+    unittest.main()
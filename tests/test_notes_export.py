@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Wide-form pivot and partitioned Parquet writer of notes_export.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, tempfile, unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import notes_export
+
+def _row(unid, item_id, order, kind, s=None, t=None, n=None, dt=None, b=None, source_id=1):
+    return (unid, source_id, datetime(2024, 1, 1), item_id, order, kind, s, t, n, dt, b)
+
+class PivotTest(unittest.TestCase):
+    def test_mixed_kinds_as_strings(self):
+        columns = {1: ("grade", "string"), 2: ("score", "float64")}
+        rows = [_row("A", 1, 0, "number", n=2.0), _row("A", 1, 1, "number", n=float("nan")),
+                _row("A", 1, 2, "number", n=float("inf")), _row("A", 1, 3, "string", s="B+"),
+                _row("A", 2, 0, "number", n=1.5), _row("B", None, None, None)]
+        a, b = notes_export.pivot_rows(rows, columns)
+        self.assertEqual((a["grade"], a["score"]), (["2", "nan", "inf", "B+"], [1.5]))
+        self.assertEqual((b["unid"], b["grade"], b["score"]), ("B", None, None))
+
+@unittest.skipIf(notes_export.pa is None, "pyarrow not installed")
+class ParquetWriterTest(unittest.TestCase):
+    def test_partitions_and_swap(self):
+        import pyarrow.dataset as ds
+        layout = notes_export.FORM_COLUMNS + [("grade", "string", True)]
+        with tempfile.TemporaryDirectory() as d:
+            with notes_export.PartitionedParquetWriter(Path(d), "person_wide", "source_id", layout, row_group_rows=2) as w:
+                for i in range(5):
+                    w.write(1 + i % 2, dict(unid=f"U{i}", source_id=1 + i % 2, modified_at=None, grade=[str(i)]))
+            self.assertEqual(sorted(p.name for p in (Path(d) / "person_wide").iterdir()), ["source_id=1", "source_id=2"])
+            table = ds.dataset(str(Path(d) / "person_wide"), format="parquet", partitioning="hive").to_table()
+            self.assertEqual(table.num_rows, 5)
+            self.assertFalse((Path(d) / ".person_wide.partial").exists())
+
+if __name__ == "__main__":
+    unittest.main()
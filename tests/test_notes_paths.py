@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Folder naming shared by the exporters (notes_paths).
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from notes_paths import sanitize_folder_name
+
+class SanitizeFolderNameTest(unittest.TestCase):
+    def test_reserved_characters_and_whitespace(self):
+        self.assertEqual(sanitize_folder_name('Q1: "Budget" / Plan?'), "Q1_Budget_Plan")
+        self.assertEqual(sanitize_folder_name("a \t b__c"), "a_b_c")
+
+    def test_empty_and_non_string(self):
+        self.assertEqual(sanitize_folder_name(None), "Unnamed")
+        self.assertEqual(sanitize_folder_name("   "), "Unnamed")
+        self.assertEqual(sanitize_folder_name(2024), "2024")
+
+    def test_length(self):
+        self.assertEqual(len(sanitize_folder_name("x" * 300)), 100)
+        self.assertEqual(sanitize_folder_name("abc_def", 4), "abc")
+
+if __name__ == "__main__":
+    unittest.main()
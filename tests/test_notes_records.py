@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Record -> row mapping of the SQL sinks, against the captured DXL export.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, hashlib, tempfile, shutil, unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import notes_dxl, notes_records
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "sample.dxl"
+
+class RecordRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.cas = Path(tempfile.mkdtemp(prefix="cas_"))
+        self.person, self.memo = notes_dxl.iter_dxl_file(FIXTURE, self.cas)
+
+    def tearDown(self):
+        shutil.rmtree(self.cas, ignore_errors=True)
+
+    def test_document_row(self):
+        doc = notes_records.record_rows(self.person, lambda name: True).doc
+        self.assertEqual((doc["unid"], doc["note_id"], doc["form"]), ("0A1B2C3D4E5F60718293A4B5C6D7E8F9", "8fa", "Person"))
+        self.assertEqual((doc["subject"], doc["author"], doc["has_attachments"]), ("Côté, Jean", None, 1))
+        self.assertEqual(doc["created_at"], datetime(2024, 2, 1, 4, 59, 59, 500000))
+        body = doc["text_body"]
+        self.assertIn("Grade: 4.0; 2.5", body)
+        self.assertIn("Body:\n", body)
+        self.assertIn("Second bold paragraph.", body)
+        self.assertEqual(doc["text_hash"], hashlib.sha256(body.encode("utf-8")).digest())
+        self.assertEqual(doc["doc_size_bytes"], len(body.encode("utf-8")))
+
+    def test_filter_and_files(self):
+        kept = {"subject", "grade"}
+        got = notes_records.record_rows(self.person, lambda name: name.lower() in kept)
+        self.assertEqual([r[0] for r in got.items], ["Subject", "Grade"])
+        self.assertEqual(got.files, [])
+        self.assertIn("Body:", got.doc["text_body"])      # the body still covers every item
+        got = notes_records.record_rows(self.person, lambda name: name.lower() in kept | {"$file"}, body_from_all=False)
+        self.assertEqual(got.files, ["figures.txt", "scan.pdf"])
+        self.assertEqual(got.doc["text_body"], "Subject: Côté, Jean\nGrade: 4.0; 2.5")
+
+    def test_author_fallback_and_clipping(self):
+        self.memo.items.append(("From", notes_dxl.IT_NAMES, False, ["CN=Ann Lee/O=HC-SC"]))
+        self.memo.items.append(("Subject", notes_dxl.IT_TEXT, False, ["ignored, first Subject wins"]))
+        doc = notes_records.record_rows(self.memo, lambda name: True).doc
+        self.assertEqual((doc["form"], doc["subject"], doc["author"]), ("Memo", "Budget 2024", "CN=Ann Lee/O=HC-SC"))
+        self.memo.subject, self.memo.author = "x" * 2000, "Set by the reader"
+        doc = notes_records.record_rows(self.memo, lambda name: True).doc
+        self.assertEqual((len(doc["subject"]), doc["author"]), (notes_records.DOC_FIELD_MAX["subject"], "Set by the reader"))
+
+    def test_empty_body(self):
+        doc = notes_records.record_rows(self.memo, lambda name: False, body_from_all=False).doc
+        self.assertEqual((doc["text_body"], doc["text_hash"], doc["doc_size_bytes"]), ("", None, None))
+
+if __name__ == "__main__":
+    unittest.main()
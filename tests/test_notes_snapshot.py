@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Hole bookkeeping and compaction of notes_snapshot.ViewSnapshot.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from notes_snapshot import ViewSnapshot
+
+UNIDS = [f"{i:032X}" for i in range(1, 9)]
+
+class ViewSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.snap = ViewSnapshot()
+        for i, u in enumerate(UNIDS):
+            self.snap.add(u, "Ottawa\\IMSD" if i % 2 else None)
+        self.snap.add("not-a-unid", "Odd")
+
+    def test_remove_leaves_holes(self):
+        self.assertEqual(self.snap.remove(UNIDS[2]), 2)
+        self.assertEqual(self.snap.remove(UNIDS[2]), -1)
+        self.snap.remove("not-a-unid")
+        self.assertEqual((len(self.snap), self.snap.holes, self.snap.live), (9, 2, 7))
+        self.assertEqual(self.snap.index_of(UNIDS[3]), 3)
+
+    def test_compacted(self):
+        self.snap.remove(UNIDS[0]); self.snap.remove(UNIDS[5])
+        self.snap.add(UNIDS[0], "Moved")           # a refresh re-appends changed documents
+        out = self.snap.compacted()
+        self.assertEqual((len(out), out.holes), (8, 0))
+        self.assertEqual(list(out), list(self.snap))
+        self.assertEqual(out.index_of(UNIDS[0]), 7)
+        self.assertEqual(out.category_at(7), "Moved")
+        self.assertNotIn(UNIDS[5], out)
+
+    def test_holes_survive_save_and_load(self):
+        self.snap.remove(UNIDS[1])
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "view.snap"
+            self.snap.save(path, dict(sig="x"))
+            snap, meta = ViewSnapshot.load(path)
+        self.assertEqual((meta, snap.holes, snap.live), (dict(sig="x"), 1, 8))
+        self.assertEqual(list(snap), list(self.snap))
+
+if __name__ == "__main__":
+    unittest.main()
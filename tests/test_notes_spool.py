@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Spool codec and batch publishing (notes_spool); no Notes or SQL needed.
+#   python -m pytest -q tests    (or: python -m unittest discover tests)
+
+import sys, gzip, json, hashlib, tempfile, shutil, unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import notes_spool
+from notes_dxl import DxlDocument
+
+SOURCE = dict(server_name="CN=Mail01/O=Acme", filepath="apps\\crm.nsf", title="CRM", replica_id="85257A3B00123456")
+
+def sample_record() -> DxlDocument:
+    rec = DxlDocument(form="Memo")
+    rec.unid, rec.note_id = "FFEEDDCCBBAA99887766554433221100", "1f2"
+    rec.subject, rec.author = "Budget 2024", "CN=Ann Lee/O=Acme"
+    rec.created, rec.modified = datetime(2024, 1, 5, 9, 30), datetime(2024, 2, 1, 17, 0, 5)
+    rec.items = [
+        ("Subject", 1280, False, ["Budget 2024"]),
+        ("Amounts", 768, False, [1.5, 2, 3.25]),
+        ("DueDate", 1024, False, [datetime(2024, 3, 31, 0, 0)]),
+        ("Body", 1, True, "<richtext><par>Quarterly figures attached.</par></richtext>"),
+    ]
+    rec.attachments = [dict(file_name="figures.xlsx", size=84, sha256=hashlib.sha256(b"x").digest())]
+    rec.files = ["figures.xlsx"]
+    return rec
+
+class SpoolCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        rec = sample_record()
+        back = notes_spool.record_from_json(json.loads(json.dumps(notes_spool.record_to_json(rec))))
+        for attr in ("unid", "note_id", "form", "subject", "author", "created", "modified", "files"):
+            self.assertEqual(getattr(back, attr), getattr(rec, attr), attr)
+        self.assertEqual(back.items, rec.items)
+        self.assertEqual(back.attachments, rec.attachments)
+        self.assertIsInstance(back.attachments[0]["sha256"], bytes)
+
+    def test_scalar_payload_becomes_list(self):
+        rec = DxlDocument()
+        rec.items = [("Count", 768, False, 7)]
+        self.assertEqual(notes_spool.record_from_json(notes_spool.record_to_json(rec)).items, [("Count", 768, False, [7])])
+
+class SpoolFileTest(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(prefix="spool_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_rotate_publishes_batch(self):
+        w = notes_spool.SpoolWriter(self.root, SOURCE)
+        w.write(sample_record(), "By Date", "2024\\Q1")
+        w.write(sample_record(), None, None)
+        # Nothing is visible to a loader until the batch is rotated
+        self.assertEqual(notes_spool.pending_spool_files(self.root), [])
+        self.assertEqual([p.suffix for p in w.dir.iterdir()], [".tmp"])
+
+        final = w.rotate()
+        self.assertEqual(notes_spool.pending_spool_files(self.root), [final])
+        self.assertEqual(list(w.dir.glob("*.tmp")), [])
+        self.assertEqual((w.records, w.files), (2, 1))
+        self.assertIsNone(w.rotate())
+
+        hasher = hashlib.sha256()
+        rows = list(notes_spool.read_spool(final, hasher))
+        self.assertEqual([(r[1], r[2]) for r in rows], [("By Date", "2024\\Q1"), (None, None)])
+        self.assertEqual(rows[0][0], SOURCE)
+        self.assertEqual(rows[0][3].subject, "Budget 2024")
+        self.assertEqual(hasher.hexdigest(), hashlib.sha256(final.read_bytes()).hexdigest())
+
+    def test_next_write_opens_new_batch(self):
+        w = notes_spool.SpoolWriter(self.root, SOURCE)
+        w.write(sample_record(), None, None)
+        first = w.rotate()
+        w.write(sample_record(), None, None)
+        w.close()
+        files = notes_spool.pending_spool_files(self.root)
+        self.assertEqual(len(files), 2)
+        self.assertEqual(files[0], first)
+
+    def test_archive(self):
+        w = notes_spool.SpoolWriter(self.root, SOURCE)
+        w.write(sample_record(), None, None)
+        final = w.rotate()
+        dest = notes_spool.archive_spool(final, self.root)
+        self.assertFalse(final.exists())
+        self.assertEqual(dest, self.root / "loaded" / final.parent.name / final.name)
+        self.assertEqual(notes_spool.pending_spool_files(self.root), [])
+
+    def test_unknown_format_rejected(self):
+        path = self.root / "src" / ("bad" + notes_spool.SPOOL_SUFFIX)
+        path.parent.mkdir()
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(dict(v=notes_spool.SPOOL_FORMAT + 1, source=SOURCE, doc={})) + "\n")
+        with self.assertRaises(ValueError):
+            list(notes_spool.read_spool(path))
+
+if __name__ == "__main__":
+    unittest.main()